@@ -1,22 +1,35 @@
+# Imported first so the time taken to import everything else can be measured
+from .profiling import IMPORT_STARTED, hook_stats, timings
 import click
 import collections
-import pkg_resources
+import inspect
+import json
 import sys
 import os
+import re
+import threading
+import time
 import traceback
 import attr
-import requests
+from click.utils import make_default_short_help
 
 from .alias_group import SpellcheckableAliasableGroup
 from .colors import PURPLE, RED, YELLOW
-from .tasks import RootTask
+from .plugin_manifest import PluginManifest, discover_entrypoints, fingerprint, load_entrypoint
+from .table import Table
+from .tasks import RootTask, set_output_format
+from .trace import critical_path, describe_critical_path, write_trace
 from ..config import Config
 from ..constants import PluginHook
+from ..docker.context import RunContext
 from ..docker.hosts import HostManager
-from ..exceptions import DockerNotAvailableError
+from ..docker.watcher import FormationWatcher
+from ..exceptions import BadConfigError, DockerNotAvailableError
 from ..containers.graph import ContainerGraph
 from ..containers.profile import NullProfile, Profile
+from ..utils.humanize import file_size
 from ..utils.sorting import dependency_sort
+from ..utils.threading import ExceptionalThread
 
 
 @attr.s
@@ -33,6 +46,15 @@ class App(object):
     """
     cli = attr.ib()
     plugins = attr.ib(default=attr.Factory(dict), init=False)
+    run_contexts = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    run_contexts_lock = attr.ib(default=attr.Factory(threading.Lock), init=False, repr=False)
+    hook_signatures = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    # Hooks run in threads can cause plugins to load
+    plugin_lock = attr.ib(default=attr.Factory(threading.RLock), init=False, repr=False)
+    # Set in daemon-forked commands, where the config is loaded before forking
+    preloaded = False
+    # Run containers from an asyncio event loop rather than a thread each
+    async_runner = attr.ib(default=False, init=False)
 
     @classmethod
     def get_default_containers(cls):
@@ -42,28 +64,46 @@ class App(object):
 
     @classmethod
     def load_config(cls):
-        default_config_paths = ()
-        cls.config = Config(default_config_paths)
-        cls.hosts = HostManager.from_config(cls.config)
-        cls.containers = ContainerGraph(cls.config["bay"]["home"])
-        cls.root_task = RootTask()
+        with timings.phase("load config"):
+            cls.config = Config(Config.default_paths())
+            cls.hosts = HostManager.from_config(cls.config)
+            with timings.phase("load container graph"):
+                cls.containers = ContainerGraph(cls.config["bay"]["home"])
+            cls.root_task = RootTask()
 
     def load_plugins(self):
         """
-        Loads all plugins defined in config
+        Discovers all installed plugins. If the plugin manifest is up to date,
+        each plugin is only imported once something it registers is needed;
+        otherwise, they are all loaded now and the manifest is rewritten.
         """
         self.hooks = {}
         self.catalog = {}
+        self.loaded_plugins = set()
+        self.loading_plugin = None
+        with timings.phase("discover plugins"):
+            entrypoints = discover_entrypoints()
+            manifest_path = PluginManifest.default_path()
+            current_fingerprint = fingerprint(entrypoints)
+            self.manifest = PluginManifest.load(manifest_path, current_fingerprint)
+        if self.manifest is None:
+            with timings.phase("load all plugins"):
+                self.manifest = PluginManifest(path=manifest_path, fingerprint=current_fingerprint)
+                self.load_all_plugins(entrypoints)
+                self.manifest.save()
+
+    def load_all_plugins(self, entrypoints):
+        """
+        Imports and loads every plugin, recording what each one registers
+        into the manifest.
+        """
         # Load plugin classes based on entrypoints
         plugins = []
-        for entrypoint in pkg_resources.iter_entry_points("bay.plugins"):
-            try:
-                plugin = entrypoint.load()
-                plugins.append(plugin)
-            except ImportError:
-                click.echo(PURPLE("Failed to import plugin: {name}".format(name=entrypoint.name)), err=True)
-                click.echo(PURPLE(traceback.format_exc()), err=True)
-                sys.exit(1)
+        entrypoint_names = {}
+        for name, value in entrypoints:
+            plugin = self.import_plugin(name, value)
+            plugins.append(plugin)
+            entrypoint_names[plugin] = (name, value)
         # Build plugin provides
         provided = {}
         for plugin in plugins:
@@ -82,15 +122,130 @@ class App(object):
         # Sort plugins by dependency order, and then alphabetically inside that
         plugins = dependency_sort(plugins, lambda x: [provided[r] for r in x.requires])
         # Load plugins
-        for plugin in plugins:
-            # We store plugins so you can look their instances up by class
-            self.plugins[plugin] = instance = plugin(self)
+        for order, plugin in enumerate(plugins):
+            name, value = entrypoint_names[plugin]
+            self.manifest.add_plugin(name, value, plugin, order)
+            self.instantiate_plugin(name, plugin)
+
+    def import_plugin(self, name, value):
+        """
+        Imports a plugin class from its entrypoint value, exiting if it fails.
+        """
+        try:
+            return load_entrypoint(value)
+        except ImportError:
+            click.echo(PURPLE("Failed to import plugin: {name}".format(name=name)), err=True)
+            click.echo(PURPLE(traceback.format_exc()), err=True)
+            sys.exit(1)
+
+    def instantiate_plugin(self, name, plugin):
+        """
+        Makes the plugin instance and lets it register its commands and hooks.
+        """
+        self.loaded_plugins.add(name)
+        # We store plugins so you can look their instances up by class
+        self.plugins[plugin] = instance = plugin(self)
+        previous_plugin, self.loading_plugin = self.loading_plugin, name
+        try:
             instance.load()
+        finally:
+            self.loading_plugin = previous_plugin
+
+    def load_plugin(self, name):
+        """
+        Loads a single plugin named in the manifest, along with the plugins
+        providing what it requires, if it is not loaded already.
+        """
+        with self.plugin_lock:
+            if name in self.loaded_plugins:
+                return
+            details = self.manifest.plugins[name]
+            for requirement in details["requires"]:
+                self.load_plugin(self.manifest.plugin_for("provides", requirement))
+            # Catalog types have to exist before items can be added to them
+            for type_name in details["catalog_items"]:
+                owner = self.manifest.plugin_for("catalog_types", type_name)
+                if owner is not None:
+                    self.load_plugin(owner)
+            with timings.phase("load plugin {}".format(name)):
+                self.instantiate_plugin(name, self.import_plugin(name, details["class"]))
+
+    def load_plugins_with(self, key, value):
+        """
+        Loads all plugins that registered `value` as a `key` (commands, hooks, etc.)
+        """
+        for name in self.manifest.plugins_with(key, value):
+            self.load_plugin(name)
+
+    def load_command_plugin(self, command_name):
+        """
+        Loads the plugin that provides the named command or alias, if any.
+        """
+        name = (
+            self.manifest.plugin_for("commands", command_name) or
+            self.manifest.plugin_for("aliases", command_name)
+        )
+        if name is not None:
+            self.load_plugin(name)
+
+    def manifest_commands(self):
+        """
+        Returns {command name: short help} for all commands in the manifest.
+        """
+        commands = {}
+        for details in self.manifest.plugins.values():
+            commands.update(details["commands"])
+        return commands
+
+    def manifest_aliases(self):
+        """
+        Returns the names of all aliases in the manifest.
+        """
+        aliases = set()
+        for details in self.manifest.plugins.values():
+            aliases.update(details["aliases"])
+        return aliases
+
+    def loading_plugin_details(self):
+        """
+        Returns the manifest entry for the plugin currently being loaded, or
+        None if registration is happening outside of a plugin load.
+        """
+        if self.loading_plugin is None:
+            return None
+        return self.manifest.plugins[self.loading_plugin]
+
+    def add_command(self, command):
+        """
+        Adds a command to the CLI.
+        """
+        self.cli.add_command(command)
+        details = self.loading_plugin_details()
+        if details is not None:
+            # Hidden commands are recorded so they load, but are not listed in help
+            if getattr(command, "hidden", False):
+                short_help = None
+            else:
+                short_help = command.short_help or make_default_short_help(command.help or "")
+            details["commands"][command.name] = short_help
+
+    def add_alias(self, command, alias):
+        """
+        Adds a CLI alias for a command.
+        """
+        self.cli.add_alias(command, alias)
+        details = self.loading_plugin_details()
+        if details is not None:
+            details["aliases"][alias] = command.name
 
     def load_profiles(self):
         """
         Loads the current profile stack
         """
+        with timings.phase("apply profiles"):
+            self._load_profiles()
+
+    def _load_profiles(self):
         self.user_profile_path = os.path.join(
             self.config["bay"]["user_profile_home"],
             self.containers.prefix,
@@ -122,25 +277,195 @@ class App(object):
         for profile in reversed(self.profiles):
             profile.apply(self.containers)
 
-    def add_hook(self, hook_type, receiver):
+    def set_environment(self, name):
+        """
+        Runs formations in the named environment rather than the default one.
+        Its port_offset comes from the environments config section;
+        environments not listed there keep the usual host ports.
+        """
+        details = self.config["environments"].get(name, {})
+        port_offset = details.get("port_offset", 0)
+        if not isinstance(port_offset, int):
+            raise BadConfigError("environments.{}.port_offset is not an integer".format(name))
+        self.containers.set_environment(name, port_offset)
+        # A daemon's watchers follow the default environment's network
+        for host in self.hosts:
+            if host.watcher is not None and host.watcher.network != self.containers.namespace:
+                host.watcher.stop()
+                host.watcher = None
+
+    def add_hook(self, hook_type, receiver, after=None):
         """
         Adds a plugin hook to be run later.
+
+        By default, a hook runs after every hook of the same type from
+        plugins loaded before it. If `after` is a list of names from other
+        plugins' provides, it only waits for those plugins' hooks, and runs
+        concurrently with any others that are also ready. Only hooks that do
+        not change the instance, container or host should do that, as others
+        may be reading or changing them at the same time.
         """
         if hook_type not in PluginHook.valid_hooks:
             raise ValueError("Invalid hook type {}".format(hook_type))
-        self.hooks.setdefault(hook_type, []).append(receiver)
+        details = self.loading_plugin_details()
+        if details is None:
+            order = len(self.manifest.plugins)
+        else:
+            order = details["order"]
+            if hook_type not in details["hooks"]:
+                details["hooks"].append(hook_type)
+        hooks = self.hooks.setdefault(hook_type, [])
+        hooks.append(Hook(order, self.loading_plugin, receiver, after))
+        # Plugins may load in any order now, so keep hooks in plugin order
+        hooks.sort(key=lambda hook: hook.order)
 
     def run_hooks(self, hook_type, **kwargs):
         """
         Runs all hooks of the given type with the given keyword arguments.
+        Hooks that do not depend on each other are run at the same time; if
+        any fail, the exception from the first-registered failing hook is raised.
 
         Returns True if at least one hook ran, False otherwise.
         """
-        hooks = self.hooks.get(hook_type, [])
-        for hook in hooks:
-            hook(**kwargs)
+        with timings.phase("hooks {}".format(hook_type)):
+            self.load_plugins_with("hooks", hook_type)
+            # Copied, as hooks can cause more plugins (and so hooks) to load
+            hooks = list(self.hooks.get(hook_type, []))
+            for wave in self.hook_waves(hooks):
+                if len(wave) == 1:
+                    self.run_hook(hook_type, wave[0], kwargs)
+                    continue
+                threads = [
+                    ExceptionalThread(target=self.run_hook, args=(hook_type, hook, kwargs), daemon=True)
+                    for hook in wave
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                # Threads are in registration order, so this raises the earliest hook's error
+                for thread in threads:
+                    thread.maybe_raise()
         return bool(hooks)
 
+    def run_hook(self, hook_type, hook, kwargs):
+        """
+        Runs a single hook, recording how long it took (even if it failed).
+        """
+        hook_name = getattr(hook.receiver, "__qualname__", repr(hook.receiver))
+        phase = timings.start("hook {}".format(hook_name))
+        try:
+            hook.receiver(**self.hook_kwargs(hook.receiver, kwargs))
+        finally:
+            timings.finish(phase)
+            hook_stats.record(hook_type, hook.plugin_name, hook_name, phase.duration)
+
+    def hook_waves(self, hooks):
+        """
+        Splits the (ordered) hooks into lists that can each run concurrently,
+        in the order they must run.
+        """
+        dependencies = {}
+        for index, hook in enumerate(hooks):
+            if hook.after is None:
+                dependencies[index] = set(range(index))
+            else:
+                dependencies[index] = {
+                    other_index
+                    for other_index, other in enumerate(hooks)
+                    if other.plugin_name is not None and other_index != index and any(
+                        name in self.manifest.plugins[other.plugin_name]["provides"]
+                        for name in hook.after
+                    )
+                }
+        waves = []
+        done = set()
+        while len(done) < len(hooks):
+            wave = [
+                index
+                for index in range(len(hooks))
+                if index not in done and dependencies[index] <= done
+            ]
+            if not wave:
+                raise ValueError("Hooks have circular ordering: {}".format(
+                    ", ".join(repr(hooks[index].receiver) for index in range(len(hooks)) if index not in done),
+                ))
+            waves.append([hooks[index] for index in wave])
+            done.update(wave)
+        return waves
+
+    def hook_kwargs(self, hook, kwargs):
+        """
+        Returns the keyword arguments to call the hook with. The run context
+        is optional, so it is only passed to hooks whose signature accepts it.
+        """
+        if "context" not in kwargs:
+            return kwargs
+        if hook not in self.hook_signatures:
+            try:
+                parameters = inspect.signature(hook).parameters.values()
+            except (TypeError, ValueError):
+                parameters = []
+            self.hook_signatures[hook] = any(
+                parameter.name == "context" or parameter.kind == parameter.VAR_KEYWORD
+                for parameter in parameters
+            )
+        if self.hook_signatures[hook]:
+            return kwargs
+        return {name: value for name, value in kwargs.items() if name != "context"}
+
+    def get_run_context(self, host):
+        """
+        Returns the RunContext for the host, which is shared by everything
+        that runs during this command.
+        """
+        with self.run_contexts_lock:
+            if host.alias not in self.run_contexts:
+                self.run_contexts[host.alias] = RunContext(host, self.containers)
+            return self.run_contexts[host.alias]
+
+    def after_fork(self):
+        """
+        Called in a child forked from the daemon. Replaces the locks the
+        daemon's other threads may have held at the fork, and the hosts'
+        clients and watcher threads, which the child does not share.
+        """
+        self.run_contexts_lock = threading.Lock()
+        self.plugin_lock = threading.RLock()
+        # Each command gets fresh run contexts (and so fresh locks in them)
+        self.run_contexts = {}
+        for host in self.hosts:
+            host.after_fork()
+
+    def get_runner(self, host, formation, task, stop=True):
+        """
+        Returns a FormationRunner for the host, using the asyncio one if it
+        was asked for and the host supports it.
+        """
+        # The runners import docker, so only pull them in when needed
+        from ..docker.runner import FormationRunner
+        if self.async_runner:
+            from ..docker.aio import AsyncFormationRunner
+            try:
+                return AsyncFormationRunner(self, host, formation, task, stop=stop)
+            except ValueError:
+                # Not a unix socket host; fall back to threads
+                pass
+        return FormationRunner(self, host, formation, task, stop=stop)
+
+    def get_watcher(self, host):
+        """
+        Returns the FormationWatcher for the host, starting one if needed.
+        Once started, run contexts and anything else looking at the host
+        reads from it rather than introspecting.
+        """
+        with self.run_contexts_lock:
+            if host.watcher is None:
+                watcher = FormationWatcher(host, self.containers)
+                watcher.start()
+                host.watcher = watcher
+            return host.watcher
+
     def add_catalog_type(self, name):
         """
         Adds a type of "catalog" for things to register.
@@ -148,6 +473,9 @@ class App(object):
         if name in self.catalog:
             raise ValueError("Catalog type {} already registered".format(name))
         self.catalog[name] = collections.OrderedDict()
+        details = self.loading_plugin_details()
+        if details is not None:
+            details["catalog_types"].append(name)
 
     def add_catalog_item(self, type_name, name, value):
         """
@@ -158,8 +486,13 @@ class App(object):
         if name in self.catalog[type_name]:
             raise ValueError("Catalog item {}/{} already registered".format(type_name, name))
         self.catalog[type_name][name] = value
+        details = self.loading_plugin_details()
+        if details is not None:
+            details["catalog_items"].setdefault(type_name, []).append(name)
 
     def get_catalog_items(self, type_name):
+        self.load_plugins_with("catalog_types", type_name)
+        self.load_plugins_with("catalog_items", type_name)
         if type_name not in self.catalog:
             raise ValueError("Catalog type {} does not exist".format(type_name))
         return self.catalog[type_name]
@@ -168,6 +501,11 @@ class App(object):
         """
         Given a plugin's class, returns the instance of it we have loaded.
         """
+        if klass not in self.plugins:
+            value = "{}:{}".format(klass.__module__, klass.__qualname__)
+            for name, details in self.manifest.plugins.items():
+                if details["class"] == value:
+                    self.load_plugin(name)
         return self.plugins[klass]
 
     def invoke(self, command_name, **kwargs):
@@ -179,6 +517,18 @@ class App(object):
         context.invoke(command, **kwargs)
 
 
+@attr.s
+class Hook(object):
+    """
+    A registered hook receiver, along with the plugin that added it.
+    """
+    order = attr.ib()
+    plugin_name = attr.ib()
+    receiver = attr.ib()
+    # None to run after all earlier hooks, or a list of provides names to wait for
+    after = attr.ib(default=None)
+
+
 class AppGroup(SpellcheckableAliasableGroup):
     """
     Group subclass that instantiates an App instance when called, loads
@@ -190,6 +540,38 @@ class AppGroup(SpellcheckableAliasableGroup):
         self.app = app_class(self)
         self.app.load_plugins()
 
+    def get_command(self, ctx, cmd_name):
+        # Import the plugin providing the command, if it's not loaded yet
+        self.app.load_command_plugin(cmd_name)
+        return super(AppGroup, self).get_command(ctx, cmd_name)
+
+    def list_commands(self, ctx):
+        return sorted(set(self.commands) | set(self.app.manifest_commands()))
+
+    def list_aliases(self, ctx):
+        return sorted(set(self.aliases) | self.app.manifest_aliases())
+
+    def format_commands(self, ctx, formatter):
+        """
+        Lists commands using the help text stored in the plugin manifest, so
+        showing help does not need to import every plugin.
+        """
+        manifest_commands = self.app.manifest_commands()
+        rows = []
+        for name in self.list_commands(ctx):
+            command = self.commands.get(name)
+            if command is None:
+                short_help = manifest_commands[name]
+            elif getattr(command, "hidden", False):
+                short_help = None
+            else:
+                short_help = command.short_help or make_default_short_help(command.help or "")
+            if short_help is not None:
+                rows.append((name, short_help))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
     def invoke(self, ctx):
         ctx.obj = self.app
         return super(AppGroup, self).invoke(ctx)
@@ -202,21 +584,173 @@ class AppGroup(SpellcheckableAliasableGroup):
             if not self.app.run_hooks(PluginHook.DOCKER_FAILURE):
                 click.echo(RED(str(e)))
             sys.exit(1)
-        except requests.exceptions.ReadTimeout as e:
-            click.echo(YELLOW("Transient Docker connection error, please try again."))
-            sys.exit(1)
+        except Exception as e:
+            # requests is only imported once we talk to Docker, so don't import it just to check
+            requests = sys.modules.get("requests")
+            if requests is not None and isinstance(e, requests.exceptions.ReadTimeout):
+                click.echo(YELLOW("Transient Docker connection error, please try again."))
+                sys.exit(1)
+            raise
+
+
+timings.add("import", IMPORT_STARTED, time.perf_counter() - IMPORT_STARTED)
 
 
 @click.command(cls=AppGroup, app_class=App)
 @click.version_option()
+@click.option(
+    "--profile",
+    is_flag=True,
+    envvar="BAY_PROFILE",
+    help="Profile this run, printing a timing summary and saving a cProfile dump.",
+)
+@click.option("--api-stats", is_flag=True, help="Print the most expensive Docker API endpoints at exit.")
+@click.option(
+    "--api-stats-json",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write Docker API call statistics to this file as JSON at exit.",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write a Chrome trace of all tasks run to this file at exit.",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(["auto", "terminal", "json"]),
+    default="auto",
+    envvar="BAY_OUTPUT_FORMAT",
+    help="How to show task progress; auto uses json lines when output is not a terminal.",
+)
+@click.option(
+    "--hook-stats",
+    is_flag=True,
+    help="Print how long each plugin hook took at exit, flagging slow ones.",
+)
+@click.option(
+    "--async-runner",
+    is_flag=True,
+    envvar="BAY_ASYNC_RUNNER",
+    help="Start and stop containers from one asyncio event loop instead of a thread each.",
+)
+@click.option(
+    "--environment",
+    envvar="BAY_ENVIRONMENT",
+    help="Run in this named environment, with its own network, container names and ports.",
+)
 @click.pass_obj
-def cli(app):
+def cli(app, profile, api_stats, api_stats_json, trace, output_format, hook_stats, async_runner, environment):
     """
     Bay, the Docker-based development environment management tool.
     """
-    # Load config based on CLI parameters
-    app.load_config()
+    if profile:
+        timings.enable()
+    set_output_format(output_format)
+    app.async_runner = async_runner
+    # Load config based on CLI parameters, unless a daemon already did
+    if not app.preloaded:
+        app.load_config()
     app.load_profiles()
+    if environment:
+        if not re.match(r"^[a-zA-Z0-9][a-zA-Z0-9_.-]*$", environment):
+            raise click.BadParameter("must be letters, numbers, '_', '.' or '-'", param_hint="--environment")
+        app.set_environment(environment)
+    # Time the command itself until the context closes
+    context = click.get_current_context()
+    command_phase = timings.start("command {}".format(context.invoked_subcommand))
+    if profile:
+        context.call_on_close(lambda: write_profile(app, command_phase))
+    if api_stats or api_stats_json:
+        context.call_on_close(lambda: write_api_stats(app, api_stats, api_stats_json))
+    if trace:
+        context.call_on_close(lambda: write_task_trace(app.root_task, trace))
+    if hook_stats:
+        context.call_on_close(write_hook_stats)
+
+
+def write_profile(app, command_phase):
+    """
+    Saves the cProfile dump and prints the timing summary for a --profile run.
+    """
+    timings.finish(command_phase)
+    profile_path = app.config["bay"]["profile_path"]
+    timings.dump(profile_path)
+    click.echo(timings.summary(), err=True)
+    click.echo("Profile written to {}".format(profile_path), err=True)
+
+
+def write_api_stats(app, print_table, json_path, limit=15):
+    """
+    Prints and/or saves the Docker API call statistics for each host.
+    """
+    if print_table:
+        for host in app.hosts:
+            click.echo("Docker API calls to {} ({} total):".format(host.alias, host.api_stats.total_calls))
+            table = Table([
+                ("ENDPOINT", 45),
+                ("CALLS", 6),
+                ("ERRORS", 6),
+                ("TOTAL", 9),
+                ("MEAN", 9),
+                ("MAX", 9),
+                ("RECEIVED", 10),
+            ])
+            table.print_header()
+            for stats in host.api_stats.top(limit):
+                table.print_row([
+                    stats.endpoint,
+                    stats.calls,
+                    stats.errors,
+                    "{:.0f}ms".format(stats.total_time * 1000),
+                    "{:.1f}ms".format(stats.mean_time * 1000),
+                    "{:.1f}ms".format(stats.max_time * 1000),
+                    file_size(stats.bytes_received),
+                ])
+    if json_path:
+        with open(json_path, "w") as fh:
+            json.dump({host.alias: host.api_stats.as_dict() for host in app.hosts}, fh, indent=4, sort_keys=True)
+
+
+def write_task_trace(root_task, path):
+    """
+    Writes the --trace file, and prints the critical path through the
+    container starts, if there were any.
+    """
+    write_trace(root_task, path)
+    starts = critical_path(root_task)
+    if starts:
+        click.echo(describe_critical_path(starts), err=True)
+
+
+def write_hook_stats():
+    """
+    Prints the time taken by each hook, grouped by hook type and plugin.
+    """
+    table = Table([
+        ("HOOK TYPE", 14),
+        ("PLUGIN", 16),
+        ("HOOK", 40),
+        ("CALLS", 6),
+        ("TOTAL", 9),
+        ("MEAN", 9),
+        ("MAX", 9),
+        ("", 4),
+    ])
+    table.print_header()
+    for stats in hook_stats.sorted():
+        table.print_row([
+            stats.hook_type,
+            stats.plugin or "-",
+            stats.hook_name,
+            stats.calls,
+            "{:.0f}ms".format(stats.total_time * 1000),
+            "{:.1f}ms".format(stats.mean_time * 1000),
+            "{:.1f}ms".format(stats.max_time * 1000),
+            YELLOW("SLOW") if stats.slow else "",
+        ])
+    click.echo("Hooks marked SLOW add more than {:.0f}ms per call on average.".format(
+        hook_stats.get_slow_threshold() * 1000,
+    ))
 
 
 # Run CLI if called directly
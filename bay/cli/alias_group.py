@@ -19,11 +19,17 @@ class SpellcheckableAliasableGroup(click.Group):
         """
         self.aliases[alias_name] = command
 
+    def list_aliases(self, ctx):
+        """
+        Returns the names of all aliases
+        """
+        return list(self.aliases.keys())
+
     def suggest_command(self, ctx, cmd_name):
         """
         Uses edit distance to suggest a command if there's no match.
         """
-        suggestion = spell_correct(cmd_name, self.list_commands(ctx) + list(self.aliases.keys()))
+        suggestion = spell_correct(cmd_name, self.list_commands(ctx) + self.list_aliases(ctx))
         if suggestion:
             ctx.fail('No such command "{cmd_name}", are you trying to run: {suggestion}?'.format(
                 cmd_name=cmd_name,
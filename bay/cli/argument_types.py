@@ -80,6 +80,8 @@ class ContainerType(SpellCorrectChoice):
 @attr.s
 class HostType(SpellCorrectChoice):
     name = 'host'
+    # Allows "all", which converts to a list of every host
+    _all = attr.ib(default=False)
 
     @cached_property
     def choices(self):
@@ -87,11 +89,16 @@ class HostType(SpellCorrectChoice):
         if not hasattr(self, "context") or not hasattr(self.context, "obj"):
             return []
         # Return valid choices
-        choices = [host.alias for host in self.context.obj.hosts]
+        choices = self.context.obj.hosts.names
+        if self._all:
+            choices = ['all'] + choices
         return sorted(choices)
 
     def convert(self, value, param, ctx):
         host_name = super(HostType, self).convert(value, param, ctx)
+        if host_name == 'all':
+            # Leave out hosts that are down rather than waiting on them
+            return self.context.obj.hosts.reachable()
         return self.context.obj.hosts[host_name]
 
 
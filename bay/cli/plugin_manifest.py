@@ -0,0 +1,172 @@
+import importlib
+import importlib.util
+import json
+import os
+
+import attr
+
+from ..version import __version__
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    importlib_metadata = None
+
+
+ENTRYPOINT_GROUP = "bay.plugins"
+
+
+def discover_entrypoints():
+    """
+    Returns an ordered dict-like list of (name, "module:attr") pairs for all
+    installed plugin entrypoints, without importing any of them.
+    """
+    if importlib_metadata is not None:
+        entrypoints = importlib_metadata.entry_points()
+        if hasattr(entrypoints, "select"):
+            group = entrypoints.select(group=ENTRYPOINT_GROUP)
+        else:
+            group = entrypoints.get(ENTRYPOINT_GROUP, [])
+        pairs = [(entrypoint.name, entrypoint.value) for entrypoint in group]
+    else:
+        # Older Pythons only have the (much slower) pkg_resources
+        import pkg_resources
+        pairs = [
+            (entrypoint.name, "{}:{}".format(entrypoint.module_name, ".".join(entrypoint.attrs)))
+            for entrypoint in pkg_resources.iter_entry_points(ENTRYPOINT_GROUP)
+        ]
+    # The same distribution can be visible more than once (e.g. egg-link and
+    # site-packages); the first one found wins, like pkg_resources does.
+    result = []
+    seen = set()
+    for name, value in pairs:
+        if name not in seen:
+            seen.add(name)
+            result.append((name, value))
+    return result
+
+
+def load_entrypoint(value):
+    """
+    Imports and returns the object referred to by a "module:attr" string.
+    """
+    module_name, _, attr_path = value.partition(":")
+    result = importlib.import_module(module_name)
+    for attr_name in attr_path.split("."):
+        result = getattr(result, attr_name)
+    return result
+
+
+def fingerprint(entrypoints):
+    """
+    Returns a value that changes whenever the set of plugins, their source
+    files or the version of Bay changes, so a stale manifest is never used.
+    """
+    modules = []
+    for name, value in entrypoints:
+        module_name = value.partition(":")[0]
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None or not spec.origin or not os.path.exists(spec.origin):
+            mtime = None
+        else:
+            mtime = os.stat(spec.origin).st_mtime
+        modules.append([name, value, mtime])
+    return {"version": __version__, "modules": modules}
+
+
+@attr.s
+class PluginManifest:
+    """
+    Cached record of what each plugin registers (commands, aliases, hooks and
+    catalog items), so plugins only need importing once something they
+    provide is actually used.
+    """
+    path = attr.ib()
+    fingerprint = attr.ib(default=None)
+    # {entrypoint name: details}, in plugin load order
+    plugins = attr.ib(default=attr.Factory(dict))
+
+    @classmethod
+    def default_path(cls):
+        return os.path.expanduser(os.environ.get("BAY_PLUGIN_MANIFEST", "~/.bay/plugin_manifest.json"))
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """
+        Loads the manifest from disk, returning None if there isn't one or it
+        does not match the passed fingerprint.
+        """
+        try:
+            with open(path, "r") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("fingerprint") != fingerprint:
+            return None
+        plugins = data.get("plugins")
+        if not isinstance(plugins, list):
+            return None
+        return cls(
+            path=path,
+            fingerprint=fingerprint,
+            plugins=dict((details["name"], details) for details in plugins),
+        )
+
+    def save(self):
+        """
+        Writes the manifest to disk. Failure to write is not fatal - we just
+        load everything eagerly again next time.
+        """
+        data = {
+            "fingerprint": self.fingerprint,
+            "plugins": sorted(self.plugins.values(), key=lambda details: details["order"]),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary_path = "{}.{}".format(self.path, os.getpid())
+            with open(temporary_path, "w") as fh:
+                json.dump(data, fh, indent=1)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            pass
+
+    def add_plugin(self, name, value, plugin, order):
+        """
+        Starts a record for a plugin that is being loaded.
+        """
+        self.plugins[name] = {
+            "name": name,
+            "class": value,
+            "order": order,
+            "provides": list(plugin.provides),
+            "requires": list(plugin.requires),
+            "commands": {},
+            "aliases": {},
+            "hooks": [],
+            "catalog_types": [],
+            "catalog_items": {},
+        }
+
+    def plugin_for(self, key, value):
+        """
+        Returns the name of the plugin whose `key` record contains `value`,
+        or None.
+        """
+        for name, details in self.plugins.items():
+            if value in details[key]:
+                return name
+        return None
+
+    def plugins_with(self, key, value):
+        """
+        Returns the names of all plugins whose `key` record contains `value`,
+        in load order.
+        """
+        return [
+            name
+            for name, details in sorted(self.plugins.items(), key=lambda item: item[1]["order"])
+            if value in details[key]
+        ]
@@ -0,0 +1,221 @@
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+import attr
+
+# Taken as early as possible so the summary can include import time
+IMPORT_STARTED = time.perf_counter()
+
+
+def profiling_requested(argv=None, environ=None):
+    """
+    Works out if --profile was passed before the click option is parsed,
+    so the profiler can already be running while plugins load.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    environ = os.environ if environ is None else environ
+    if environ.get("BAY_PROFILE", "").lower() in ("1", "true", "yes"):
+        return True
+    for arg in argv:
+        # Only options before the subcommand belong to the main group
+        if arg == "--profile":
+            return True
+        if arg == "--" or not arg.startswith("-"):
+            return False
+    return False
+
+
+@attr.s
+class Phase:
+    """
+    A single timed section of a run.
+    """
+    name = attr.ib()
+    start = attr.ib()
+    depth = attr.ib(default=0)
+    duration = attr.ib(default=None)
+    thread_name = attr.ib(default=None)
+
+
+@attr.s
+class Timings:
+    """
+    Records how long the phases of a run (import, config load, plugin load,
+    hooks, the command) take, and optionally runs cProfile over all of it.
+    """
+    started = attr.ib(default=IMPORT_STARTED)
+    phases = attr.ib(default=attr.Factory(list), init=False)
+    profiler = attr.ib(default=None, init=False)
+
+    def __attrs_post_init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.profiler is not None
+
+    def enable(self):
+        """
+        Starts collecting a cProfile profile of the main thread.
+        """
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def add(self, name, start, duration):
+        """
+        Records a phase that has already happened.
+        """
+        with self.lock:
+            self.phases.append(Phase(
+                name=name,
+                start=start,
+                duration=duration,
+                thread_name=threading.current_thread().name,
+            ))
+
+    def start(self, name):
+        """
+        Starts a phase that is finished later with finish(). Phases started
+        while another is running in the same thread are nested under it.
+        """
+        depth = getattr(self.local, "depth", 0)
+        phase = Phase(name=name, start=time.perf_counter(), depth=depth, thread_name=threading.current_thread().name)
+        self.local.depth = depth + 1
+        with self.lock:
+            self.phases.append(phase)
+        return phase
+
+    def finish(self, phase):
+        if phase.duration is None:
+            phase.duration = time.perf_counter() - phase.start
+            self.local.depth = phase.depth
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Context manager that times the body as a phase.
+        """
+        phase = self.start(name)
+        try:
+            yield phase
+        finally:
+            self.finish(phase)
+
+    def dump(self, path):
+        """
+        Stops the profiler and writes its stats out to path.
+        """
+        self.profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.profiler.dump_stats(path)
+
+    def summary(self, limit=15):
+        """
+        Returns a text summary of the phase timings and the top functions
+        by cumulative time.
+        """
+        total = time.perf_counter() - self.started
+        lines = ["Phase timings (total {:.1f}ms):".format(total * 1000)]
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase.start)
+        for phase in phases:
+            if phase.duration is None:
+                continue
+            label = "  " * (phase.depth + 1) + phase.name
+            if phase.thread_name != "MainThread":
+                label += " [{}]".format(phase.thread_name)
+            lines.append("{:<60} {:>10.1f}ms".format(label, phase.duration * 1000))
+        if self.profiler is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(limit)
+            lines.append("")
+            lines.append("Top {} functions by cumulative time (main thread only):".format(limit))
+            lines.append(stream.getvalue().strip("\n"))
+        return "\n".join(lines)
+
+
+@attr.s
+class HookTiming:
+    """
+    Accumulated run time of a single hook.
+    """
+    hook_type = attr.ib()
+    plugin = attr.ib()
+    hook_name = attr.ib()
+    slow_threshold = attr.ib(repr=False)
+    calls = attr.ib(default=0)
+    total_time = attr.ib(default=0.0)
+    max_time = attr.ib(default=0.0)
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+    @property
+    def slow(self):
+        return self.mean_time > self.slow_threshold
+
+
+def slow_hook_threshold(environ=None):
+    """
+    Returns the BAY_SLOW_HOOK_MS setting in seconds, or the default of
+    100ms if it is not set or not a number.
+    """
+    environ = os.environ if environ is None else environ
+    try:
+        return float(environ.get("BAY_SLOW_HOOK_MS", 100)) / 1000
+    except ValueError:
+        return 0.1
+
+
+@attr.s
+class HookStats:
+    """
+    Records how long each hook takes, grouped by hook type and plugin.
+    """
+    # Hooks averaging more than this many seconds a call are flagged as
+    # slow; if not given, it is read from the environment when first needed
+    slow_threshold = attr.ib(default=None)
+    timings = attr.ib(default=attr.Factory(dict), init=False)
+
+    def __attrs_post_init__(self):
+        self.lock = threading.Lock()
+
+    def get_slow_threshold(self):
+        if self.slow_threshold is None:
+            self.slow_threshold = slow_hook_threshold()
+        return self.slow_threshold
+
+    def record(self, hook_type, plugin, hook_name, duration):
+        key = (hook_type, plugin, hook_name)
+        with self.lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = HookTiming(hook_type, plugin, hook_name, self.get_slow_threshold())
+            timing.calls += 1
+            timing.total_time += duration
+            timing.max_time = max(timing.max_time, duration)
+
+    def sorted(self):
+        """
+        Returns all hook timings, by hook type and then most total time first.
+        """
+        with self.lock:
+            return sorted(self.timings.values(), key=lambda timing: (timing.hook_type, -timing.total_time))
+
+
+# One set of timings per process, as App.load_config and the import itself
+# happen before any App instance has been handed around.
+timings = Timings()
+hook_stats = HookStats()
+if profiling_requested():
+    timings.enable()
@@ -1,5 +1,9 @@
+import atexit
 import contextlib
+import itertools
+import json
 import shutil
+import sys
 import threading
 import time
 
@@ -11,6 +15,203 @@ UP_ONE = "\033[A\033[1000D"
 CLEAR_LINE = "\033[2K"
 
 console_lock = threading.Lock()
+task_ids = itertools.count(1)
+
+
+class TaskRenderer:
+    """
+    Redraws task trees that have changed at a fixed frame rate from a single
+    background thread, so task updates only mark the tree dirty rather than
+    each doing their own (slow, console-locking) redraw.
+    """
+
+    FRAME_INTERVAL = 1 / 15
+
+    def __init__(self):
+        self.roots = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def schedule(self, root):
+        """
+        Makes sure the root task will be drawn on the next frame.
+        """
+        root.dirty = True
+        with self.lock:
+            if root not in self.roots:
+                self.roots.append(root)
+            if self.thread is None:
+                self.thread = ExceptionalThread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.FRAME_INTERVAL)
+            self.flush()
+
+    def created(self, task):
+        self.schedule(task.root)
+
+    def updated(self, task, status_changed=False, progress_changed=False):
+        self.schedule(task.root)
+
+    def info(self, task, lines):
+        self.schedule(task.root)
+
+    def finished(self, task):
+        self.schedule(task.root)
+        # Draw top-level tasks finishing straight away, as the command will
+        # often print something else right after.
+        if task.parent is None or task.parent is task.root:
+            task.root.clear_and_output()
+
+    def paused(self, root, pause):
+        if pause:
+            # Get the screen up to date before something else writes to it
+            root.clear_and_output()
+        root.output_paused = pause
+        if not pause:
+            # Make the output rewrite from where it is
+            root.rendered_lines = []
+            root.clear_and_output()
+
+    def flush(self):
+        """
+        Draws any dirty root tasks right now.
+        """
+        with self.lock:
+            roots = list(self.roots)
+        for root in roots:
+            if root.dirty:
+                root.clear_and_output()
+
+
+class JsonTaskRenderer:
+    """
+    Writes one JSON object per line for each task lifecycle change rather
+    than drawing anything, for CI and other tools to consume. They go to
+    stderr, so stdout is left for the command's own output.
+
+    Pulls and builds report progress for every chunk they receive, so each
+    task's progress events are limited to one per frame, as on the terminal;
+    the latest progress is always written before the task's next status or
+    its finishing.
+    """
+
+    PROGRESS_INTERVAL = TaskRenderer.FRAME_INTERVAL
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.lock = threading.Lock()
+        # {task id: time its last progress event was written}
+        self.progress_times = {}
+        # IDs of tasks whose latest progress has not been written yet
+        self.progress_pending = set()
+
+    def emit(self, task, event, **data):
+        if task.hidden:
+            return
+        data.update({
+            "event": event,
+            "time": time.time(),
+            "task": task.id,
+            "name": task.name,
+        })
+        line = json.dumps(data, sort_keys=True)
+        with console_lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def created(self, task):
+        parent = task.parent
+        self.emit(task, "created", parent=None if parent is None or parent.hidden else parent.id)
+
+    def updated(self, task, status_changed=False, progress_changed=False):
+        if status_changed:
+            self.flush_progress(task)
+            self.emit(task, "status", status=task.status, flavor=task.status_flavor)
+        if progress_changed:
+            now = time.monotonic()
+            with self.lock:
+                due = now - self.progress_times.get(task.id, 0) >= self.PROGRESS_INTERVAL
+                if due:
+                    self.progress_times[task.id] = now
+                    self.progress_pending.discard(task.id)
+                else:
+                    self.progress_pending.add(task.id)
+            if due:
+                self.emit_progress(task)
+
+    def emit_progress(self, task):
+        self.emit(task, "progress", count=task.progress[0], total=task.progress[1])
+
+    def flush_progress(self, task):
+        """
+        Writes the task's latest progress if it was held back.
+        """
+        with self.lock:
+            pending = task.id in self.progress_pending
+            self.progress_pending.discard(task.id)
+            if pending:
+                self.progress_times[task.id] = time.monotonic()
+        if pending:
+            self.emit_progress(task)
+
+    def info(self, task, lines):
+        if lines:
+            self.emit(task, "info", lines=lines)
+
+    def finished(self, task):
+        self.flush_progress(task)
+        with self.lock:
+            self.progress_times.pop(task.id, None)
+        self.emit(
+            task,
+            "finished",
+            status=task.status,
+            flavor=task.status_flavor,
+            duration=task.finished_at - task.created_at,
+        )
+
+    def paused(self, root, pause):
+        # Lines are never rewritten, so other output can just be interleaved
+        pass
+
+    def flush(self):
+        pass
+
+
+renderer = TaskRenderer()
+# Make sure the final state of everything gets drawn
+atexit.register(lambda: renderer.flush())
+
+
+def set_output_format(output_format):
+    """
+    Picks how task progress is shown: "terminal" redraws a live tree,
+    "json" writes JSON lines, and "auto" uses json if stdout is not a TTY.
+    """
+    global renderer
+    if output_format == "auto":
+        output_format = "terminal" if sys.stdout.isatty() else "json"
+    if output_format == "json":
+        renderer = JsonTaskRenderer()
+    elif output_format == "terminal":
+        if not isinstance(renderer, TaskRenderer):
+            renderer = TaskRenderer()
+    else:
+        raise ValueError("Unknown output format {}".format(output_format))
+
+
+def new_lines(previous, lines):
+    """
+    Returns the lines at the end of `lines` that were not already in
+    `previous`, allowing for old lines having been dropped off the front.
+    """
+    for overlap in range(min(len(previous), len(lines)), 0, -1):
+        if previous[-overlap:] == lines[:overlap]:
+            return lines[overlap:]
+    return lines
 
 
 class Task:
@@ -27,7 +228,11 @@ class Task:
     FLAVOR_BAD = "bad"
     FLAVOR_WARNING = "warning"
 
+    # Hidden tasks only exist to hold other tasks
+    hidden = False
+
     def __init__(self, name, parent=None, hide_if_empty=False, collapse_if_finished=False, progress_formatter=None):
+        self.id = next(task_ids)
         self.name = name
         # If this task only displays if it has children
         self.hide_if_empty = hide_if_empty
@@ -35,6 +240,8 @@ class Task:
         self.collapse_if_finished = collapse_if_finished
         # Any parent tasks to trigger updates in
         self.parent = parent
+        # The topmost task, which does the drawing
+        self.root = self if parent is None else parent.root
         with console_lock:
             if self.parent is not None:
                 self.parent.subtasks.append(self)
@@ -52,21 +259,41 @@ class Task:
         self.extra_info = []
         # If the task is complete
         self.finished = False
-        # Number of lines we had previously cleared
-        self.cleared_lines = 0
+        # The lines we drew last frame (only used on the root task)
+        self.rendered_lines = []
+        # If the tree has changed since it was last drawn (only used on the root task)
+        self.dirty = False
         # If the output is currently "paused" for other things to write to the console
         self.output_paused = False
-        # Run update
-        self.update()
+        # Timing information, for tracing
+        self.created_at = time.time()
+        self.finished_at = None
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        # List of (time, status, flavor) for every status change
+        self.status_changes = []
+        # Tasks this one could not go ahead until they finished, for tracing
+        # the critical path; None if it does not take part in one
+        self.waited_for = None
+        renderer.created(self)
 
     def update(self, status=None, status_flavor=None, progress=None, force=False):
         """
         Update either the status message, the progress bar, or both.
-        If this is the topmost task, this will trigger a reprint on the console.
+        The console is redrawn on the renderer's next frame.
         """
         if self.finished and not force:
             raise ValueError("You cannot update() a finished task!")
         with console_lock:
+            status_changed = (status is not None and status != self.status) or (
+                status_flavor is not None and status_flavor != self.status_flavor
+            )
+            if status_changed:
+                self.status_changes.append((
+                    time.time(),
+                    self.status if status is None else status,
+                    self.status_flavor if status_flavor is None else status_flavor,
+                ))
             if status is not None:
                 self.status = status
             if progress is not None:
@@ -75,12 +302,7 @@ class Task:
                 self.progress = progress
             if status_flavor is not None:
                 self.status_flavor = status_flavor
-        # Look for a parent to potentially trigger update on, or print ourselves
-        # if there isn't one
-        if self.parent is not None:
-            self.parent.update()
-        else:
-            self.clear_and_output()
+        renderer.updated(self, status_changed=status_changed, progress_changed=progress is not None)
 
     def add_extra_info(self, message):
         """
@@ -88,17 +310,16 @@ class Task:
         """
         with console_lock:
             self.extra_info.append(message)
-        if self.parent is not None:
-            self.parent.update()
+        renderer.info(self, [message])
 
     def set_extra_info(self, messages):
         """
         Sets all extra info and triggers updates
         """
         with console_lock:
+            added = new_lines(self.extra_info, messages)
             self.extra_info = messages
-        if self.parent is not None:
-            self.parent.update()
+        renderer.info(self, added)
 
     def finish(self, **kwargs):
         """
@@ -106,7 +327,9 @@ class Task:
         Used to optimise terminal output only.
         """
         self.finished = True
+        self.finished_at = time.time()
         self.update(force=True, **kwargs)
+        renderer.finished(self)
 
     def wrapped_extra_info(self, text_width):
         """
@@ -175,49 +398,51 @@ class Task:
 
     def clear_and_output(self):
         """
-        Clears the terminal up to the right line then outputs the information
-        of the task.
+        Redraws the task on the terminal, rewriting only the lines that
+        changed since the last time it was drawn.
         """
         # See if output is paused
         if self.output_paused:
             return
         # OK, print
         with console_lock:
+            self.dirty = False
             # Get terminal width
             terminal_width = shutil.get_terminal_size((80, 20)).columns
             # Get the output we need to print
             output = list(self.output(terminal_width))
-            # Scroll the terminal down/up enough for any new lines
-            needed_lines = len(output)
-            new_lines = needed_lines - self.cleared_lines
-            if new_lines > 0:
-                print("\n" * new_lines, flush=True, end="")
-            elif new_lines < 0:
-                print(
-                    (UP_ONE + CLEAR_LINE) * abs(new_lines),
-                    flush=True,
-                    end="",
-                )
-            self.cleared_lines = needed_lines
-            # Move cursor to top of cleared section
-            print(
-                (UP_ONE + CLEAR_LINE) * needed_lines,
-                flush=True,
-                end="",
-            )
-            for line in output:
-                print(line)
+            # Find the first line that is different
+            previous = self.rendered_lines
+            first_changed = 0
+            for old_line, new_line in zip(previous, output):
+                if old_line != new_line:
+                    break
+                first_changed += 1
+            if first_changed == len(previous) == len(output):
+                return
+            # Move the cursor up to that line and rewrite changed lines from there
+            # down, stepping over any that are the same as last frame
+            parts = [UP_ONE * (len(previous) - first_changed)]
+            for index in range(first_changed, len(output)):
+                if index < len(previous) and previous[index] == output[index]:
+                    parts.append("\n")
+                else:
+                    parts.append(CLEAR_LINE + output[index] + "\n")
+            # Clear any lines left over from a longer previous frame
+            extra_lines = len(previous) - len(output)
+            if extra_lines > 0:
+                parts.append((CLEAR_LINE + "\n") * extra_lines)
+                parts.append(UP_ONE * extra_lines)
+            sys.stdout.write("".join(parts))
+            sys.stdout.flush()
+            self.rendered_lines = output
 
     def _pause_output(self, pause=True):
         """
         Allows the output to be paused and unpaused by finding the parent and doing it there.
         """
         if self.parent is None:
-            self.output_paused = pause
-            if not pause:
-                # Make the output rewrite from where it is
-                self.cleared_lines = 0
-                self.clear_and_output()
+            renderer.paused(self, pause)
         else:
             self.parent._pause_output(pause)
 
@@ -231,45 +456,13 @@ class Task:
         self._pause_output(False)
 
     @contextlib.contextmanager
-    def rate_limit(self, interval=0.1):
+    def rate_limit(self, interval=None):
         """
-        Context manager that rate-limits updates on tasks
+        Context manager that rate-limits updates on tasks. Updates are now
+        always coalesced into frames by the renderer, so this just provides
+        the task itself.
         """
-        buffered_changes = {"running": True}
-
-        # Thread loop that flushes every interval
-        def flusher():
-            while buffered_changes['running']:
-                # Do any extra_info calls
-                if "set_extra_info" in buffered_changes:
-                    self.set_extra_info(buffered_changes['set_extra_info'])
-                    del buffered_changes['set_extra_info']
-                # Do any update calls
-                if "update" in buffered_changes:
-                    self.update(**buffered_changes['update'])
-                    del buffered_changes['update']
-                # Sleep
-                time.sleep(interval)
-
-        # Fake task object to provide out
-        class BufferedTask(object):
-
-            def set_extra_info(self, extra_info):
-                self.buffered_changes['set_extra_info'] = extra_info
-
-            def update(self, **kwargs):
-                self.buffered_changes['update'] = kwargs
-
-        # Start thread that flushes every interval
-        flush_thread = ExceptionalThread(target=flusher, daemon=True)
-        flush_thread.start()
-
-        # Run inner code
-        yield BufferedTask()
-
-        # Do one more flush and exit
-        buffered_changes['running'] = False
-        flush_thread.join()
+        yield self
 
 
 class RootTask(Task):
@@ -278,6 +471,8 @@ class RootTask(Task):
     has no output of its own but encapsulates all other tasks in the app in order.
     """
 
+    hidden = True
+
     def __init__(self):
         super(RootTask, self).__init__("__root__")
 
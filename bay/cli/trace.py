@@ -0,0 +1,151 @@
+import collections
+import json
+import os
+import time
+
+
+def task_events(root_task):
+    """
+    Yields (task, parent, start, end) for every task under the root, in
+    creation order. Tasks that never finished end now.
+    """
+    now = time.time()
+    pending = collections.deque((subtask, None) for subtask in root_task.subtasks)
+    while pending:
+        task, parent = pending.popleft()
+        yield task, parent, task.created_at, task.finished_at or now
+        pending.extend((subtask, task) for subtask in task.subtasks)
+
+
+def critical_path(root_task):
+    """
+    Returns the chain of tasks that held up the end of the run the longest:
+    the last task to finish of those that record what they waited for (the
+    container starts), then whichever of those it waited for finished last,
+    and so on, earliest first. Returns [] if no task recorded that.
+    """
+    now = time.time()
+    chained = [task for task, _, _, _ in task_events(root_task) if task.waited_for is not None]
+    if not chained:
+        return []
+
+    def end(task):
+        return task.finished_at or now
+
+    path = [max(chained, key=end)]
+    while path[-1].waited_for:
+        path.append(max(path[-1].waited_for, key=end))
+    return list(reversed(path))
+
+
+def describe_critical_path(path):
+    """
+    Returns a one-line summary of the critical path, with how long each
+    task held it up from when the one before it finished.
+    """
+    now = time.time()
+    parts = []
+    previous_end = None
+    for task in path:
+        end = task.finished_at or now
+        start = task.created_at if previous_end is None else max(previous_end, task.created_at)
+        parts.append("{} ({:.1f}s)".format(task.name, end - start))
+        previous_end = end
+    return "Critical path: {}".format(" -> ".join(parts))
+
+
+def assign_lanes(spans):
+    """
+    Given a list of (start, end, key, thread_name) spans, returns
+    {key: lane number} and {lane number: lane name} such that spans in the
+    same lane are either nested or do not overlap, which is what trace
+    viewers need to draw them. Lanes are per-thread.
+    """
+    lanes = []  # (thread_name, stack of end times)
+    assignments = {}
+    for start, end, key, thread_name in sorted(spans, key=lambda span: (span[0], -span[1])):
+        for number, (lane_thread, stack) in enumerate(lanes):
+            if lane_thread != thread_name:
+                continue
+            while stack and stack[-1] <= start:
+                stack.pop()
+            if not stack or stack[-1] >= end:
+                stack.append(end)
+                assignments[key] = number
+                break
+        else:
+            lanes.append((thread_name, [end]))
+            assignments[key] = len(lanes) - 1
+    names = {}
+    counts = {}
+    for number, (thread_name, stack) in enumerate(lanes):
+        counts[thread_name] = counts.get(thread_name, 0) + 1
+        names[number] = thread_name if counts[thread_name] == 1 else "{} ({})".format(thread_name, counts[thread_name])
+    return assignments, names
+
+
+def chrome_trace(root_task):
+    """
+    Returns the task tree as a Chrome trace-event format dict, viewable in
+    chrome://tracing or Perfetto.
+    """
+    pid = os.getpid()
+    origin = root_task.created_at
+    tasks = list(task_events(root_task))
+    critical = critical_path(root_task)
+    critical_ids = set(id(task) for task in critical)
+    lanes, lane_names = assign_lanes([
+        (start, end, id(task), task.thread_name)
+        for task, parent, start, end in tasks
+    ])
+
+    def timestamp(value):
+        # Trace timestamps are in microseconds
+        return int((value - origin) * 1000000)
+
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": number, "args": {"name": name}}
+        for number, name in sorted(lane_names.items())
+    ]
+    for task, parent, start, end in tasks:
+        tid = lanes[id(task)]
+        events.append({
+            "name": task.name,
+            "cat": "task",
+            "ph": "X",
+            "ts": timestamp(start),
+            "dur": max(timestamp(end) - timestamp(start), 1),
+            "pid": pid,
+            "tid": tid,
+            "args": {
+                "parent": parent.name if parent is not None else None,
+                "status": task.status,
+                "flavor": task.status_flavor,
+                "finished": task.finished,
+                "critical_path": id(task) in critical_ids,
+            },
+        })
+        for changed_at, status, flavor in task.status_changes:
+            events.append({
+                "name": status or "",
+                "cat": "status",
+                "ph": "i",
+                "s": "t",
+                "ts": timestamp(changed_at),
+                "pid": pid,
+                "tid": tid,
+                "args": {"task": task.name, "flavor": flavor},
+            })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"critical_path": [task.name for task in critical]},
+    }
+
+
+def write_trace(root_task, path):
+    """
+    Writes the task tree out to path as a Chrome trace.
+    """
+    with open(path, "w") as fh:
+        json.dump(chrome_trace(root_task), fh)
@@ -18,6 +18,9 @@ class Config(object):
         "hosts": {
             "*": dict,
         },
+        "environments": {
+            "*": dict,
+        },
         "bay": {
             "home": str,
             "build_log_path": str,
@@ -25,13 +28,22 @@ class Config(object):
             "user_profile_home": str,
             "ssh_agent_container": str,
             "port_proxy_container": str,
+            "profile_path": str,
+            "docker_pool_size": int,
+            "docker_cheap_concurrency": int,
+            "docker_heavy_concurrency": int,
+            "docker_api_version_cache": str,
+            "docker_probe_timeout": (int, float),
+            "docker_probe_cache": str,
+            "docker_probe_cache_ttl": int,
         }
     }
 
     defaults = {
-        "hosts": {
-            "unix://localhost": {},
-        },
+        # {alias: {url, tls_cert_path, aliases, ...}}; see Host.from_config
+        "hosts": {},
+        # {name: {port_offset}}; see App.set_environment
+        "environments": {},
         "bay": {
             "home": os.path.expanduser(os.environ.get("BAY_HOME", ".")),
             "build_log_path": os.path.expanduser('~/.bay/{prefix}/build.log'),
@@ -39,9 +51,34 @@ class Config(object):
             "user_profile_home": os.path.expanduser('~/.bay'),
             "ssh_agent_container": "tugboat/ssh-agent",
             "port_proxy_container": "tugboat/port-proxy",
+            "profile_path": os.path.expanduser('~/.bay/bay.prof'),
+            "docker_pool_size": 20,
+            "docker_cheap_concurrency": 16,
+            "docker_heavy_concurrency": 4,
+            "docker_api_version_cache": os.path.expanduser('~/.bay/docker_api_versions.json'),
+            "docker_probe_timeout": 2,
+            "docker_probe_cache": os.path.expanduser('~/.bay/docker_probes.json'),
+            "docker_probe_cache_ttl": 30,
         },
     }
 
+    @classmethod
+    def default_paths(cls):
+        """
+        Returns the config files to load: the user's, then any named by
+        BAY_CONFIG (separated like PATH), later ones overriding earlier ones.
+        """
+        paths = []
+        user_path = os.path.expanduser("~/.bay/config.yaml")
+        if os.path.isfile(user_path):
+            paths.append(user_path)
+        for path in os.environ.get("BAY_CONFIG", "").split(os.pathsep):
+            if path:
+                if not os.path.isfile(path):
+                    raise BadConfigError("Config file %s from BAY_CONFIG does not exist" % path)
+                paths.append(path)
+        return paths
+
     def __init__(self, file_paths):
         self.file_paths = file_paths
         self.load()
@@ -133,6 +133,8 @@ class Container:
                     # TODO: Deprecate non-dictionary params
                     if wait_type == "time":
                         params = {"seconds": params}
+                    elif wait_type == "health":
+                        params = {}
                     else:
                         params = {"port": params}
                 self.waits.append({"type": wait_type, "params": params})
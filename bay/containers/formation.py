@@ -1,4 +1,6 @@
 import attr
+import hashlib
+import json
 import warnings
 
 from ..exceptions import ImageNotFoundException
@@ -23,13 +25,19 @@ class ContainerFormation:
     elsewhere.
     """
     graph = attr.ib(repr=False)
-    network = attr.ib(default=None)  # a string network name, defaults to graph.prefix
+    network = attr.ib(default=None)  # a string network name, defaults to graph.namespace
     _instances = attr.ib(default=attr.Factory(list), repr=False)
     container_instances = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    # Secondary indexes, kept in sync by add_instance/remove_instance so lookups
+    # by container, container name or named volume do not scan every instance.
+    # The container indexes hold a list of the container's replicas, in order.
+    _by_container = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    _by_container_name = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    _by_volume = attr.ib(default=attr.Factory(dict), init=False, repr=False)
 
     def __attrs_post_init__(self):
         if self.network is None:
-            self.network = self.graph.prefix
+            self.network = self.graph.namespace
 
         for instance in self._instances:
             self.add_instance(instance)
@@ -44,6 +52,7 @@ class ContainerFormation:
         """
         assert instance.formation is None
         self.container_instances[instance.name] = instance
+        self._index_instance(instance)
         instance.formation = self
 
     def remove_instance(self, instance):
@@ -53,15 +62,73 @@ class ContainerFormation:
         # Make sure the instance being removed is part of us
         assert instance.formation is self
         # Resolve the dependent containers so they can all be removed
-        dependent_descendency = set(dependency_sort([instance.container], self.graph.dependents)[:-1])
-        for other_instance in list(self):
-            if other_instance.container in dependent_descendency and other_instance.formation:
-                other_instance.formation = None
-                del self.container_instances[other_instance.name]
+        dependent_descendency = dependency_sort([instance.container], self.graph.dependents)[:-1]
+        for container in dependent_descendency:
+            for other_instance in list(self._by_container.get(container, [])):
+                if other_instance.formation:
+                    self._discard_instance(other_instance)
         # Remove the requested container
+        self._discard_instance(instance)
+
+    def _discard_instance(self, instance):
+        """
+        Drops a single instance from the formation and all its indexes.
+        """
         del self.container_instances[instance.name]
+        self._unindex_instance(instance)
         instance.formation = None
 
+    def _index_instance(self, instance):
+        """
+        Adds the instance to the secondary lookup indexes.
+        """
+        self._index_replica(self._by_container, instance.container, instance)
+        self._index_replica(self._by_container_name, instance.container.name, instance)
+        for source in self._volume_sources(instance):
+            self._by_volume.setdefault(source, {})[instance.name] = instance
+
+    def _index_replica(self, index, key, instance):
+        """
+        Adds the instance to the key's list of replicas in the index,
+        replacing any instance with the same name.
+        """
+        replicas = [other for other in index.get(key, []) if other.name != instance.name]
+        replicas.append(instance)
+        index[key] = sorted(replicas, key=lambda other: other.replica)
+
+    def _unindex_instance(self, instance):
+        """
+        Removes the instance from the secondary lookup indexes.
+        """
+        self._unindex_replica(self._by_container, instance.container, instance)
+        self._unindex_replica(self._by_container_name, instance.container.name, instance)
+        for source in self._volume_sources(instance):
+            users = self._by_volume.get(source, {})
+            users.pop(instance.name, None)
+            if not users:
+                self._by_volume.pop(source, None)
+
+    def _unindex_replica(self, index, key, instance):
+        """
+        Removes the instance from the key's list of replicas in the index,
+        dropping the key once it has none.
+        """
+        replicas = [other for other in index.get(key, []) if other is not instance]
+        if replicas:
+            index[key] = replicas
+        else:
+            index.pop(key, None)
+
+    def _volume_sources(self, instance):
+        """
+        Returns the names of the named volumes the instance mounts.
+        """
+        # Deprecated volumes_mount entries are plain strings rather than NamedVolumes
+        return set(
+            getattr(volume, "source", volume)
+            for volume in instance.container.named_volumes.values()
+        )
+
     def remove_instances(self, instances):
         for instance in instances:
             # Make sure that it was not removed from the formation already as a dependent
@@ -73,40 +140,120 @@ class ContainerFormation:
         Adds a container to run inside the formation along with all dependencies.
         Returns the Instance that was created for the container.
         """
-        # Get the list of all dependencies and dependency-ancestors in topological order
-        # (this also makes sure there are no cycles as a nice side effect)
-        devmodes = self.graph.options(container).get('devmodes', set())
-        dependency_ancestry = dependency_sort([container], self.graph.dependencies)[:-1]
-        direct_dependencies = self.graph.dependencies(container)
-        # Make sure all its dependencies are in the formation
-        links = {}
+        # Get the list of all dependencies and dependency-ancestors that are not
+        # yet in the formation, in topological order (this also makes sure there
+        # are no cycles as a nice side effect)
+        dependency_ancestry = dependency_sort(
+            [container] + self._missing_ancestors(container),
+            lambda c: [d for d in self.graph.dependencies(c) if d not in self._by_container],
+        )
+        dependency_ancestry.remove(container)
+        # Make sure all its dependencies are in the formation. As the ancestry is
+        # sorted, each dependency's own dependencies are always added before it.
         for dependency in dependency_ancestry:
-            # Find the container to satisfy the dependency
-            for instance in self:
-                if instance.container == dependency:
-                    break
-            else:
-                # OK, we need to make one
-                try:
-                    instance = self.add_container(dependency, host)
-                except ImageNotFoundException as e:
-                    # Annotate the error with the container
-                    e.container = dependency
-                    raise
-            if dependency in direct_dependencies:
-                links[dependency.name] = instance
+            try:
+                self._add_single_container(dependency, host)
+            except ImageNotFoundException as e:
+                # Annotate the error with the container
+                e.container = dependency
+                raise
+        return self._add_single_container(container, host)
+
+    def _missing_ancestors(self, container):
+        """
+        Returns all dependencies and dependency-ancestors of the container that
+        do not have an instance in the formation yet. The walk stops at
+        containers that are already there: their own dependencies were dealt
+        with when they were added, and a proxy's run on another host.
+        """
+        seen = {container}
+        pending = [container]
+        missing = []
+        while pending:
+            for dependency in self.graph.dependencies(pending.pop()):
+                if dependency not in seen:
+                    seen.add(dependency)
+                    if dependency not in self._by_container:
+                        pending.append(dependency)
+                        missing.append(dependency)
+        return missing
+
+    def _add_single_container(self, container, host):
+        """
+        Adds as many replicas of the container as its options ask for,
+        linking them to the existing instances of its direct dependencies.
+        Returns the first replica.
+        """
         # Look up the image hash to use in the repo
         image_id = host.images.image_version(container.image_name, container.image_tag)
-        # Make the instance
+        instances = [
+            self._add_replica(container, replica, image_id)
+            for replica in range(1, self.graph.options(container).get('replicas', 1) + 1)
+        ]
+        return instances[0]
+
+    def _add_replica(self, container, replica, image_id):
+        """
+        Adds a single instance of the container. Links go to the first
+        replica of each dependency; the others are reached through its
+        network alias.
+        """
+        devmodes = self.graph.options(container).get('devmodes', set())
+        links = {
+            dependency.name: self._by_container[dependency][0]
+            for dependency in self.graph.dependencies(container)
+        }
         instance = ContainerInstance(
-            name="{}.{}.1".format(self.graph.prefix, container.name),
+            name="{}.{}.{}".format(self.graph.namespace, container.name, replica),
             container=container,
             image_id=image_id,
             links=links,
             devmodes=devmodes,
             foreground=container.foreground,
-            environment=container.environment,
+            # Pre-start hooks add to it, so each instance needs its own
+            environment=dict(container.environment),
             mem_limit=container.mem_limit,
+            replica=replica,
+        )
+        self.add_instance(instance)
+        return instance
+
+    def scale(self, container, count, host):
+        """
+        Makes the formation run count replicas of the container, adding it
+        (and its dependencies) if it is not there. Existing replicas are kept,
+        and the highest-numbered ones removed when scaling down.
+        """
+        if count < 1:
+            raise ValueError("A container must have at least one replica; stop it instead")
+        if container not in self._by_container:
+            self.add_container(container, host)
+        replicas = {instance.replica: instance for instance in self._by_container[container]}
+        for replica, instance in replicas.items():
+            if replica > count:
+                # Nothing links to replicas other than the first, so the
+                # dependents can stay
+                self._discard_instance(instance)
+        missing = [replica for replica in range(1, count + 1) if replica not in replicas]
+        if missing:
+            image_id = host.images.image_version(container.image_name, container.image_tag)
+            for replica in missing:
+                self._add_replica(container, replica, image_id)
+
+    def add_proxy(self, container, image_id, proxy_for):
+        """
+        Adds a port proxy standing in for a container that runs on another
+        host (whose alias is proxy_for), so containers here can link to it.
+        Returns the proxy instance, or the existing instance if the container
+        is already running here.
+        """
+        if container in self._by_container:
+            return self._by_container[container][0]
+        instance = ContainerInstance(
+            name="{}.{}.proxy".format(self.graph.namespace, container.name),
+            container=container,
+            image_id=image_id,
+            proxy_for=proxy_for,
         )
         self.add_instance(instance)
         return instance
@@ -125,28 +272,30 @@ class ContainerFormation:
         """
         Returns True if the formation has an instance running the given container.
         """
-        return any(instance.container == container for instance in self)
+        return container in self._by_container
+
+    def instances_of(self, container):
+        """
+        Returns all the replicas of the container in the formation.
+        """
+        return list(self._by_container.get(container, []))
 
     def get_container_instance(self, container_name):
         """
         Given the container name (not the runtime name, the working
         human name to refer to), returns the corresponding
-        ContainerInstance.
+        ContainerInstance (the first, if it has replicas).
         """
-        for instance in self:
-            if instance.container.name == container_name:
-                return instance
-
-        raise ValueError("Could not find a running instance of {}".format(container_name))
+        try:
+            return self._by_container_name[container_name][0]
+        except KeyError:
+            raise ValueError("Could not find a running instance of {}".format(container_name))
 
     def get_instances_using_volume(self, name):
         """
         Return a list of instances that require the named volume.
         """
-        return [
-            instance for instance in self if
-            any(name == v.source for v in instance.container.named_volumes.values())
-        ]
+        return list(self._by_volume.get(name, {}).values())
 
     def __getitem__(self, key):
         return self.container_instances[key]
@@ -173,6 +322,9 @@ class ContainerInstance:
     :environment: Extra environment variables to set in the container
     :command: A custom command override (as a list of string arguments, like subprocess.call takes)
     :foreground: If True, the container is launched in the foreground and a TTY attached
+    :proxy_for: If set, this is a port proxy for the container running on the host with this alias
+    :replica: Which of the container's replicas this is, from 1
+    :applied_config_hash: For running instances, the config_hash of the instance they were started as
     """
 
     name = attr.ib(cmp=True)
@@ -185,10 +337,16 @@ class ContainerInstance:
     mem_limit = attr.ib(default=0, repr=False, cmp=False)
     command = attr.ib(default=None, repr=False, cmp=False)
     foreground = attr.ib(default=None, repr=False, cmp=False)
+    proxy_for = attr.ib(default=None, repr=False, cmp=False)
+    replica = attr.ib(default=1, repr=False, cmp=False)
+    applied_config_hash = attr.ib(default=None, repr=False, cmp=False)
     formation = attr.ib(default=None, init=False, repr=False, cmp=False)
 
     def __attrs_post_init__(self):
-        self.ports.update(dict(self.container.ports.items()))
+        # Proxies leave the real container to publish any fixed ports on its
+        # own host, and only the first replica can have them
+        if self.proxy_for is None and self.replica == 1:
+            self.ports.update(dict(self.container.ports.items()))
 
     def validate(self):
         """
@@ -222,13 +380,57 @@ class ContainerInstance:
             mem_limit=self.mem_limit,
             command=self.command,
             foreground=self.foreground,
+            proxy_for=self.proxy_for,
+            replica=self.replica,
+            applied_config_hash=self.applied_config_hash,
         )
 
+    def config_hash(self):
+        """
+        Returns a hash of everything about the instance that means its
+        container has to be recreated if it changes. It is stored as a label
+        on the container, so comparing against it needs no inspection.
+        """
+        data = {
+            "name": self.name,
+            "container": self.container.name,
+            "image_id": self.image_id,
+            "links": {alias: getattr(target, "name", target) for alias, target in self.links.items()},
+            # Whether each link is made as a Docker link or left to the network alias
+            "docker_links": sorted(self.docker_links()),
+            "devmodes": sorted(self.devmodes),
+            "ports": {str(port): host_port for port, host_port in self.ports.items()},
+            "environment": self.environment,
+            "mem_limit": self.mem_limit,
+            "command": self.command,
+            "proxy_for": self.proxy_for,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf8")).hexdigest()
+
+    def docker_links(self):
+        """
+        Returns {alias: target} for the links to make as Docker links. Links
+        to a container with several replicas are left to its network alias
+        instead, which spreads connections over them.
+        """
+        return {
+            alias: target
+            for alias, target in self.links.items()
+            if self.formation is None or isinstance(target, str) or
+            len(self.formation.instances_of(target.container)) <= 1
+        }
+
     def different_from(self, other):
         """
         Returns if the other instance is different from this one at all
         (i.e. we need to stop it and start us)
         """
+        # Foreground containers are always started afresh
+        if self.foreground or other.foreground:
+            return True
+        if other.applied_config_hash is not None:
+            return self.config_hash() != other.applied_config_hash
+        # Containers from before the label can only be compared on what introspection recovers
         return (
             self.name != other.name or
             self.container != other.container or
@@ -239,8 +441,7 @@ class ContainerInstance:
             self.environment != other.environment or
             self.mem_limit != other.mem_limit or
             self.command != other.command or
-            other.foreground or
-            self.foreground
+            self.proxy_for != other.proxy_for
         )
 
     def resolve_links(self):
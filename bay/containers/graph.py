@@ -5,6 +5,7 @@ import itertools
 import attr
 
 from ..exceptions import BadConfigError
+from ..utils.net import offset_host_port
 from .container import Container
 
 
@@ -24,6 +25,9 @@ class ContainerGraph:
     _build_dependencies = attr.ib(default=attr.Factory(dict), init=False, repr=False)
     _options = attr.ib(default=attr.Factory(dict), init=False, repr=False)
     config_path = attr.ib(init=False)
+    # The named environment formations run in, if not the default one
+    environment = attr.ib(default=None, init=False)
+    port_offset = attr.ib(default=0, init=False)
 
     def __attrs_post_init__(self):
         """
@@ -62,6 +66,33 @@ class ContainerGraph:
         if self.prefix is None:
             raise BadConfigError("No prefix set in top-level tug.yaml {}".format(self.config_path))
 
+    @property
+    def namespace(self):
+        """
+        Returns the name used for the network and as the start of container
+        names: the prefix, plus the environment if one is set.
+        """
+        if self.environment is None:
+            return self.prefix
+        return "{}-{}".format(self.prefix, self.environment)
+
+    def set_environment(self, name, port_offset=0):
+        """
+        Makes formations run in the named environment, with their own
+        network and container names, and with fixed host ports moved up by
+        port_offset so several environments can run on one host. Must be
+        called after profiles are applied, and only once.
+        """
+        if self.environment is not None:
+            raise ValueError("Environment is already set to {}".format(self.environment))
+        self.environment = name
+        self.port_offset = port_offset
+        for container in self:
+            container.ports = {
+                container_port: offset_host_port(host_port, port_offset)
+                for container_port, host_port in container.ports.items()
+            }
+
     def load_containers(self):
         """
         Loads containers from their directories.
@@ -123,6 +154,9 @@ class ContainerGraph:
         elif option == "devmodes":
             if not isinstance(value, set):
                 raise BadConfigError("Devmodes option must be a set")
+        elif option == "replicas":
+            if not isinstance(value, int) or value < 1:
+                raise BadConfigError("Replicas option must be a positive integer")
         else:
             raise BadConfigError("Unknown option %s being set" % option)
         self._options.setdefault(container, {})[option] = value
@@ -0,0 +1,186 @@
+import attr
+
+from ..exceptions import PlacementError
+from ..utils.humanize import file_size, parse_file_size
+from ..utils.sorting import dependency_sort
+from .formation import ContainerFormation
+
+
+@attr.s
+class HostCapacity:
+    """
+    How much memory a host has for containers.
+    """
+    host = attr.ib()
+    # Bytes in total
+    memory = attr.ib()
+    # Bytes already taken by containers that are not being placed
+    reserved = attr.ib(default=0)
+
+    @property
+    def available(self):
+        return self.memory - self.reserved
+
+
+@attr.s
+class Placement:
+    """
+    Which host each container was assigned to.
+    """
+    graph = attr.ib(repr=False)
+    # {container: host alias}
+    assignments = attr.ib(default=attr.Factory(dict))
+    # {container: bytes}
+    demands = attr.ib(default=attr.Factory(dict), repr=False)
+
+    def containers_on(self, alias):
+        return [container for container, host in self.assignments.items() if host == alias]
+
+    def proxies(self, alias):
+        """
+        Returns {container: host alias} for containers on other hosts that
+        containers on this host link to, and so need a proxy here.
+        """
+        result = {}
+        for container in self.containers_on(alias):
+            for dependency in self.graph.dependencies(container):
+                if self.assignments[dependency] != alias:
+                    result[dependency] = self.assignments[dependency]
+        return result
+
+    def add_to_formation(self, formation, host, proxy_image_id):
+        """
+        Adds the containers placed on the host to its formation, along with
+        proxies for the containers on other hosts they link to.
+        """
+        for container, remote_alias in sorted(self.proxies(host.alias).items(), key=lambda item: item[0].name):
+            formation.add_proxy(container, proxy_image_id, remote_alias)
+        # Dependencies first, so none are added twice
+        containers = dependency_sort(self.containers_on(host.alias), self.graph.dependencies)
+        for container in containers:
+            if self.assignments.get(container) == host.alias and not formation.has_container(container):
+                formation.add_container(container, host)
+        return formation
+
+    def formation_for(self, host, proxy_image_id):
+        """
+        Returns a new formation for the containers placed on the host.
+        """
+        return self.add_to_formation(ContainerFormation(self.graph), host, proxy_image_id)
+
+
+@attr.s
+class PlacementPlanner:
+    """
+    Spreads containers over hosts so each host's memory is not exceeded,
+    keeping linked containers together where they fit so as few links as
+    possible cross hosts (each of which needs a port proxy).
+
+    A container's memory demand is the larger of its mem_limit and its
+    measured usage, or default_demand if neither is known, for each of its
+    replicas. Containers that share a named volume go on the same host, and
+    ones that mount local directories go on the local host (the first
+    capacity given).
+
+    Proxies can only forward the ports a container publishes, so containers
+    that publish none (the unexposed ones) go on the same host as the
+    containers linking to them.
+    """
+    graph = attr.ib()
+    # HostCapacity objects, in order of preference
+    capacities = attr.ib()
+    # {container name: bytes} measured from running instances
+    usage = attr.ib(default=attr.Factory(dict))
+    default_demand = attr.ib(default=256 * 1024 ** 2)
+    # Containers whose images expose no ports
+    unexposed = attr.ib(default=attr.Factory(set))
+
+    def demand(self, container):
+        """
+        Returns the memory the container needs, in bytes, across all its replicas.
+        """
+        each = max(parse_file_size(container.mem_limit or 0), self.usage.get(container.name, 0)) or self.default_demand
+        return each * self.graph.options(container).get("replicas", 1)
+
+    def pinned(self, container):
+        """
+        Says if the container has to run on the local host.
+        """
+        return bool(
+            container.bound_volumes or
+            self.graph.options(container).get("devmodes") or
+            container.foreground
+        )
+
+    def groups(self, containers):
+        """
+        Splits the containers into groups that must share a host, because
+        they share named volumes, or one links to the other and cannot be
+        reached through a proxy.
+        """
+        group_of = {container: {container} for container in containers}
+        by_volume = {}
+        for container in containers:
+            for volume in container.named_volumes.values():
+                by_volume.setdefault(getattr(volume, "source", volume), []).append(container)
+        together = list(by_volume.values())
+        for container in containers:
+            if container in self.unexposed:
+                together.append([container] + [
+                    dependent for dependent in self.graph.dependents(container)
+                    if dependent in group_of
+                ])
+        for sharers in together:
+            merged = set()
+            for container in sharers:
+                merged |= group_of[container]
+            for container in merged:
+                group_of[container] = merged
+        # Each distinct group once, in a stable order
+        groups = {id(group): group for group in group_of.values()}
+        return [sorted(group, key=lambda c: c.name) for group in groups.values()]
+
+    def plan(self, containers):
+        """
+        Returns a Placement of the containers and all their dependencies.
+        """
+        if not self.capacities:
+            raise PlacementError("There are no hosts to place containers on")
+        containers = dependency_sort(list(containers), self.graph.dependencies)
+        placement = Placement(self.graph)
+        placement.demands = {container: self.demand(container) for container in containers}
+        free = {capacity.host.alias: capacity.available for capacity in self.capacities}
+        local_alias = self.capacities[0].host.alias
+        # Biggest first, so the small ones fill the gaps (first fit decreasing)
+        groups = sorted(
+            self.groups(containers),
+            key=lambda group: (-sum(placement.demands[c] for c in group), group[0].name),
+        )
+        for group in groups:
+            demand = sum(placement.demands[c] for c in group)
+            if any(self.pinned(container) for container in group):
+                candidates = [local_alias]
+            else:
+                candidates = [capacity.host.alias for capacity in self.capacities]
+            candidates = [alias for alias in candidates if free[alias] >= demand]
+            if not candidates:
+                raise PlacementError("Cannot fit {} ({}) on any host".format(
+                    ", ".join(container.name for container in group),
+                    file_size(demand),
+                ))
+
+            # Prefer the host with the most links to what is already there,
+            # then the one with the most room
+            def score(alias):
+                links = 0
+                for container in group:
+                    for other in self.graph.dependencies(container) | self.graph.dependents(container):
+                        if placement.assignments.get(other) == alias:
+                            links += 1
+                return (links, free[alias])
+
+            alias = max(candidates, key=score)
+            for container in group:
+                placement.assignments[container] = alias
+            free[alias] -= demand
+        return placement
@@ -74,6 +74,8 @@ class Profile:
                 self.containers[name]["links"]["required"].extend(details["extra_links"])
             if "mem_limit" in details:
                 self.containers[name]["mem_limit"] = details["mem_limit"]
+            if "replicas" in details:
+                self.containers[name]["replicas"] = details["replicas"]
 
     def dump(self):
         data = {
@@ -161,6 +163,12 @@ class Profile:
                 container.environment[key] = value
             if "mem_limit" in details:
                 container.mem_limit = details["mem_limit"]
+            # Set how many copies of the container to run
+            if details.get("replicas"):
+                try:
+                    self.graph.set_option(container, "replicas", int(details["replicas"]))
+                except ValueError:
+                    raise BadConfigError("Profile contains invalid replicas for {}".format(name))
 
     def calculate_links(self, container):
         """
@@ -0,0 +1,530 @@
+import hashlib
+import json
+import os
+import selectors
+import shutil
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import traceback
+
+from .version import __version__
+
+
+# Each frame is a one-byte type, a four-byte length, then the payload
+FRAME_HEADER = struct.Struct("!cI")
+FRAME_REQUEST = b"q"
+FRAME_STATUS = b"s"
+FRAME_STOP = b"k"
+FRAME_STDOUT = b"o"
+FRAME_STDERR = b"e"
+FRAME_EXIT = b"x"
+FRAME_REFUSED = b"r"
+
+# Commands that need the user's terminal, or manage the daemon itself, always run locally
+LOCAL_COMMANDS = {"attach", "daemon", "shell"}
+# Global options that only make sense in the local process
+LOCAL_OPTIONS = {"--profile"}
+# Global options that take a value, which must not be read as the subcommand;
+# kept in step with the options of bay.cli.cli, which is too slow to import here
+GLOBAL_VALUE_OPTIONS = {"--api-stats-json", "--environment", "--output-format", "--trace"}
+# Commands that start containers, which run locally if that might need the
+# user's terminal (for a foreground container, or an SSH key passphrase)
+STARTING_COMMANDS = {
+    "build", "hup", "mount", "reload", "restart", "resume", "run", "scale", "start", "umount", "unmount", "up",
+}
+
+
+def config_home():
+    """
+    Returns the Bay home directory the config says to use, which is what
+    `bay daemon start` serves; config files can set it as well as BAY_HOME.
+    """
+    from .config import Config
+    return Config(Config.default_paths())["bay"]["home"]
+
+
+def socket_path(home=None):
+    """
+    Returns the path of the daemon socket for the given Bay home directory
+    (by default, the configured one). Each project directory gets its own daemon.
+    """
+    home = os.path.realpath(os.path.expanduser(home or config_home()))
+    digest = hashlib.sha1(home.encode("utf8")).hexdigest()[:12]
+    return os.path.join(os.path.expanduser("~/.bay/daemons"), "{}.sock".format(digest))
+
+
+def graph_fingerprint(home):
+    """
+    Returns a value that changes if any of the files the container graph or
+    config is loaded from change, so a daemon can tell when to reload it.
+    """
+    paths = [os.path.join(home, "bay.yaml"), os.path.join(home, "tug.yaml")]
+    paths.append(os.path.expanduser("~/.bay/config.yaml"))
+    paths.extend(filter(None, os.environ.get("BAY_CONFIG", "").split(os.pathsep)))
+    for name in sorted(os.listdir(home)):
+        container_path = os.path.join(home, name)
+        if os.path.isdir(container_path):
+            paths.extend(
+                os.path.join(container_path, filename)
+                for filename in ("Dockerfile", "bay.yaml", "tug.yaml")
+            )
+    result = []
+    for path in paths:
+        try:
+            result.append((path, os.stat(path).st_mtime))
+        except OSError:
+            pass
+    return result
+
+
+def send_frame(sock, kind, payload=b""):
+    sock.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def receive_exactly(sock, size):
+    """
+    Reads exactly size bytes from the socket, or returns None if it closes first.
+    """
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def receive_frame(sock):
+    """
+    Returns (kind, payload) for the next frame, or (None, None) if the socket closed.
+    """
+    header = receive_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None, None
+    kind, length = FRAME_HEADER.unpack(header)
+    payload = receive_exactly(sock, length)
+    if payload is None:
+        return None, None
+    return kind, payload
+
+
+def exit_code(status):
+    """
+    Turns a waitpid() status into a shell-style exit code.
+    """
+    if os.WIFSIGNALED(status):
+        return 128 + os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+# Client
+
+
+def connect(path=None):
+    """
+    Returns a socket connected to the daemon, or None if it is not running.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def global_options(argv):
+    """
+    Splits the command line into the names of the global options before the
+    subcommand, and the subcommand (or None if there is not one).
+    """
+    options = []
+    args = iter(argv)
+    for arg in args:
+        if not arg.startswith("-"):
+            return options, arg
+        name = arg.split("=", 1)[0]
+        options.append(name)
+        if name in GLOBAL_VALUE_OPTIONS and "=" not in arg:
+            # Skip over the option's value
+            next(args, None)
+    return options, None
+
+
+def command_name(argv):
+    """
+    Returns the subcommand of the command line, which is its first argument
+    that is not a global option or an option's value.
+    """
+    return global_options(argv)[1]
+
+
+def should_forward(argv, environ=None):
+    """
+    Says if this command line can be run by the daemon.
+    """
+    environ = os.environ if environ is None else environ
+    if environ.get("BAY_NO_DAEMON"):
+        return False
+    options, command = global_options(argv)
+    if LOCAL_OPTIONS.intersection(options):
+        return False
+    return command not in LOCAL_COMMANDS
+
+
+def forward(argv, path=None):
+    """
+    Runs the command line in the daemon, streaming its output back. Returns
+    the exit code, or None if the daemon is not running or refused the
+    command (so it should be run locally).
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    environ = dict(os.environ)
+    tty = sys.stdout.isatty()
+    if tty:
+        # The daemon's output is a pipe, so pass the terminal size through
+        size = shutil.get_terminal_size()
+        environ.setdefault("COLUMNS", str(size.columns))
+        environ.setdefault("LINES", str(size.lines))
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": environ,
+        "tty": tty,
+        "version": __version__,
+    }
+    with sock:
+        try:
+            send_frame(sock, FRAME_REQUEST, json.dumps(request).encode("utf8"))
+            while True:
+                kind, payload = receive_frame(sock)
+                if kind == FRAME_STDOUT:
+                    sys.stdout.buffer.write(payload)
+                    sys.stdout.buffer.flush()
+                elif kind == FRAME_STDERR:
+                    sys.stderr.buffer.write(payload)
+                    sys.stderr.buffer.flush()
+                elif kind == FRAME_EXIT:
+                    return int(payload)
+                elif kind == FRAME_REFUSED:
+                    return None
+                else:
+                    sys.stderr.write("Lost connection to the bay daemon.\n")
+                    return 1
+        except KeyboardInterrupt:
+            # Closing the socket makes the daemon interrupt the command
+            return 130
+
+
+def request(kind, path=None):
+    """
+    Sends a control request (status or stop) to the daemon and returns the
+    decoded reply, or None if it is not running.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock:
+        send_frame(sock, kind)
+        reply_kind, payload = receive_frame(sock)
+    if reply_kind is None:
+        return None
+    return json.loads(payload.decode("utf8"))
+
+
+def main():
+    """
+    Console entrypoint. Hands the command to a running daemon if there is
+    one, otherwise imports and runs Bay normally.
+    """
+    argv = sys.argv[1:]
+    if should_forward(argv):
+        try:
+            path = socket_path()
+        except Exception:
+            # The config cannot be loaded; run locally, so the cli reports why
+            path = None
+        code = forward(argv, path) if path is not None else None
+        if code is not None:
+            sys.exit(code)
+    from .cli import cli
+    cli()
+
+
+# Server
+
+
+class Job:
+    """
+    A command being run by a forked child of the daemon.
+    """
+
+    def __init__(self, pid, conn, outputs):
+        self.pid = pid
+        self.conn = conn
+        # {fd: frame type}
+        self.outputs = outputs
+        self.client_gone = False
+
+
+class DaemonServer:
+    """
+    Keeps a loaded App (plugins, config, container graph and Docker clients)
+    in memory, and runs each command it is sent in a fork of itself so the
+    command starts with all of that already done.
+    """
+
+    def __init__(self, app, path, idle_timeout=3600):
+        self.app = app
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.jobs = {}
+        self.running = False
+        self.started = time.time()
+        self.commands_run = 0
+
+    def warm(self):
+        """
+        Loads everything a command would need, so forks inherit it.
+        """
+        for name in list(self.app.manifest.plugins):
+            self.app.load_plugin(name)
+        if getattr(self.app, "hosts", None) is not None:
+            # Watchers hold instances from the old graph
+            for host in self.app.hosts:
+                if host.watcher is not None:
+                    host.watcher.stop()
+        self.app.load_config()
+        self.fingerprint = graph_fingerprint(self.app.containers.path)
+        for host in self.app.hosts.reachable(refresh=True):
+            try:
+                # Keep the state of each host current, so commands start
+                # with it rather than introspecting. This also caches the
+                # API version, so children's own clients need not ask.
+                self.app.get_watcher(host)
+            except Exception:
+                pass
+
+    def refresh(self):
+        """
+        Reloads the config and graph if any of their files changed.
+        """
+        fingerprint = graph_fingerprint(self.app.containers.path)
+        if fingerprint != self.fingerprint:
+            self.warm()
+
+    def serve(self):
+        # The socket runs commands as this user, so only they may reach it
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        os.chmod(os.path.dirname(self.path), 0o700)
+        if os.path.exists(self.path):
+            if connect(self.path) is not None:
+                raise RuntimeError("A bay daemon is already running at {}".format(self.path))
+            os.unlink(self.path)
+        self.warm()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        previous_umask = os.umask(0o077)
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(previous_umask)
+        self.listener.listen(16)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ, self.accept)
+        self.running = True
+        last_activity = time.monotonic()
+        try:
+            while self.running:
+                for key, mask in self.selector.select(timeout=1):
+                    key.data(key.fileobj)
+                    last_activity = time.monotonic()
+                if self.jobs:
+                    last_activity = time.monotonic()
+                elif self.idle_timeout and time.monotonic() - last_activity > self.idle_timeout:
+                    break
+        finally:
+            self.selector.close()
+            self.listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def accept(self, listener):
+        conn, _ = listener.accept()
+        conn.settimeout(5)
+        try:
+            kind, payload = receive_frame(conn)
+        except OSError:
+            conn.close()
+            return
+        conn.settimeout(None)
+        if kind == FRAME_STATUS:
+            send_frame(conn, FRAME_STATUS, json.dumps(self.status()).encode("utf8"))
+            conn.close()
+        elif kind == FRAME_STOP:
+            self.running = False
+            send_frame(conn, FRAME_STOP, json.dumps(self.status()).encode("utf8"))
+            conn.close()
+        elif kind == FRAME_REQUEST:
+            request = json.loads(payload.decode("utf8"))
+            if request.get("version") != __version__ or self.needs_terminal(request):
+                # A different version of bay is installed, or the command
+                # cannot run without the client's terminal; let it run locally
+                send_frame(conn, FRAME_REFUSED)
+                conn.close()
+                return
+            self.refresh()
+            self.start_job(conn, request)
+        else:
+            conn.close()
+
+    def needs_terminal(self, request):
+        """
+        Says if the command may need the client's terminal, which a forked
+        child cannot reach: starting a foreground container attaches to it,
+        and plugins may need to prompt for things.
+        """
+        if command_name(request["argv"]) not in STARTING_COMMANDS:
+            return False
+        if any(container.foreground for container in self.app.containers):
+            return True
+        return any(plugin.needs_terminal() for plugin in self.app.plugins.values())
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "version": __version__,
+            "home": self.app.containers.path,
+            "uptime": time.time() - self.started,
+            "commands_run": self.commands_run,
+            "running": len(self.jobs),
+        }
+
+    def start_job(self, conn, request):
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(stdout_read)
+                os.close(stderr_read)
+                self.selector.close()
+                self.listener.close()
+                conn.close()
+                code = self.run_command(request, stdout_write, stderr_write)
+            finally:
+                os._exit(code)
+        os.close(stdout_write)
+        os.close(stderr_write)
+        self.commands_run += 1
+        job = Job(pid, conn, {stdout_read: FRAME_STDOUT, stderr_read: FRAME_STDERR})
+        self.jobs[pid] = job
+        for fd in job.outputs:
+            self.selector.register(fd, selectors.EVENT_READ, lambda fd, job=job: self.relay(job, fd))
+        self.selector.register(conn, selectors.EVENT_READ, lambda conn, job=job: self.client_closed(job))
+
+    def relay(self, job, fd):
+        """
+        Sends output from the child to its client, finishing the job once
+        the child has closed all its outputs.
+        """
+        data = os.read(fd, 65536)
+        if data:
+            if not job.client_gone:
+                try:
+                    send_frame(job.conn, job.outputs[fd], data)
+                except OSError:
+                    self.client_closed(job)
+            return
+        self.selector.unregister(fd)
+        os.close(fd)
+        del job.outputs[fd]
+        if not job.outputs:
+            _, status = os.waitpid(job.pid, 0)
+            del self.jobs[job.pid]
+            if not job.client_gone:
+                self.selector.unregister(job.conn)
+                try:
+                    send_frame(job.conn, FRAME_EXIT, str(exit_code(status)).encode("ascii"))
+                except OSError:
+                    pass
+            job.conn.close()
+
+    def client_closed(self, job):
+        """
+        Called when the client sends anything or disconnects, which only
+        happens when it has been interrupted; interrupts the command too.
+        """
+        if job.client_gone:
+            return
+        job.client_gone = True
+        self.selector.unregister(job.conn)
+        try:
+            os.kill(job.pid, signal.SIGINT)
+        except OSError:
+            pass
+
+    def run_command(self, request, stdout_fd, stderr_fd):
+        """
+        Runs in the forked child: sets up the client's environment and
+        output, then runs the command line and returns its exit code.
+        """
+        from .cli import App, cli
+        from .cli import profiling, tasks
+
+        # Point output at the relay pipes and give the command no input
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", buffering=1, encoding="utf8", closefd=False)
+        sys.stderr = open(2, "w", buffering=1, encoding="utf8", closefd=False)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        # Match the client's environment
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        if request["tty"]:
+            os.environ.setdefault("BAY_OUTPUT_FORMAT", "terminal")
+        sys.argv = ["bay"] + request["argv"]
+        # Config and graph were loaded before forking; task state was not
+        App.preloaded = True
+        # Other threads (the watchers) may have held locks at the fork, and
+        # the renderer's thread is not carried over; replace them before
+        # anything (the root task) uses them
+        tasks.console_lock = threading.Lock()
+        tasks.renderer = tasks.TaskRenderer()
+        profiling.timings.lock = threading.Lock()
+        profiling.hook_stats.lock = threading.Lock()
+        App.root_task = tasks.RootTask()
+        self.app.after_fork()
+        try:
+            cli.main(args=request["argv"], prog_name="bay", color=True if request["tty"] else None)
+            code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                code = e.code or 0
+            else:
+                sys.stderr.write("{}\n".format(e.code))
+                code = 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        tasks.renderer.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return code
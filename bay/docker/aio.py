@@ -0,0 +1,614 @@
+import asyncio
+import concurrent.futures
+import functools
+import json
+import sys
+import time
+import urllib.parse
+import warnings
+
+from .api_stats import normalize_endpoint
+from .introspect import FormationIntrospector
+from .runner import FormationRunner, changing_containers
+from .towline import Towline
+from ..cli.tasks import Task
+from ..containers.formation import ContainerFormation
+from ..constants import PluginHook
+from ..exceptions import ContainerBootFailure, DockerInteractiveException, DockerRuntimeError
+
+
+class AsyncApiError(DockerRuntimeError):
+    """
+    Raised when the Docker API returns an error status.
+    """
+
+    def __init__(self, status, message):
+        super(AsyncApiError, self).__init__("Docker API error {}: {}".format(status, message))
+        self.status = status
+
+
+class AsyncDockerClient:
+    """
+    A small asyncio HTTP/1.1 client for the Docker API over its unix socket,
+    which keeps connections alive and shares them between coroutines. Only
+    the calls the async runner needs are here; everything else still goes
+    through the host's normal client.
+    """
+
+    def __init__(self, socket_path, version, pool_size=10, timeout=42, api_stats=None):
+        self.socket_path = socket_path
+        self.version = version
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.api_stats = api_stats
+        self.idle = []
+        self.slots = None
+
+    @classmethod
+    def for_host(cls, host):
+        """
+        Makes a client for the host. Raises ValueError if it is not reached
+        over a unix socket, in which case the threaded runner should be used.
+        """
+        if host.url_scheme != "unix":
+            raise ValueError("Async Docker access is only supported over unix sockets")
+        return cls(
+            socket_path=urllib.parse.urlparse(host.url).path,
+            # Use the version the normal client negotiated (or cached)
+            version=host.client.api_version,
+            pool_size=host.pool_size,
+            api_stats=host.api_stats,
+        )
+
+    async def close(self):
+        """
+        Closes idle connections. Must be called before the event loop closes.
+        """
+        while self.idle:
+            self.idle.pop()[1].close()
+        self.slots = None
+
+    async def request(self, method, path, params=None, body=None, timeout=None):
+        """
+        Makes a request and returns (status, body bytes).
+        """
+        if self.slots is None:
+            # Made here so it belongs to the running event loop
+            self.slots = asyncio.Semaphore(self.pool_size)
+        url = "/v{}{}".format(self.version, path)
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        start = time.perf_counter()
+        status = 599
+        response_body = b""
+        async with self.slots:
+            try:
+                status, response_body = await asyncio.wait_for(
+                    self.send(method, url, body),
+                    timeout or self.timeout,
+                )
+            finally:
+                if self.api_stats is not None:
+                    self.api_stats.record(
+                        normalize_endpoint(method, url),
+                        time.perf_counter() - start,
+                        bytes_received=len(response_body),
+                        error=status >= 400,
+                    )
+        return status, response_body
+
+    async def send(self, method, url, body):
+        if self.idle:
+            reader, writer = self.idle.pop()
+        else:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            data = json.dumps(body).encode("utf8") if body is not None else b""
+            writer.write((
+                "{} {} HTTP/1.1\r\n"
+                "Host: docker\r\n"
+                "Content-Type: application/json\r\n"
+                "Content-Length: {}\r\n"
+                "\r\n"
+            ).format(method, url, len(data)).encode("ascii") + data)
+            status, headers, response_body = await self.read_response(reader)
+        except BaseException:
+            # Including cancellation - the connection is in an unknown state
+            writer.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self.idle.append((reader, writer))
+        return status, response_body
+
+    async def read_response(self, reader):
+        header_block = await reader.readuntil(b"\r\n\r\n")
+        lines = header_block.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        if status in (204, 304) or 100 <= status < 200:
+            return status, headers, b""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            return status, headers, b"".join(chunks)
+        if "content-length" in headers:
+            return status, headers, await reader.readexactly(int(headers["content-length"]))
+        headers["connection"] = "close"
+        return status, headers, await reader.read()
+
+    async def json(self, method, path, params=None, body=None, timeout=None):
+        """
+        Makes a request and returns the decoded JSON response, raising
+        AsyncApiError for error statuses.
+        """
+        status, response_body = await self.request(method, path, params, body, timeout)
+        if status >= 400:
+            try:
+                message = json.loads(response_body.decode("utf8"))["message"]
+            except (ValueError, KeyError, TypeError):
+                message = response_body.decode("utf8", "replace")
+            raise AsyncApiError(status, message)
+        if not response_body:
+            return None
+        return json.loads(response_body.decode("utf8"))
+
+    # API calls
+
+    async def containers(self, filters=None):
+        params = {"filters": json.dumps(filters)} if filters else None
+        return await self.json("GET", "/containers/json", params)
+
+    async def inspect_container(self, name):
+        return await self.json("GET", "/containers/{}/json".format(name))
+
+    async def container_state(self, name):
+        """
+        Returns the State part of the container's inspection, or None if it
+        does not exist.
+        """
+        try:
+            details = await self.inspect_container(name)
+        except AsyncApiError as e:
+            if e.status == 404:
+                return None
+            raise
+        return details["State"]
+
+    async def container_running(self, name):
+        """
+        Says if the named container is running, returning False if it does
+        not exist.
+        """
+        state = await self.container_state(name)
+        return state is not None and state["Running"]
+
+    async def start(self, container_id):
+        await self.json("POST", "/containers/{}/start".format(container_id))
+
+    async def stop(self, name, timeout=10):
+        # Stopping waits up to timeout seconds for the container to exit
+        await self.json("POST", "/containers/{}/stop".format(name), {"t": timeout}, timeout=self.timeout + timeout)
+
+    async def pause(self, name):
+        await self.json("POST", "/containers/{}/pause".format(name))
+
+    async def unpause(self, name):
+        await self.json("POST", "/containers/{}/unpause".format(name))
+
+    async def get_archive(self, name, path):
+        """
+        Returns a tar archive of the path in the container, or None if the
+        container or path does not exist.
+        """
+        status, body = await self.request("GET", "/containers/{}/archive".format(name), {"path": path})
+        if status == 404:
+            return None
+        if status >= 400:
+            raise AsyncApiError(status, body.decode("utf8", "replace"))
+        return body
+
+
+class AsyncIntrospector(FormationIntrospector):
+    """
+    Introspector that makes its Docker calls through an AsyncDockerClient,
+    looking at every container concurrently.
+    """
+
+    def __init__(self, host, graph, client, network=None):
+        super(AsyncIntrospector, self).__init__(host, graph, network)
+        self.client = client
+
+    async def introspect_async(self):
+        """
+        Runs the introspection and returns a ContainerFormation.
+        """
+        self.formation = ContainerFormation(self.graph, self.network)
+        summaries = [
+            container
+            for container in await self.client.containers()
+            if self.network in container["NetworkSettings"]["Networks"]
+        ]
+        # Only containers without the labels need inspecting
+        names = [
+            summary["Names"][0].lstrip("/")
+            for summary in summaries
+            if not self.is_labelled(summary)
+        ]
+        details = dict(zip(names, await asyncio.gather(*[self.client.inspect_container(name) for name in names])))
+        for summary in summaries:
+            name = summary["Names"][0].lstrip("/")
+            try:
+                if name in details:
+                    self.formation.add_instance(self.instance_from_details(name, details[name]))
+                else:
+                    self.formation.add_instance(self.instance_from_summary(name, summary))
+            except self.ContainerNotFound as e:
+                warnings.warn(e.args[0])
+        for instance in self.formation:
+            instance.resolve_links()
+        return self.formation
+
+    async def introspect_single_container_async(self, name):
+        """
+        Returns a single container introspected directly.
+        """
+        details = await self.client.containers(filters={"name": [name]})
+        if not details:
+            raise DockerRuntimeError("Cannot introspect single container {}".format(name))
+        summary = next((d for d in details if d["Names"][0].lstrip("/") == name), details[0])
+        container_name = summary["Names"][0].lstrip("/")
+        if self.is_labelled(summary):
+            return self.instance_from_summary(container_name, summary)
+        return self.instance_from_details(container_name, await self.client.inspect_container(container_name))
+
+
+class AsyncTowline(Towline):
+    """
+    Towline that checks on the container through an AsyncDockerClient.
+    """
+
+    def __init__(self, host, client, container_name, container_id=None, started_at=None):
+        super(AsyncTowline, self).__init__(host, container_name, container_id, started_at)
+        self.client = client
+
+    async def _read_file_async(self, path, default=None):
+        tar_data = await self.client.get_archive(self.container_name, path)
+        if tar_data is None:
+            return default
+        return self.file_contents(tar_data, default, self.started_at)
+
+    async def status_async(self):
+        """
+        Returns the container's current status as a (finished, message) tuple,
+        like status.
+        """
+        if self.host.watcher is not None and self.container_id is not None:
+            if self.host.watcher.has_exited(self.container_id):
+                if not await self.client.container_running(self.container_name):
+                    return (False, "Container died during boot")
+        else:
+            try:
+                details = await self.client.inspect_container(self.container_name)
+            except AsyncApiError as e:
+                if e.status == 404:
+                    return (False, "Container does not exist")
+                raise
+            if not details["State"]["Running"]:
+                return (False, "Container died during boot")
+        if self._first_try is None:
+            self._first_try = time.time()
+        container_status = await self._read_file_async("/tugboat/boot_status")
+        if container_status is None and time.time() - self._first_try > self.NO_TOWLINE_TIMEOUT:
+            return (True, "Non-towline boot complete")
+        return self.parse_status(container_status, await self._read_file_async("/tugboat/boot_complete"))
+
+
+class AsyncRunContext:
+    """
+    The RunContext as seen by the hooks an AsyncFormationRunner runs, with
+    the runner's event loop so they can schedule work on it. Everything else
+    is the shared context's. Each runner has its own, as the loop must not be
+    shared: runners can run inside hooks of other runners.
+    """
+
+    def __init__(self, context, loop):
+        self.context = context
+        self.loop = loop
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
+class AsyncFormationRunner(FormationRunner):
+    """
+    FormationRunner that runs each batch of container starts or stops as
+    coroutines on one event loop rather than a thread per container. Docker
+    calls, towline polling and wait probes are multiplexed on the loop; the
+    first failure cancels everything else in the batch.
+
+    Creating containers (which uses docker-py to build the configuration)
+    still runs in a small thread pool, ahead of starting as in
+    FormationRunner. Plugin hooks run in a pool of their own with a thread
+    per container, as POST_START waits hold theirs until the container is
+    ready.
+    """
+
+    def __init__(self, app, host, formation, task, stop=True, max_threads=8):
+        super(AsyncFormationRunner, self).__init__(app, host, formation, task, stop=stop)
+        self.client = AsyncDockerClient.for_host(host)
+        self.max_threads = max_threads
+        self.to_prepare = set()
+
+    def parallel_execute(self, instances, ready_to_execute, executor, done=None):
+        """
+        Runs the async version of "executor" on "instances" when the
+        condition "ready_to_execute" is met for an instance.
+        """
+        async_executor = getattr(self, "{}_async".format(executor.__name__))
+        self.loop = asyncio.new_event_loop()
+        self.thread_pool = concurrent.futures.ThreadPoolExecutor(self.max_threads)
+        self.hook_pool = concurrent.futures.ThreadPoolExecutor(max(1, len(instances)))
+        # Lets hooks (waits) schedule work on our loop
+        self.hook_context = AsyncRunContext(self.context, self.loop)
+        try:
+            self.loop.run_until_complete(self.execute_async(instances, ready_to_execute, async_executor, done))
+        except DockerInteractiveException as e:
+            e.handler()
+            sys.exit(0)
+        finally:
+            self.loop.run_until_complete(self.client.close())
+            self.loop.close()
+            self.thread_pool.shutdown(wait=False)
+            self.hook_pool.shutdown(wait=False)
+
+    async def execute_async(self, instances, ready_to_execute, executor, done=None):
+        # Containers to start are created ahead, as soon as the loop runs
+        self.prepared = {
+            instance: asyncio.ensure_future(self.prepare_async(instance))
+            for instance in self.to_prepare
+        }
+        self.to_prepare = set()
+        try:
+            await self.execute_ready_async(instances, ready_to_execute, executor, done)
+        except BaseException:
+            await self.abandon_prepared_async()
+            raise
+        finally:
+            # Collect any that were not needed because something failed
+            for task in self.prepared.values():
+                task.cancel()
+            await asyncio.gather(*self.prepared.values(), return_exceptions=True)
+
+    async def execute_ready_async(self, instances, ready_to_execute, executor, done=None):
+        queued = set(instances)
+        done = done or set()
+        running = {}
+        while queued or running:
+            for instance in list(queued):
+                if ready_to_execute(instance, done):
+                    running[asyncio.ensure_future(executor(instance))] = instance
+                    queued.remove(instance)
+            if not running:
+                raise DockerRuntimeError(
+                    "Deadlock: Cannot start or stop any of {}.".format(
+                        ", ".join(i.name for i in queued),
+                    ),
+                )
+            finished, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                instance = running.pop(future)
+                if future.exception() is not None:
+                    # Cancel everything else, then report this failure
+                    for other in running:
+                        other.cancel()
+                    await asyncio.gather(*running, return_exceptions=True)
+                    raise future.exception()
+                done.add(instance)
+
+    def in_thread(self, function, *args, **kwargs):
+        """
+        Runs a blocking function in the thread pool, returning an awaitable.
+        """
+        return self.loop.run_in_executor(self.thread_pool, functools.partial(function, *args, **kwargs))
+
+    def in_hook_thread(self, function, *args, **kwargs):
+        """
+        Like in_thread, but for running plugin hooks, which can block for as
+        long as the container takes to be ready.
+        """
+        return self.loop.run_in_executor(self.hook_pool, functools.partial(function, *args, **kwargs))
+
+    async def changing(self, name):
+        """
+        Waits for the global container manipulation lock on the name.
+        """
+        while not changing_containers.check_and_add(name):
+            await asyncio.sleep(0.1)
+
+    # Stopping
+
+    async def stop_container_async(self, instance):
+        await self.changing(instance.name)
+        try:
+            state = await self.client.container_state(instance.name)
+            if state is None or not state["Running"]:
+                return
+            stop_task = Task(
+                "Stopping {}".format(instance.container.name),
+                parent=self.task,
+                collapse_if_finished=True,
+            )
+            # A paused container cannot act on the stop signal
+            if state["Paused"]:
+                await self.client.unpause(instance.name)
+            await self.client.stop(instance.name, timeout=0 if instance.container.fast_kill else 10)
+            self.context.container_stopped(instance)
+            stop_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+        finally:
+            changing_containers.remove(instance.name)
+
+    # Suspending
+
+    async def pause_container_async(self, instance):
+        await self.changing(instance.name)
+        try:
+            state = await self.client.container_state(instance.name)
+            if state is None or not state["Running"] or state["Paused"]:
+                return
+            pause_task = Task(
+                "Suspending {}".format(instance.container.name),
+                parent=self.task,
+                collapse_if_finished=True,
+            )
+            await self.client.pause(instance.name)
+            pause_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+        finally:
+            changing_containers.remove(instance.name)
+
+    async def unpause_container_async(self, instance):
+        await self.changing(instance.name)
+        try:
+            state = await self.client.container_state(instance.name)
+            if state is None or not state["Paused"]:
+                return
+            resume_task = Task(
+                "Resuming {}".format(instance.container.name),
+                parent=self.task,
+                collapse_if_finished=True,
+            )
+            await self.client.unpause(instance.name)
+            resume_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+        finally:
+            changing_containers.remove(instance.name)
+
+    # Starting
+
+    def prepare_containers(self, instances):
+        # Creating runs on the event loop, so only starts once it does
+        self.to_prepare = set(instances)
+        self.started = set()
+        self.abandoned = False
+
+    def abandon_prepared(self):
+        # Already done by execute_async, while the event loop was running
+        pass
+
+    async def abandon_prepared_async(self):
+        """
+        Like abandon_prepared. Containers being created when it is called
+        are waited for, as the threads creating them cannot be cancelled.
+        """
+        self.abandoned = True
+        for instance, task in self.prepared.items():
+            if instance in self.started:
+                continue
+            try:
+                prepared = await task
+            except BaseException:
+                continue
+            await self.in_thread(self.remove_prepared, instance, prepared)
+
+    async def prepare_async(self, instance):
+        # Pre-start hooks look at the containers it links to, so they go first
+        for dependency in instance.links.values():
+            if dependency in self.prepared:
+                await self.prepared[dependency]
+        if self.abandoned:
+            return None
+        if instance.container.abstract and not instance.foreground:
+            raise ValueError("You cannot boot an abstract container.")
+        await self.changing(instance.name)
+        try:
+            if await self.client.container_running(instance.name):
+                return None
+            start_task = Task(
+                "Starting {}".format(instance.container.name),
+                parent=self.task,
+                collapse_if_finished=True,
+            )
+            container_pointer = await self.in_thread(self.create_container, instance, start_task)
+            self.context.container_created(instance)
+            start_task.update(status="Created")
+            return container_pointer, start_task
+        finally:
+            changing_containers.remove(instance.name)
+
+    async def start_container_async(self, instance):
+        prepared = await self.prepared[instance]
+        if prepared is None:
+            return
+        container_pointer, start_task = prepared
+        self.started.add(instance)
+        start_task.waited_for = self.dependency_tasks(instance)
+        await self.changing(instance.name)
+        try:
+            try:
+                if instance.foreground:
+                    self.go_interactive(container_pointer, start_task)
+                await self.client.start(container_pointer["Id"])
+                await self.wait_for_boot_async(instance, container_pointer, start_task)
+                instance = await self.introspect_started_async(instance)
+                self.context.container_started(instance)
+                if not instance.proxy_for:
+                    await self.in_hook_thread(
+                        self.app.run_hooks,
+                        PluginHook.POST_START,
+                        host=self.host,
+                        instance=instance,
+                        task=start_task,
+                        context=self.hook_context,
+                    )
+            except ContainerBootFailure as e:
+                raise await self.in_thread(self.boot_failure, e)
+            start_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+        finally:
+            changing_containers.remove(instance.name)
+
+    async def wait_for_boot_async(self, instance, container_pointer, start_task):
+        started_at = None
+        if container_pointer["Id"] in self.reused_ids:
+            started_at = self.started_at(await self.client.inspect_container(container_pointer["Id"]))
+        towline = AsyncTowline(
+            self.host,
+            self.client,
+            instance.name,
+            container_id=container_pointer["Id"],
+            started_at=started_at,
+        )
+        while True:
+            status, message = await towline.status_async()
+            if status is None:
+                if message is not None:
+                    start_task.update(status=message)
+            elif status is True:
+                break
+            elif status is False:
+                raise ContainerBootFailure(
+                    "Failed during towline",
+                    instance=instance,
+                )
+            await asyncio.sleep(0.5)
+
+    async def introspect_started_async(self, instance):
+        try:
+            return await AsyncIntrospector(
+                self.host,
+                self.app.containers,
+                self.client,
+            ).introspect_single_container_async(instance.name)
+        except DockerRuntimeError:
+            raise ContainerBootFailure(
+                "Failed after towline",
+                instance=instance,
+            )
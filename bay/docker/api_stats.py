@@ -0,0 +1,97 @@
+import re
+import threading
+import urllib.parse
+
+import attr
+
+
+# API collections whose second path component is an object ID or name
+ID_COLLECTIONS = {
+    "configs", "containers", "exec", "images", "networks", "nodes",
+    "plugins", "secrets", "services", "tasks", "volumes",
+}
+# Second path components that act on the collection rather than an object
+COLLECTION_ACTIONS = {"create", "get", "json", "load", "prune", "search"}
+# Trailing components of per-image endpoints (image names can contain slashes)
+IMAGE_ACTIONS = {"get", "history", "json", "push", "tag"}
+
+
+def normalize_endpoint(method, url):
+    """
+    Turns a Docker API request into an endpoint name with object IDs and the
+    API version removed, like "GET /containers/{id}/json".
+    """
+    path = urllib.parse.urlsplit(url).path
+    path = re.sub(r"^/v[0-9.]+(?=/)", "", path)
+    parts = path.strip("/").split("/")
+    if len(parts) >= 2 and parts[0] in ID_COLLECTIONS and parts[1] not in COLLECTION_ACTIONS:
+        if parts[0] == "images":
+            if len(parts) > 2 and parts[-1] in IMAGE_ACTIONS:
+                parts = [parts[0], "{id}", parts[-1]]
+            else:
+                parts = [parts[0], "{id}"]
+        else:
+            parts[1] = "{id}"
+    return "{} /{}".format(method.upper(), "/".join(parts))
+
+
+@attr.s
+class EndpointStats:
+    """
+    Counters for a single API endpoint.
+    """
+    endpoint = attr.ib()
+    calls = attr.ib(default=0)
+    errors = attr.ib(default=0)
+    total_time = attr.ib(default=0.0)
+    max_time = attr.ib(default=0.0)
+    bytes_sent = attr.ib(default=0)
+    bytes_received = attr.ib(default=0)
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def as_dict(self):
+        result = attr.asdict(self)
+        result["mean_time"] = self.mean_time
+        return result
+
+
+@attr.s
+class ApiStats:
+    """
+    Thread-safe record of the Docker API calls made to a single host.
+    """
+    endpoints = attr.ib(default=attr.Factory(dict), init=False)
+
+    def __attrs_post_init__(self):
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, duration, bytes_sent=0, bytes_received=0, error=False):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats(endpoint)
+            stats.calls += 1
+            stats.errors += int(bool(error))
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    @property
+    def total_calls(self):
+        with self.lock:
+            return sum(stats.calls for stats in self.endpoints.values())
+
+    def top(self, limit=None):
+        """
+        Returns endpoint stats, most total time first.
+        """
+        with self.lock:
+            result = sorted(self.endpoints.values(), key=lambda stats: (-stats.total_time, stats.endpoint))
+        return result[:limit] if limit else result
+
+    def as_dict(self):
+        return {stats.endpoint: stats.as_dict() for stats in self.top()}
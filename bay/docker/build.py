@@ -81,7 +81,13 @@ class Builder:
         progress = 0
         start_time = datetime.datetime.now().replace(microsecond=0)
 
-        self.app.run_hooks(PluginHook.PRE_BUILD, host=self.host, container=self.container, task=self.task)
+        self.app.run_hooks(
+            PluginHook.PRE_BUILD,
+            host=self.host,
+            container=self.container,
+            task=self.task,
+            context=self.app.get_run_context(self.host),
+        )
 
         try:
             # Prep normalised context
@@ -141,7 +147,13 @@ class Builder:
 
         else:
             # Run post-build hooks
-            self.app.run_hooks(PluginHook.POST_BUILD, host=self.host, container=self.container, task=self.task)
+            self.app.run_hooks(
+                PluginHook.POST_BUILD,
+                host=self.host,
+                container=self.container,
+                task=self.task,
+                context=self.app.get_run_context(self.host),
+            )
 
             # Print out end-of-build message
             end_time = datetime.datetime.now().replace(microsecond=0)
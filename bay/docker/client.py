@@ -0,0 +1,197 @@
+import itertools
+import queue
+import threading
+import time
+
+import docker
+import requests
+
+from .api_stats import normalize_endpoint
+from .coalesce import SingleFlight, TtlCache
+from .limiter import IDEMPOTENT_METHODS, RequestLimiter, retry_delay
+
+
+def resize_pool(pool, size):
+    """
+    Grows a urllib3 connection pool to hold up to size idle connections,
+    keeping any it already has. Connections over a pool's size are closed
+    rather than reused, which is what makes parallel runs reconnect.
+    """
+    old = pool.pool
+    if old is None or old.maxsize >= size:
+        return
+    checked_out = old.maxsize - old.qsize()
+    idle = []
+    while True:
+        try:
+            idle.append(old.get(block=False))
+        except queue.Empty:
+            break
+    new = pool.QueueCls(size)
+    # Leave room for the connections currently in use to come back, and put
+    # the open ones in last so they are handed out first.
+    for _ in range(size - checked_out - len(idle)):
+        new.put(None)
+    for connection in reversed(idle):
+        new.put(connection)
+    pool.pool = new
+
+
+class HostClient(docker.APIClient):
+    """
+    Docker API client that is shared by every thread talking to a host. It
+    keeps up to pool_size connections to the host alive for reuse, limits
+    how many requests are in flight through a RequestLimiter, retries reads
+    that time out, and records the count, latency and size of every request
+    it makes into an ApiStats object.
+
+    Identical inspects made at the same time by different threads share a
+    single request, and inspects of images by ID (which never change) are
+    cached for a short while.
+    """
+
+    # How many times to retry a GET that failed to connect or timed out
+    RETRIES = 3
+    # How long to cache image inspections by ID for
+    IMAGE_CACHE_TTL = 60
+
+    def __init__(self, *args, api_stats=None, pool_size=10, limiter=None, **kwargs):
+        # Set before the parent constructor, as version="auto" makes a request
+        self.api_stats = api_stats
+        self.limiter = limiter or RequestLimiter()
+        self.single_flight = SingleFlight()
+        self.image_cache = TtlCache(self.IMAGE_CACHE_TTL)
+        # Bumped around every write, so reads are never shared across one
+        self.write_counter = itertools.count(1)
+        self.write_generation = 0
+        self.pool_size = pool_size
+        self.pool_lock = threading.Lock()
+        super(HostClient, self).__init__(*args, **kwargs)
+        for adapter in self.adapters.values():
+            self.size_pools(adapter)
+
+    def size_pools(self, adapter):
+        """
+        Makes every connection pool the adapter hands out hold pool_size
+        connections (docker-py's own pools keep very few).
+        """
+        get_connection = adapter.get_connection
+
+        def sized_get_connection(url, proxies=None):
+            pool = get_connection(url, proxies)
+            with self.pool_lock:
+                resize_pool(pool, self.pool_size)
+            return pool
+
+        adapter.get_connection = sized_get_connection
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = normalize_endpoint(method, url)
+        if method.upper() not in IDEMPOTENT_METHODS:
+            self.write_generation = next(self.write_counter)
+            if endpoint.split(" ", 1)[1].startswith("/images"):
+                # Images may have been removed
+                self.image_cache.clear()
+            try:
+                return self.limited_request(endpoint, method, url, *args, **kwargs)
+            finally:
+                self.write_generation = next(self.write_counter)
+        return self.limited_request(endpoint, method, url, *args, **kwargs)
+
+    def limited_request(self, endpoint, method, url, *args, **kwargs):
+        limiter = self.limiter.for_request(endpoint, stream=kwargs.get("stream", False))
+        if limiter is None:
+            return self.recorded_request(method, url, *args, **kwargs)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with limiter.slot():
+                    start = time.perf_counter()
+                    response = self.recorded_request(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                limiter.record(time.perf_counter() - start, overloaded=True)
+                if method.upper() not in IDEMPOTENT_METHODS or attempt >= self.RETRIES:
+                    raise
+                time.sleep(retry_delay(attempt))
+                attempt += 1
+            else:
+                limiter.record(time.perf_counter() - start)
+                return response
+
+    def recorded_request(self, method, url, *args, **kwargs):
+        if self.api_stats is None:
+            return super(HostClient, self).request(method, url, *args, **kwargs)
+        start = time.perf_counter()
+        error = True
+        bytes_received = 0
+        try:
+            response = super(HostClient, self).request(method, url, *args, **kwargs)
+            error = response.status_code >= 400
+            # Streamed responses (logs, pulls, builds) are timed to their headers and
+            # sized from Content-Length, as reading the body here would consume it.
+            if kwargs.get("stream"):
+                bytes_received = int(response.headers.get("Content-Length") or 0)
+            else:
+                bytes_received = len(response.content)
+            return response
+        finally:
+            self.api_stats.record(
+                normalize_endpoint(method, url),
+                time.perf_counter() - start,
+                bytes_sent=self.body_size(kwargs.get("data")),
+                bytes_received=bytes_received,
+                error=error,
+            )
+
+    # Coalesced reads
+
+    def coalesced(self, function, *args, **kwargs):
+        """
+        Calls the function, sharing the call with any other thread making
+        the same one at the same time.
+        """
+        key = (function.__name__, self.write_generation, repr(args), repr(sorted(kwargs.items())))
+        return self.single_flight.do(key, lambda: function(*args, **kwargs))
+
+    def inspect_container(self, *args, **kwargs):
+        return self.coalesced(super(HostClient, self).inspect_container, *args, **kwargs)
+
+    def inspect_network(self, *args, **kwargs):
+        return self.coalesced(super(HostClient, self).inspect_network, *args, **kwargs)
+
+    def inspect_volume(self, *args, **kwargs):
+        return self.coalesced(super(HostClient, self).inspect_volume, *args, **kwargs)
+
+    def inspect_image(self, image):
+        # Image IDs are content hashes, so what they point to never changes
+        by_id = isinstance(image, str) and image.startswith("sha256:")
+        if by_id:
+            cached = self.image_cache.get(image)
+            if cached is not None:
+                return cached
+        result = self.coalesced(super(HostClient, self).inspect_image, image)
+        if by_id:
+            self.image_cache.set(image, result)
+        return result
+
+    def event_stream(self, since=None, filters=None):
+        """
+        Subscribes to the host's events. Returns the response, which can be
+        closed to unsubscribe from another thread, and a generator of
+        decoded events. Unlike events(), this never times out.
+        """
+        params = {"filters": docker.utils.convert_filters(filters) if filters else None}
+        if since is not None:
+            params["since"] = since
+        response = self._get(self._url("/events"), params=params, stream=True, timeout=None)
+        return response, self._stream_helper(response, decode=True)
+
+    @staticmethod
+    def body_size(data):
+        """
+        Returns the size of a request body, if it can be known without reading it.
+        """
+        if isinstance(data, (bytes, str)):
+            return len(data)
+        return 0
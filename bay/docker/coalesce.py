@@ -0,0 +1,84 @@
+import copy
+import threading
+import time
+
+import attr
+
+
+class Flight:
+    """
+    A single call in progress, which other callers can wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+@attr.s
+class SingleFlight:
+    """
+    Shares one in-progress call between every thread that asks for the same
+    key at the same time, rather than each making it.
+    """
+    flights = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        """
+        Returns function(), or the result of the identical call already
+        running. Callers that waited get a copy so they can't affect each other.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+        if leader:
+            try:
+                flight.result = function()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self.lock:
+                    del self.flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result if leader else copy.deepcopy(flight.result)
+
+
+@attr.s
+class TtlCache:
+    """
+    A thread-safe cache whose entries expire after ttl seconds.
+    """
+    ttl = attr.ib()
+    entries = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns a copy of the cached value, or None if there is no fresh one.
+        """
+        with self.lock:
+            expires, value = self.entries.get(key, (0, None))
+            if expires < time.monotonic():
+                self.entries.pop(key, None)
+                return None
+            return copy.deepcopy(value)
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
@@ -0,0 +1,177 @@
+import threading
+
+import attr
+
+from ..containers.formation import ContainerFormation, ContainerInstance
+from .introspect import FormationIntrospector
+
+
+@attr.s
+class RunContext:
+    """
+    Host state that is expensive to look up and shared by every hook run
+    during a single command, so plugins don't each re-introspect the host.
+
+    The runner tells it about containers it starts and stops so it stays
+    accurate; anything else that changes the host should call invalidate().
+    """
+    host = attr.ib()
+    graph = attr.ib()
+    network = attr.ib(default=None)
+
+    @property
+    def watcher(self):
+        """
+        The host's FormationWatcher, if one is running for this graph.
+        """
+        watcher = self.host.watcher
+        if watcher is not None and watcher.graph is self.graph and watcher.network == self.network:
+            return watcher
+        return None
+
+    def __attrs_post_init__(self):
+        if self.network is None:
+            self.network = self.graph.namespace
+        self.lock = threading.RLock()
+        self._formation = None
+        self._volumes = None
+        self._providers = None
+        self._inspections = {}
+        # Hooks run by an async runner get a view of the context with the
+        # runner's event loop set (see AsyncRunContext); here there is none
+        self.loop = None
+
+    def invalidate(self):
+        """
+        Forgets everything, so it is looked up fresh next time.
+        """
+        with self.lock:
+            self._formation = None
+            self._volumes = None
+            self._inspections = {}
+
+    # Running containers
+
+    def _snapshot(self):
+        if self.watcher is not None:
+            return self.watcher.formation()
+        if self._formation is None:
+            self._formation = FormationIntrospector(self.host, self.graph, self.network).introspect()
+        return self._formation
+
+    def is_running(self, container):
+        """
+        Returns True if there is an instance of the Container running.
+        """
+        if self.watcher is not None:
+            return self.watcher.has_container(container)
+        with self.lock:
+            return self._snapshot().has_container(container)
+
+    def formation(self):
+        """
+        Returns a copy of the running formation that is safe to modify.
+        """
+        with self.lock:
+            snapshot = self._snapshot()
+            formation = ContainerFormation(self.graph, self.network)
+            for instance in snapshot:
+                copy = instance.clone()
+                copy.links = {
+                    alias: target.name if isinstance(target, ContainerInstance) else target
+                    for alias, target in instance.links.items()
+                }
+                formation.add_instance(copy)
+        for instance in formation:
+            instance.resolve_links()
+        return formation
+
+    def container_created(self, instance):
+        """
+        Records that the instance's container was (re)created, so it needs
+        inspecting again.
+        """
+        with self.lock:
+            self._inspections.pop(instance.name, None)
+
+    def container_started(self, instance):
+        """
+        Records that the (introspected) instance is now running.
+        """
+        if self.watcher is not None:
+            self.watcher.container_started(instance)
+        with self.lock:
+            self._inspections.pop(instance.name, None)
+            if self._formation is not None:
+                if instance.name in self._formation.container_instances:
+                    self._formation = None
+                else:
+                    self._formation.add_instance(instance)
+
+    def container_stopped(self, instance):
+        """
+        Records that the instance is no longer running.
+        """
+        if self.watcher is not None:
+            self.watcher.container_stopped(instance)
+        with self.lock:
+            self._inspections.pop(instance.name, None)
+            # Stopping cascades to anything linked to it, so just look again
+            self._formation = None
+
+    # Containers
+
+    def inspect_container(self, name):
+        """
+        Returns the Docker inspection of a container, cached until the
+        runner starts or stops it.
+        """
+        with self.lock:
+            if name not in self._inspections:
+                self._inspections[name] = self.host.client.inspect_container(name)
+            return self._inspections[name]
+
+    # Volumes
+
+    @property
+    def providers(self):
+        """
+        Returns {volume name: Container} for containers that provide volumes.
+        """
+        with self.lock:
+            if self._providers is None:
+                self._providers = {}
+                for container in self.graph:
+                    provides_volume = container.extra_data.get("provides-volume", None)
+                    if provides_volume:
+                        self._providers[provides_volume] = container
+            return self._providers
+
+    def volume_name(self, source):
+        """
+        Returns the Docker volume to use for a named volume. Each environment
+        gets its own, except for volumes built by a providing container,
+        which only depend on its image and so are shared.
+        """
+        if self.graph.environment is None or source in self.providers:
+            return source
+        return "{}-{}".format(source, self.graph.environment)
+
+    def volume_exists(self, name):
+        """
+        Returns True if the named volume exists on the host.
+        """
+        with self.lock:
+            if self._volumes is None:
+                self._volumes = {
+                    volume["Name"]
+                    for volume in (self.host.client.volumes().get("Volumes") or [])
+                }
+            return name in self._volumes
+
+    def volumes_changed(self):
+        """
+        Forgets the volume list after volumes have been created or removed.
+        """
+        with self.lock:
+            self._volumes = None
@@ -1,13 +1,15 @@
 import attr
-import docker
 import os
 import sys
+import threading
 import urllib.parse
 from distutils.version import LooseVersion
 
-from ..exceptions import DockerNotAvailableError
+from ..exceptions import BadConfigError, DockerNotAvailableError
 from ..utils.functional import cached_property, thread_cached_property
-from .images import ImageRepository
+from .api_stats import ApiStats
+from .probe import HostProber, ProbeCache
+from .version_cache import ApiVersionCache
 
 
 @attr.s
@@ -16,7 +18,10 @@ class HostManager(object):
     Contains all known hosts.
     """
     _hosts = attr.ib(default=attr.Factory(list))
+    prober = attr.ib(default=attr.Factory(HostProber))
     hosts = attr.ib(default=attr.Factory(dict), init=False)
+    # Extra names for hosts, mapping to their main alias
+    aliases = attr.ib(default=attr.Factory(dict), init=False)
 
     def __attrs_post_init__(self):
         for host in self._hosts:
@@ -24,20 +29,73 @@ class HostManager(object):
 
     @classmethod
     def from_config(cls, config):
-        return cls([
-            Host.from_env(),
-        ])
+        """
+        Makes a host for each entry in the "hosts" config section. The
+        Docker environment variables provide the "default" host unless the
+        config defines one itself.
+        """
+        defaults = {
+            "pool_size": config["bay"]["docker_pool_size"],
+            "cheap_concurrency": config["bay"]["docker_cheap_concurrency"],
+            "heavy_concurrency": config["bay"]["docker_heavy_concurrency"],
+            "version_cache": ApiVersionCache(config["bay"]["docker_api_version_cache"]),
+        }
+        hosts = [
+            Host.from_config(alias, details, **defaults)
+            # The default host always comes first
+            for alias, details in sorted(
+                config.data.get("hosts", {}).items(),
+                key=lambda item: (item[0] != "default", item[0]),
+            )
+        ]
+        if not any(host.alias == "default" for host in hosts):
+            hosts.insert(0, Host.from_env(**defaults))
+        prober = HostProber(
+            timeout=config["bay"]["docker_probe_timeout"],
+            cache=ProbeCache(
+                config["bay"]["docker_probe_cache"],
+                ttl=config["bay"]["docker_probe_cache_ttl"],
+            ),
+        )
+        return cls(hosts, prober)
 
     def add_host(self, host):
-        if host.alias in self.hosts:
-            raise ValueError("Host alias %s is already assigned" % host.alias)
+        for name in [host.alias] + list(host.aliases):
+            if name in self.hosts or name in self.aliases:
+                raise ValueError("Host alias %s is already assigned" % name)
+            self.aliases[name] = host.alias
         self.hosts[host.alias] = host
 
+    @property
+    def names(self):
+        """
+        Returns every name a host can be referred to by.
+        """
+        return list(self.aliases.keys())
+
+    def reachable(self, refresh=False):
+        """
+        Returns the hosts that are up, skipping any that recently failed to
+        answer. With a single host there is nothing to skip to, so it is
+        returned without checking.
+        """
+        hosts = list(self)
+        if len(hosts) <= 1:
+            return hosts
+        return [
+            host
+            for host, result in zip(hosts, self.prober.probe(hosts, refresh=refresh))
+            if result.reachable
+        ]
+
     def __iter__(self):
         return iter(self.hosts.values())
 
+    def __len__(self):
+        return len(self.hosts)
+
     def __getitem__(self, key):
-        return self.hosts[key]
+        return self.hosts[self.aliases.get(key, key)]
 
 
 @attr.s
@@ -50,8 +108,23 @@ class Host(object):
     tls_ca = attr.ib()
     tls_cert = attr.ib()
     tls_key = attr.ib()
+    # How many connections to the host to keep open for reuse
+    pool_size = attr.ib(default=10)
+    # How many inspect/list and create/start/pull calls can be in flight at once
+    cheap_concurrency = attr.ib(default=16)
+    heavy_concurrency = attr.ib(default=4)
+    version_cache = attr.ib(default=None, repr=False, cmp=False)
+    # Other names the host can be referred to by
+    aliases = attr.ib(default=attr.Factory(list))
+    # Memory to place containers in (like "16g"), if not all of the host's
+    memory = attr.ib(default=None)
     url_scheme = attr.ib(init=False)
     url_location = attr.ib(init=False)
+    # Shared by the clients of every thread
+    api_stats = attr.ib(default=attr.Factory(ApiStats), init=False, repr=False, cmp=False)
+    # A FormationWatcher following this host's events, once something starts one
+    watcher = attr.ib(default=None, init=False, repr=False, cmp=False)
+    client_lock = attr.ib(default=attr.Factory(threading.Lock), init=False, repr=False, cmp=False)
 
     def __attrs_post_init__(self):
         # Parse URL into components
@@ -62,7 +135,7 @@ class Host(object):
             raise ValueError("Unknown scheme in Docker URL %s" % self.url)
 
     @classmethod
-    def from_env(cls, alias="default"):
+    def from_env(cls, alias="default", **kwargs):
         """
         Makes a host from Docker environment variables.
         """
@@ -77,8 +150,52 @@ class Host(object):
             tls_ca=tls_ca,
             tls_cert=tls_cert,
             tls_key=tls_key,
+            **kwargs
         )
 
+    # Keys allowed in a host's entry in the "hosts" config section
+    config_keys = {
+        "url": str,
+        "tls_ca": str,
+        "tls_cert": str,
+        "tls_key": str,
+        "tls_cert_path": str,
+        "aliases": list,
+        "pool_size": int,
+        "cheap_concurrency": int,
+        "heavy_concurrency": int,
+        "memory": (int, str),
+    }
+
+    @classmethod
+    def from_config(cls, alias, details, **kwargs):
+        """
+        Makes a host from its entry in the "hosts" config section. Certificates
+        can be given individually or, like DOCKER_CERT_PATH, as a directory
+        with ca.pem, cert.pem and key.pem in it.
+        """
+        for key, value in details.items():
+            if key not in cls.config_keys:
+                raise BadConfigError("Unknown setting %s for host %s" % (key, alias))
+            if not isinstance(value, cls.config_keys[key]):
+                raise BadConfigError("Setting %s for host %s is not %s" % (key, alias, cls.config_keys[key]))
+        if "url" not in details:
+            raise BadConfigError("Host %s has no url" % alias)
+        details = dict(details)
+        cert_path = details.pop("tls_cert_path", None)
+        if cert_path:
+            cert_path = os.path.expanduser(cert_path)
+            details.setdefault("tls_ca", os.path.join(cert_path, "ca.pem"))
+            details.setdefault("tls_cert", os.path.join(cert_path, "cert.pem"))
+            details.setdefault("tls_key", os.path.join(cert_path, "key.pem"))
+        for key in ["tls_ca", "tls_cert", "tls_key"]:
+            details[key] = os.path.expanduser(details[key]) if details.get(key) else None
+        kwargs.update(details)
+        try:
+            return cls(alias=alias, **kwargs)
+        except ValueError as e:
+            raise BadConfigError("Host %s: %s" % (alias, e))
+
     @cached_property
     def publicly_visible(self):
         """
@@ -111,44 +228,83 @@ class Host(object):
         """
         return not self.publicly_visible
 
-    @thread_cached_property
+    @cached_property
     def client(self):
         """
-        Returns a Docker client for the URL
+        Returns the Docker client for the URL, shared by all threads
+        """
+        with self.client_lock:
+            # Another thread may have made it while this one waited
+            if "client" in self.__dict__:
+                return self.__dict__["client"]
+            return self._make_client()
+
+    def _make_client(self):
+        # docker (and requests under it) is slow to import, so only pull it in
+        # once something actually talks to a host.
+        import docker
+        from .client import HostClient
+        from .limiter import RequestLimiter
+        tls = self.tls_config()
+        # Make client, only negotiating the API version if it's not cached
+        version = self.version_cache.get(self.url) if self.version_cache else None
+        try:
+            client = HostClient(
+                base_url=self.url,
+                version=version or "auto",
+                timeout=42,
+                tls=tls,
+                api_stats=self.api_stats,
+                pool_size=self.pool_size,
+                limiter=RequestLimiter(self.cheap_concurrency, self.heavy_concurrency),
+            )
+        except docker.errors.DockerException:
+            raise DockerNotAvailableError("The docker host at {} is not available".format(self.url))
+        if version is None and self.version_cache:
+            self.version_cache.set(self.url, client.api_version)
+        return client
+
+    def tls_config(self):
+        """
+        Returns the docker TLSConfig to use for the host, or None.
         """
-        # TLS setup
-        tls = None
+        import docker
         tls_client = None
         if self.tls_cert and self.tls_key:
             tls_client = (self.tls_cert, self.tls_key)
         if tls_client or self.tls_ca:
-            tls = docker.tls.TLSConfig(
+            return docker.tls.TLSConfig(
                 ca_cert=self.tls_ca,
                 client_cert=tls_client,
                 verify=True,
             )
-        # Make client
-        try:
-            return docker.APIClient(
-                base_url=self.url,
-                version="auto",
-                timeout=42,
-                tls=tls,
-            )
-        except docker.errors.DockerException:
-            raise DockerNotAvailableError("The docker host at {} is not available".format(self.url))
+        return None
+
+    def after_fork(self):
+        """
+        Called in a forked child process. Drops the client, whose pooled
+        connections (and limiter) belong to the parent, and the watcher's
+        thread, which may have held the locks shared between clients.
+        """
+        self.__dict__.pop("client", None)
+        self.client_lock = threading.Lock()
+        self.api_stats.lock = threading.Lock()
+        if self.watcher is not None:
+            self.watcher.after_fork()
 
     @thread_cached_property
     def images(self):
         """
         Returns an image repository for the host
         """
+        from .images import ImageRepository
         return ImageRepository(self)
 
     def container_exists(self, name):
         """
         Shortcut to see if a container exists with the given runtime name
         """
+        import docker
         try:
             self.client.inspect_container(name)
             return True
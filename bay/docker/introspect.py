@@ -1,10 +1,25 @@
 import attr
+import json
 from ..containers.formation import ContainerFormation, ContainerInstance
 from ..exceptions import DockerRuntimeError
 
 import warnings
 
 
+# Set on port proxies to the alias of the host the real container is on
+PROXY_LABEL = "com.eventbrite.bay.proxy-for"
+# Which replica of its container a container is
+REPLICA_LABEL = "com.eventbrite.bay.replica"
+# JSON of {alias: container name} for all the container's links
+LINKS_LABEL = "com.eventbrite.bay.links"
+# The named environment the container runs in, if not the default one
+ENVIRONMENT_LABEL = "com.eventbrite.bay.environment"
+# Hash of everything the container was created with, to tell if it can be reused
+CREATE_HASH_LABEL = "com.eventbrite.bay.create-hash"
+# The desired instance's ContainerInstance.config_hash, to tell if it has changed
+CONFIG_HASH_LABEL = "com.eventbrite.bay.config-hash"
+
+
 @attr.s
 class FormationIntrospector:
     """
@@ -22,7 +37,7 @@ class FormationIntrospector:
 
     def __attrs_post_init__(self):
         if self.network is None:
-            self.network = self.graph.prefix
+            self.network = self.graph.namespace
 
     def introspect(self):
         """
@@ -33,7 +48,7 @@ class FormationIntrospector:
         # Go through all containers on the remote host that are running and on the right network
         for container in self.host.client.containers(all=False):
             if self.network in container['NetworkSettings']['Networks']:
-                self.add_container(container['Names'][0].lstrip("/"))
+                self.add_container(container)
         # As a second phase, go through and resolve links
         for instance in self.formation:
             instance.resolve_links()
@@ -50,28 +65,94 @@ class FormationIntrospector:
 
         # A race condition in docker [2017/09] means it returns a different format for containers that have just died
         if isinstance(details[0], dict):
-            container_name = details[0]["Names"][0].lstrip("/")
+            # The name filter also matches longer names, so find the right one
+            summary = next((d for d in details if d["Names"][0].lstrip("/") == name), details[0])
+            container_name = summary["Names"][0].lstrip("/")
+            if self.is_labelled(summary):
+                return self.instance_from_summary(container_name, summary)
         else:
             container_name = details[0]
 
         return self._create_container(container_name)
 
-    def add_container(self, container_details):
+    def add_container(self, summary):
+        """
+        Adds the instance for a container from the host's container list.
+        """
         try:
-            instance = self._create_container(container_details)
+            container_name = summary['Names'][0].lstrip("/")
+            if self.is_labelled(summary):
+                instance = self.instance_from_summary(container_name, summary)
+            else:
+                instance = self._create_container(container_name)
             self.formation.add_instance(instance)
         except self.ContainerNotFound as e:
             warnings.warn(e.args[0])
 
+    def is_labelled(self, summary):
+        """
+        Returns True if the container was labelled with everything needed to
+        introspect it from the container list alone, without inspecting it.
+        """
+        return CONFIG_HASH_LABEL in (summary.get('Labels') or {})
+
     def _create_container(self, container_name):
         """
         Returns a container build from introspected information
         """
         assert isinstance(container_name, str)
-        container_details = self.host.client.inspect_container(container_name)
+        return self.instance_from_details(container_name, self.host.client.inspect_container(container_name))
+
+    def instance_from_details(self, container_name, container_details):
+        """
+        Returns a container instance built from its Docker inspection
+        """
+        instance = self.make_instance(
+            container_name,
+            container_details['Config']['Labels'] or {},
+            container_details['Image'],
+            {mount['Destination'] for mount in container_details['Mounts']},
+            container_details['NetworkSettings']['Networks'][self.network].get('Links', None) or [],
+        )
+        # Set extra runtime and networking attributes because it's running
+        instance.container_id = container_details['Id']
+        instance.ip_address = container_details['NetworkSettings']['Networks'][self.network]['IPAddress']
+        instance.port_mapping = {}
+        for container_port, host_details in container_details['NetworkSettings'].get('Ports', {}).items():
+            if host_details:
+                private_port = int(container_port.split("/", 1)[0])
+                public_port = int(host_details[0]['HostPort'])
+                instance.port_mapping[private_port] = public_port
+        return instance
+
+    def instance_from_summary(self, container_name, summary):
+        """
+        Returns a container instance built from its entry in Docker's
+        container list. Only works for labelled containers, as the list
+        does not include Docker links.
+        """
+        instance = self.make_instance(
+            container_name,
+            summary['Labels'],
+            summary['ImageID'],
+            {mount['Destination'] for mount in (summary.get('Mounts') or [])},
+        )
+        instance.container_id = summary['Id']
+        instance.ip_address = summary['NetworkSettings']['Networks'][self.network]['IPAddress']
+        instance.port_mapping = {
+            port['PrivatePort']: port['PublicPort']
+            for port in (summary.get('Ports') or [])
+            if port.get('PublicPort')
+        }
+        return instance
+
+    def make_instance(self, container_name, labels, image, mounted_targets, docker_links=()):
+        """
+        Returns a container instance from the details that Docker's container
+        list and inspection both have.
+        """
         # Find the container name in the graph
         try:
-            labels = container_details['Config']['Labels']
             # Use the bay-specific (not eventbrite-specific, just named uniquely as per the docker label spec) label
             # to work out what container name this was.
             container = self.graph[labels['com.eventbrite.bay.container']]
@@ -83,7 +164,6 @@ class FormationIntrospector:
                 ).format(container_name)
             )
         # Get the image hash
-        image = container_details['Image']
         assert ":" in image
         if image.startswith("sha256:"):
             image_id = image
@@ -92,33 +172,30 @@ class FormationIntrospector:
             # CONVERT IMAGE NAME INTO HASH USING REPO
             name, tag = image.split(":", 1)
             image_id = self.host.images.image_version(name, tag)
-        # Work out links
-        links = {}
-        for link in (container_details['NetworkSettings']['Networks'][self.network].get('Links', None) or []):
-            linked_container_name, link_alias = link.split(":", 1)
-            links[link_alias] = linked_container_name
+        # Work out links; older containers only have them as Docker links
+        if LINKS_LABEL in labels:
+            links = json.loads(labels[LINKS_LABEL])
+        else:
+            links = {}
+            for link in docker_links:
+                linked_container_name, link_alias = link.split(":", 1)
+                links[link_alias] = linked_container_name
         # Work out devmodes
-        mounted_targets = set()
         devmodes = set()
-        for mount in container_details['Mounts']:
-            mounted_targets.add(mount['Destination'])
         for devmode, mounts in container.devmodes.items():
             if all((destination in mounted_targets) for destination in mounts.keys()):
                 devmodes.add(devmode)
+        # Older containers only have the replica in their name
+        replica = labels.get(REPLICA_LABEL) or container_name.rsplit(".", 1)[-1]
+        replica = int(replica) if replica.isdigit() else 1
         # Make a formation instance
-        instance = ContainerInstance(
+        return ContainerInstance(
             name=container_name,
             container=container,
             image_id=image_id,
             links=links,
             devmodes=devmodes,
+            proxy_for=labels.get(PROXY_LABEL),
+            replica=replica,
+            applied_config_hash=labels.get(CONFIG_HASH_LABEL),
         )
-        # Set extra networking attributes because it's running
-        instance.ip_address = container_details['NetworkSettings']['Networks'][self.network]['IPAddress']
-        instance.port_mapping = {}
-        for container_port, host_details in container_details['NetworkSettings'].get('Ports', {}).items():
-            if host_details:
-                private_port = int(container_port.split("/", 1)[0])
-                public_port = int(host_details[0]['HostPort'])
-                instance.port_mapping[private_port] = public_port
-        return instance
@@ -0,0 +1,117 @@
+import contextlib
+import random
+import threading
+import time
+
+import attr
+
+
+# Methods that can safely be sent again if a request fails part way
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+# Calls that block until something happens, and so would hold a slot indefinitely
+BLOCKING_ENDPOINTS = {
+    "GET /events",
+    "POST /containers/{id}/attach",
+    "POST /containers/{id}/wait",
+}
+# Calls that only reply once a build or command has finished, unless the reply is
+# streamed; then, like any streamed call, they only hold a slot until it starts
+LONG_RUNNING_ENDPOINTS = {
+    "POST /build",
+    "POST /exec/{id}/start",
+}
+
+
+def retry_delay(attempt, base=0.25, cap=5.0):
+    """
+    Returns how long to wait before retry number attempt (from 0), using
+    exponential backoff with full jitter so parallel threads spread out.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+@attr.s
+class AdaptiveLimiter:
+    """
+    Limits how many requests can be in flight at once. The limit shrinks
+    by half when requests get slower than target_latency or time out, and
+    creeps back up towards max_limit while they are fast.
+    """
+    max_limit = attr.ib()
+    # Seconds a request should take on a healthy daemon
+    target_latency = attr.ib()
+    min_limit = attr.ib(default=1)
+
+    def __attrs_post_init__(self):
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.latency = None
+        self.last_decrease = 0
+        self.condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager that blocks until the request can be sent.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify()
+
+    def record(self, duration, overloaded=False):
+        """
+        Adjusts the limit given how long a request took, and if it failed in
+        a way that suggests the daemon is overloaded (a timeout).
+        """
+        with self.condition:
+            if self.latency is None:
+                self.latency = duration
+            else:
+                # Smooth it out so one slow call does not halve the limit
+                self.latency = self.latency * 0.8 + duration * 0.2
+            now = time.monotonic()
+            if overloaded or self.latency > self.target_latency:
+                # Only back off once per round trip, as the calls already in
+                # flight were sent under the old limit
+                if now - self.last_decrease > self.latency:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.last_decrease = now
+            else:
+                # Grows by about one per limit's worth of fast calls
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+@attr.s
+class RequestLimiter:
+    """
+    Separate limits for a single host's cheap calls (inspects and lists)
+    and heavy ones (creating, starting and stopping containers, pulls).
+    """
+    cheap_limit = attr.ib(default=16)
+    heavy_limit = attr.ib(default=4)
+
+    def __attrs_post_init__(self):
+        self.cheap = AdaptiveLimiter(self.cheap_limit, target_latency=1)
+        # Stops wait up to 10 seconds for containers to exit by themselves
+        self.heavy = AdaptiveLimiter(self.heavy_limit, target_latency=15)
+
+    def for_request(self, endpoint, stream=False):
+        """
+        Returns the limiter for a request to the endpoint (as named by
+        normalize_endpoint), or None if it should not be limited.
+        """
+        method = endpoint.split(" ", 1)[0]
+        if endpoint in BLOCKING_ENDPOINTS or (stream and method in IDEMPOTENT_METHODS):
+            # Streamed reads, like following logs, also last indefinitely
+            return None
+        if endpoint in LONG_RUNNING_ENDPOINTS and not stream:
+            # These would hold a heavy slot, and skew its latency, for minutes
+            return None
+        return self.cheap if method in IDEMPOTENT_METHODS else self.heavy
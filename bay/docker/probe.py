@@ -0,0 +1,130 @@
+import json
+import os
+import time
+
+import attr
+
+from ..utils.threading import parallel_map
+
+
+@attr.s
+class ProbeResult:
+    """
+    What was found when checking if a host is up.
+    """
+    url = attr.ib()
+    reachable = attr.ib()
+    # Round-trip time of a ping, in seconds
+    latency = attr.ib(default=None)
+    api_version = attr.ib(default=None)
+    error = attr.ib(default=None)
+    checked = attr.ib(default=attr.Factory(time.time))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{
+            field.name: data.get(field.name)
+            for field in attr.fields(cls)
+        })
+
+
+@attr.s
+class ProbeCache:
+    """
+    Remembers recent probe results on disk (by URL), so commands run soon
+    after one another do not all wait on a host that is down.
+    """
+    path = attr.ib()
+    ttl = attr.ib(default=30)
+
+    def load(self):
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, url):
+        """
+        Returns the cached ProbeResult for the URL, or None if there is no
+        fresh one.
+        """
+        entry = self.load().get(url)
+        if not isinstance(entry, dict) or time.time() - (entry.get("checked") or 0) > self.ttl:
+            return None
+        return ProbeResult.from_dict(entry)
+
+    def set_many(self, results):
+        data = self.load()
+        for result in results:
+            data[result.url] = attr.asdict(result)
+        # Write then rename so other processes never see a partial file
+        temporary_path = "{}.{}".format(self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temporary_path, "w") as fh:
+                json.dump(data, fh)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            # It's only a cache
+            pass
+
+
+@attr.s
+class HostProber:
+    """
+    Checks hosts are up, all at once and with a short timeout, rather than
+    waiting on each host's normal client in turn.
+    """
+    # Seconds to wait for each host to answer
+    timeout = attr.ib(default=2)
+    cache = attr.ib(default=None)
+
+    def probe_host(self, host):
+        # Use a throwaway client, so a short timeout can be set and no
+        # API version negotiated
+        import docker
+        from docker.constants import MINIMUM_DOCKER_API_VERSION
+        client = None
+        start = time.perf_counter()
+        try:
+            client = docker.APIClient(
+                base_url=host.url,
+                version=MINIMUM_DOCKER_API_VERSION,
+                timeout=self.timeout,
+                tls=host.tls_config(),
+            )
+            client.ping()
+            latency = time.perf_counter() - start
+            api_version = client.version(api_version=False)["ApiVersion"]
+        except Exception as e:
+            return ProbeResult(url=host.url, reachable=False, error=str(e) or e.__class__.__name__)
+        finally:
+            if client is not None:
+                client.close()
+        if host.version_cache is not None:
+            # Saves the client negotiating it when the host is used
+            host.version_cache.set(host.url, api_version)
+        return ProbeResult(url=host.url, reachable=True, latency=latency, api_version=api_version)
+
+    def probe(self, hosts, refresh=False):
+        """
+        Returns a ProbeResult for each host, in order. Recent results are
+        reused from the cache unless refresh is set.
+        """
+        hosts = list(hosts)
+        results = [
+            None if refresh or self.cache is None else self.cache.get(host.url)
+            for host in hosts
+        ]
+        missing = [host for host, result in zip(hosts, results) if result is None]
+        if missing:
+            probed = dict(zip(
+                [host.url for host in missing],
+                parallel_map(self.probe_host, missing),
+            ))
+            if self.cache is not None:
+                self.cache.set_many(probed.values())
+            results = [result or probed[host.url] for host, result in zip(hosts, results)]
+        return results
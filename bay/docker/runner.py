@@ -1,5 +1,8 @@
+import concurrent.futures
 import dockerpty
 import functools
+import hashlib
+import json
 import os
 import sys
 import threading
@@ -7,8 +10,17 @@ import time
 
 from docker.errors import NotFound
 
-from .introspect import FormationIntrospector
+from .introspect import (
+    CONFIG_HASH_LABEL,
+    CREATE_HASH_LABEL,
+    ENVIRONMENT_LABEL,
+    LINKS_LABEL,
+    PROXY_LABEL,
+    REPLICA_LABEL,
+    FormationIntrospector,
+)
 from .towline import Towline
+from .watcher import docker_timestamp
 from ..cli.tasks import Task
 from ..constants import PluginHook
 from ..exceptions import ContainerBootFailure, DockerRuntimeError, DockerInteractiveException, NotFoundException
@@ -34,10 +46,18 @@ class FormationRunner:
         self.app = app
         self.host = host
         self.formation = formation
-        self.introspector = FormationIntrospector(self.host, self.formation.graph)
+        # Follow the host's events so waiting on containers needs no polling
+        self.watcher = app.get_watcher(host)
+        self.context = app.get_run_context(host)
         self.task = task
         # Allows things to override and not have anything stop
         self.stop = stop
+        # IDs of stopped containers being started again rather than recreated
+        self.reused_ids = set()
+        # Containers created ahead of starting, and which of them were started
+        self.prepared = {}
+        self.started = set()
+        self.abandoned = False
 
     def run(self):
         """
@@ -50,7 +70,7 @@ class FormationRunner:
         # Containers that have changes will need both.
         to_stop = set()
         to_start = set()
-        current_formation = self.introspector.introspect()
+        current_formation = self.context.formation()
         for instance in current_formation:
             if instance not in self.formation:
                 to_stop.add(instance)
@@ -69,6 +89,10 @@ class FormationRunner:
         # Start containers in parallel
         if to_start:
             self.start_containers(to_start)
+        # Anything staying that was suspended needs resuming
+        to_resume = self.paused_instances(self.formation) - to_start
+        if to_resume:
+            self.resume_containers(to_resume)
 
     # Shared "dependency-based parallel execution" code
 
@@ -121,11 +145,13 @@ class FormationRunner:
 
     # Stopping
 
-    def stop_containers(self, instances):
+    def stop_containers(self, instances, executor=None):
         """
-        Stops all the specified containers in parallel, still respecting links
+        Stops all the specified containers in parallel, still respecting links.
+        Anything linking to a container is stopped before it; a different
+        executor can be passed to do something else in that order.
         """
-        current_formation = self.introspector.introspect()
+        current_formation = self.context.formation()
 
         # Inner function that we can pass to dependency_sort
         @functools.lru_cache(maxsize=512)
@@ -143,14 +169,18 @@ class FormationRunner:
         self.parallel_execute(
             instances,
             lambda instance, done: all((linker in done) for linker in get_incoming_links(instance)),
-            executor=self.stop_container,
+            executor=executor or self.stop_container,
         )
 
     def stop_container(self, instance):
         # Wait for the global container manipulation lock
         with changing_containers.entry_lock(instance.name):
             # See if it was already stopped
-            if not self.host.container_running(instance.name, ignore_exists=True):
+            try:
+                state = self.host.client.inspect_container(instance.name)["State"]
+            except NotFound:
+                return
+            if not state["Running"]:
                 return
             # Stop the container
             stop_task = Task(
@@ -158,26 +188,97 @@ class FormationRunner:
                 parent=self.task,
                 collapse_if_finished=True,
             )
+            # A paused container cannot act on the stop signal
+            if state["Paused"]:
+                self.host.client.unpause(instance.name)
             self.host.client.stop(
                 instance.name,
                 timeout=0 if instance.container.fast_kill else 10,
             )
+            self.context.container_stopped(instance)
             stop_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
 
-    # Starting
+    # Suspending
 
-    def start_containers(self, instances):
+    def paused_instances(self, formation):
+        """
+        Returns the instances in the formation whose containers are paused.
+        """
+        paused = {
+            container["Names"][0].lstrip("/")
+            for container in self.host.client.containers(filters={"status": "paused"})
+        }
+        return {instance for instance in formation if instance.name in paused}
+
+    def suspend_containers(self, instances):
+        """
+        Pauses all the specified containers in parallel, ones linking to
+        others first, as for stopping.
+        """
+        self.stop_containers(instances, executor=self.pause_container)
+
+    def pause_container(self, instance):
+        with changing_containers.entry_lock(instance.name):
+            state = self.host.client.inspect_container(instance.name)["State"]
+            if not state["Running"] or state["Paused"]:
+                return
+            pause_task = Task(
+                "Suspending {}".format(instance.container.name),
+                parent=self.task,
+                collapse_if_finished=True,
+            )
+            self.host.client.pause(instance.name)
+            pause_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
+    def resume_containers(self, instances):
         """
-        Starts all the specified containers in parallel, respecting links
+        Unpauses all the specified containers in parallel, after the ones
+        they link to. They were never stopped, so there is no boot to wait
+        for (towline or waits).
         """
-        current_formation = self.introspector.introspect()
+        instances = set(instances)
         self.parallel_execute(
             instances,
-            lambda instance, done: all((dependency in done) for dependency in instance.links.values()),
-            executor=self.start_container,
-            done=set(started_instance for started_instance in current_formation),
+            lambda instance, done: all(
+                (dependency in done or dependency not in instances)
+                for dependency in instance.links.values()
+            ),
+            executor=self.unpause_container,
         )
 
+    def unpause_container(self, instance):
+        with changing_containers.entry_lock(instance.name):
+            if not self.host.client.inspect_container(instance.name)["State"]["Paused"]:
+                return
+            resume_task = Task(
+                "Resuming {}".format(instance.container.name),
+                parent=self.task,
+                collapse_if_finished=True,
+            )
+            self.host.client.unpause(instance.name)
+            resume_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
+    # Starting
+
+    def start_containers(self, instances):
+        """
+        Starts all the specified containers in parallel, respecting links.
+        Their containers are created ahead of time, as soon as the ones they
+        link to exist, so only the start itself waits for links to boot.
+        """
+        current_formation = self.context.formation()
+        self.prepare_containers(instances)
+        try:
+            self.parallel_execute(
+                instances,
+                lambda instance, done: all((dependency in done) for dependency in instance.links.values()),
+                executor=self.start_container,
+                done=set(started_instance for started_instance in current_formation),
+            )
+        except BaseException:
+            self.abandon_prepared()
+            raise
+
     def remove_stopped(self, instance):
         """
         Sees if there is a container with the same name and removes it if
@@ -189,9 +290,87 @@ class FormationRunner:
             else:
                 self.host.client.remove_container(instance.name)
 
-    def start_container(self, instance):
+    def prepare_containers(self, instances):
+        """
+        Starts creating the instances' containers in the background. The
+        result of each prepare_container call (or its error) ends up in
+        self.prepared, which start_container waits on.
+        """
+        self.prepared = {instance: concurrent.futures.Future() for instance in instances}
+        self.started = set()
+        self.abandoned = False
+        for instance in instances:
+            ExceptionalThread(target=self.prepare_ahead, args=(instance, ), daemon=True).start()
+
+    def prepare_ahead(self, instance):
+        """
+        Prepares the instance once the containers it links to are created,
+        as pre-start hooks look at them.
+        """
+        future = self.prepared[instance]
+        try:
+            for dependency in instance.links.values():
+                if dependency in self.prepared:
+                    self.prepared[dependency].result()
+            if self.abandoned:
+                future.set_result(None)
+            else:
+                future.set_result(self.prepare_container(instance))
+        except Exception as e:
+            future.set_exception(e)
+
+    def abandon_prepared(self):
+        """
+        Called when starting fails part way through: removes the containers
+        created ahead for instances that then never started, so they are not
+        left behind, and skips creating any more.
+        """
+        self.abandoned = True
+        for instance, future in self.prepared.items():
+            if instance in self.started:
+                continue
+            try:
+                prepared = future.result()
+            except Exception:
+                continue
+            self.remove_prepared(instance, prepared)
+
+    def remove_prepared(self, instance, prepared):
+        """
+        Removes a container made by prepare_container that was not started.
+        """
+        if prepared is None:
+            return
+        container_pointer, start_task = prepared
+        # Stopped containers that were to be reused were there already, so stay
+        if container_pointer["Id"] not in self.reused_ids:
+            try:
+                self.host.client.remove_container(container_pointer)
+            except NotFound:
+                pass
+            self.context.container_created(instance)
+        start_task.finish(status="Not started", status_flavor=Task.FLAVOR_WARNING)
+
+    def dependency_tasks(self, instance):
+        """
+        Returns the start tasks of the containers started in this batch that
+        the instance links to, which it had to wait for.
+        """
+        tasks = []
+        for dependency in instance.links.values():
+            future = self.prepared.get(dependency)
+            if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+                continue
+            prepared = future.result()
+            if prepared is not None:
+                tasks.append(prepared[1])
+        return tasks
+
+    def prepare_container(self, instance):
         """
         Creates the Docker container on the host, ready to be started.
+        Returns the container pointer and the task showing its progress, or
+        None if it is already running.
         """
         # Make sure it's not an abstract container being started.
         if instance.container.abstract and not instance.foreground:
@@ -201,145 +380,324 @@ class FormationRunner:
         with changing_containers.entry_lock(instance.name):
             # See if the container was already started
             if self.host.container_running(instance.name, ignore_exists=True):
-                return
+                return None
 
             start_task = Task(
                 "Starting {}".format(instance.container.name),
                 parent=self.task,
                 collapse_if_finished=True,
             )
+            container_pointer = self.create_container(instance, start_task)
+            self.context.container_created(instance)
+            start_task.update(status="Created")
+            return container_pointer, start_task
 
-            self.remove_stopped(instance)
+    def start_container(self, instance):
+        """
+        Starts the container made by prepare_container and waits for it to boot.
+        """
+        prepared = self.prepared[instance].result()
+        if prepared is None:
+            return
+        container_pointer, start_task = prepared
+        self.started.add(instance)
+        start_task.waited_for = self.dependency_tasks(instance)
+
+        # Wait for the global container manipulation lock
+        with changing_containers.entry_lock(instance.name):
+            try:
+                # Foreground containers launch into a PTY at this point. We use an exception so that
+                # it happens in the main thread.
+                if instance.foreground:
+                    self.go_interactive(container_pointer, start_task)
+                else:
+                    self.host.client.start(container_pointer)
+                    self.wait_for_boot(instance, container_pointer, start_task)
 
-            # Run plugins
-            self.app.run_hooks(PluginHook.PRE_START, host=self.host, instance=instance, task=start_task)
-
-            # See if network exists and if not, create it
-            with network_lock:
-                try:
-                    self.host.client.inspect_network(instance.formation.network)
-                except NotFound:
-                    self.host.client.create_network(
-                        name=instance.formation.network,
-                        driver="bridge",
+                instance = self.introspect_started(instance)
+                self.context.container_started(instance)
+
+                # Run plugins. Proxies have nothing of their own to wait for
+                # or set up; that was done for the real container.
+                if not instance.proxy_for:
+                    self.app.run_hooks(
+                        PluginHook.POST_START,
+                        host=self.host,
+                        instance=instance,
+                        task=start_task,
+                        context=self.context,
                     )
 
-            # Create network configuration for the new container
-            networking_config = self.host.client.create_networking_config({
-                instance.formation.network: self.host.client.create_endpoint_config(
-                    aliases=[instance.formation.network],
-                    links=[
-                        (link.name, alias)
-                        for alias, link in instance.links.items()
-                    ]
-                ),
-            })
+            except ContainerBootFailure as e:
+                raise self.boot_failure(e)
 
-            # Work out volumes configuration
-            volume_mountpoints = []
-            volume_binds = {}
+            start_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
 
-            def add_volume_mount(mount_path, volume):
-                if self.host.supports_cached_volumes and ",cached" not in volume.mode:
-                    volume.mode = volume.mode + ",cached"
-                volume_mountpoints.append(mount_path)
-                volume_binds[volume.source] = {"bind": mount_path, "mode": volume.mode}
+    def reusable_container(self, instance, create_hash):
+        """
+        Returns a pointer to the instance's stopped container if it was
+        created with the same configuration, so it can just be started
+        again; otherwise removes it, if there is one, and returns None.
+        """
+        try:
+            details = self.host.client.inspect_container(instance.name)
+        except NotFound:
+            return None
+        if details["State"]["Running"]:
+            raise DockerRuntimeError("The container {} is already running.".format(instance.container.name))
+        if (details["Config"]["Labels"] or {}).get(CREATE_HASH_LABEL) == create_hash:
+            self.reused_ids.add(details["Id"])
+            self.watcher.container_reused(details["Id"])
+            return {"Id": details["Id"]}
+        self.host.client.remove_container(instance.name)
+        return None
+
+    def create_container(self, instance, start_task):
+        """
+        Runs the pre-start hooks and creates the Docker container for the
+        instance, returning the pointer to it. A stopped container created
+        with exactly the same configuration is reused instead, which keeps
+        its writable layer.
+        """
+        if instance.proxy_for:
+            self.remove_stopped(instance)
+            return self.create_proxy(instance, start_task)
+        # Hash what was asked for, before plugins add to it
+        config_hash = instance.config_hash()
+
+        # Run plugins
+        self.app.run_hooks(
+            PluginHook.PRE_START,
+            host=self.host,
+            instance=instance,
+            task=start_task,
+            context=self.context,
+        )
+
+        # Make sure the network exists, and join it
+        self.ensure_network(instance)
+        networking_config = self.networking_config(instance)
 
-            for mount_path, volume in instance.container.bound_volumes.items():
+        # Work out volumes configuration
+        volume_mountpoints = []
+        volume_binds = {}
+
+        def add_volume_mount(mount_path, volume, source=None):
+            if self.host.supports_cached_volumes and ",cached" not in volume.mode:
+                volume.mode = volume.mode + ",cached"
+            volume_mountpoints.append(mount_path)
+            volume_binds[source or volume.source] = {"bind": mount_path, "mode": volume.mode}
+
+        for mount_path, volume in instance.container.bound_volumes.items():
+            if os.path.isdir(volume.source):
+                add_volume_mount(mount_path, volume)
+            elif volume.required:
+                raise NotFoundException(
+                    "Volume mount source directory {} does not exist".format(volume.source)
+                )
+        # Add any active devmodes
+        for mount_name in instance.devmodes:
+            for mount_path, volume in instance.container.devmodes[mount_name].items():
                 if os.path.isdir(volume.source):
                     add_volume_mount(mount_path, volume)
-                elif volume.required:
+                else:
                     raise NotFoundException(
-                        "Volume mount source directory {} does not exist".format(volume.source)
+                        "Devmode source directory {} does not exist".format(volume.source)
                     )
-            # Add any active devmodes
-            for mount_name in instance.devmodes:
-                for mount_path, volume in instance.container.devmodes[mount_name].items():
-                    if os.path.isdir(volume.source):
-                        add_volume_mount(mount_path, volume)
-                    else:
-                        raise NotFoundException(
-                            "Devmode source directory {} does not exist".format(volume.source)
-                        )
-            for mount_path, volume in instance.container.named_volumes.items():
-                add_volume_mount(mount_path, volume)
+        for mount_path, volume in instance.container.named_volumes.items():
+            add_volume_mount(mount_path, volume, source=self.context.volume_name(volume.source))
+
+        arguments = dict(
+            command=instance.command,
+            detach=not instance.foreground,
+            stdin_open=instance.foreground,
+            tty=instance.foreground,
+            # Ports is a list of ports in the container to expose
+            ports=list(instance.ports.keys()),
+            environment=instance.environment,
+            volumes=volume_mountpoints,
+            name=instance.name,
+            host_config=self.host.client.create_host_config(
+                mem_limit=instance.mem_limit,
+                binds=volume_binds,
+                port_bindings=instance.ports,
+                publish_all_ports=True,
+                security_opt=['seccomp:unconfined'],
+            ),
+            networking_config=networking_config,
+            labels=self.labels(instance, config_hash),
+        )
+        create_hash = hashlib.sha256(
+            json.dumps([instance.image_id, arguments], sort_keys=True, default=str).encode("utf8"),
+        ).hexdigest()
+        container_pointer = self.reusable_container(instance, create_hash)
+        if container_pointer is not None:
+            start_task.update(status="Reusing stopped container")
+            return container_pointer
+
+        # Create container
+        arguments["labels"][CREATE_HASH_LABEL] = create_hash
+        return self.host.client.create_container(instance.image_id, **arguments)
+
+    def ensure_network(self, instance):
+        """
+        Creates the formation's network if it does not exist yet.
+        """
+        with network_lock:
+            try:
+                self.host.client.inspect_network(instance.formation.network)
+            except NotFound:
+                self.host.client.create_network(
+                    name=instance.formation.network,
+                    driver="bridge",
+                )
 
-            # Create container
-            container_pointer = self.host.client.create_container(
-                instance.image_id,
-                command=instance.command,
-                detach=not instance.foreground,
-                stdin_open=instance.foreground,
-                tty=instance.foreground,
-                # Ports is a list of ports in the container to expose
-                ports=list(instance.ports.keys()),
-                environment=instance.environment,
-                volumes=volume_mountpoints,
-                name=instance.name,
-                host_config=self.host.client.create_host_config(
-                    mem_limit=instance.mem_limit,
-                    binds=volume_binds,
-                    port_bindings=instance.ports,
-                    publish_all_ports=True,
-                    security_opt=['seccomp:unconfined'],
+    def networking_config(self, instance):
+        """
+        Returns the network configuration for a new container. Every instance
+        is also known on the network by its container's name, which is what
+        links that are not Docker links (see ContainerInstance.docker_links) use.
+        """
+        return self.host.client.create_networking_config({
+            instance.formation.network: self.host.client.create_endpoint_config(
+                aliases=[instance.formation.network, instance.container.name],
+                links=[(link.name, alias) for alias, link in instance.docker_links().items()],
+            ),
+        })
+
+    def labels(self, instance, config_hash):
+        """
+        Returns the labels to put on the instance's container, which
+        introspection reads back.
+        """
+        labels = {
+            "com.eventbrite.bay.container": instance.container.name,
+            CONFIG_HASH_LABEL: config_hash,
+            REPLICA_LABEL: str(instance.replica),
+            # Not all links are Docker links, so record them all
+            LINKS_LABEL: json.dumps({alias: link.name for alias, link in instance.links.items()}),
+        }
+        if self.app.containers.environment is not None:
+            labels[ENVIRONMENT_LABEL] = self.app.containers.environment
+        return labels
+
+    def create_proxy(self, instance, start_task, timeout=600):
+        """
+        Creates a port proxy (the port_proxy_container image) forwarding to
+        the real container on another host, once that is running there.
+        """
+        remote_host = self.app.hosts[instance.proxy_for]
+        remote_watcher = self.app.get_watcher(remote_host)
+        start_task.update(status="Waiting for {} on {}".format(instance.container.name, remote_host.alias))
+
+        def remote_instances():
+            return [
+                remote_instance
+                for remote_instance in remote_watcher.formation().instances_of(instance.container)
+                if not remote_instance.proxy_for
+            ]
+
+        if not remote_watcher.wait_for(lambda: bool(remote_instances()), timeout):
+            raise DockerRuntimeError(
+                "{} did not start on {} for its proxy".format(instance.container.name, remote_host.alias),
+                instance=instance,
+            )
+        # Links go to the first replica, so the proxy does too
+        remote_instance = min(remote_instances(), key=lambda remote_instance: remote_instance.replica)
+        port_mapping = remote_instance.port_mapping
+        if not port_mapping:
+            raise DockerRuntimeError(
+                "{} publishes no ports on {} for its proxy to forward; expose them in its Dockerfile".format(
+                    instance.container.name,
+                    remote_host.alias,
                 ),
-                networking_config=networking_config,
-                labels={
-                    "com.eventbrite.bay.container": instance.container.name,
-                }
+                instance=instance,
             )
-            try:
-                # Foreground containers launch into a PTY at this point. We use an exception so that
-                # it happens in the main thread.
-                if instance.foreground:
-                    def handler():
-                        dockerpty.start(self.host.client, container_pointer)
-                        self.host.client.remove_container(container_pointer)
-                    start_task.finish(status="Going to shell", status_flavor=Task.FLAVOR_GOOD)
-                    raise DockerInteractiveException(handler)
-
-                else:
-                    # Make a towline instance and wait on it
-                    self.host.client.start(container_pointer)
-                    towline = Towline(self.host, instance.name)
-                    while True:
-                        status, message = towline.status
-                        if status is None:
-                            if message is not None:
-                                start_task.update(status=message)
-                        elif status is True:
-                            break
-                        elif status is False:
-                            raise ContainerBootFailure(
-                                "Failed during towline",
-                                instance=instance,
-                            )
-                        time.sleep(0.5)
-
-                try:
-                    # Replace the instance with an introspected copy of the live one so it has networking details
-                    instance = FormationIntrospector(
-                        self.host,
-                        self.app.containers,
-                    ).introspect_single_container(instance.name)
-                except DockerRuntimeError:
-                    raise ContainerBootFailure(
-                        "Failed after towline",
-                        instance=instance,
-                    )
+        self.ensure_network(instance)
+        return self.host.client.create_container(
+            instance.image_id,
+            detach=True,
+            environment={
+                "PROXY_HOST": remote_host.external_host_address,
+                # Space-separated "container_port:remote_port" pairs to forward
+                "PROXY_PORTS": " ".join(
+                    "{}:{}".format(private, public)
+                    for private, public in sorted(port_mapping.items())
+                ),
+            },
+            name=instance.name,
+            networking_config=self.networking_config(instance),
+            labels=dict(self.labels(instance, instance.config_hash()), **{PROXY_LABEL: instance.proxy_for}),
+        )
 
-                # Run plugins
-                self.app.run_hooks(PluginHook.POST_START, host=self.host, instance=instance, task=start_task)
+    def go_interactive(self, container_pointer, start_task):
+        """
+        Hands the terminal to a foreground container, by raising an exception
+        that the main thread catches to run it.
+        """
+        def handler():
+            dockerpty.start(self.host.client, container_pointer)
+            self.host.client.remove_container(container_pointer)
+        start_task.finish(status="Going to shell", status_flavor=Task.FLAVOR_GOOD)
+        raise DockerInteractiveException(handler)
 
-            except ContainerBootFailure as e:
-                message = "{}\n\n{}".format(
-                    "Container {} failed to boot! ({})".format(e.instance.container.name, e.message),
-                    self.host.client.logs(e.instance.name, tail=10).decode('utf-8'),
-                )
-                raise DockerRuntimeError(
-                    message,
-                    code="BOOT_FAIL",
-                    instance=e.instance,
+    def wait_for_boot(self, instance, container_pointer, start_task):
+        """
+        Waits for a started container to finish booting, using towline.
+        """
+        started_at = None
+        if container_pointer["Id"] in self.reused_ids:
+            started_at = self.started_at(self.host.client.inspect_container(container_pointer["Id"]))
+        towline = Towline(self.host, instance.name, container_id=container_pointer["Id"], started_at=started_at)
+        while True:
+            status, message = towline.status
+            if status is None:
+                if message is not None:
+                    start_task.update(status=message)
+            elif status is True:
+                break
+            elif status is False:
+                raise ContainerBootFailure(
+                    "Failed during towline",
+                    instance=instance,
                 )
+            # Wake straight away if it dies
+            self.watcher.wait_for(lambda: self.watcher.has_exited(container_pointer["Id"]), 0.5)
 
-            start_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+    @staticmethod
+    def started_at(details):
+        """
+        Returns when the inspected container was last started, in seconds.
+        """
+        return float(docker_timestamp(details["State"]["StartedAt"]))
+
+    def introspect_started(self, instance):
+        """
+        Returns an introspected copy of the live instance, so it has
+        networking details.
+        """
+        try:
+            return FormationIntrospector(
+                self.host,
+                self.app.containers,
+            ).introspect_single_container(instance.name)
+        except DockerRuntimeError:
+            raise ContainerBootFailure(
+                "Failed after towline",
+                instance=instance,
+            )
+
+    def boot_failure(self, e):
+        """
+        Turns a ContainerBootFailure into the error to show, with the end
+        of the container's logs.
+        """
+        message = "{}\n\n{}".format(
+            "Container {} failed to boot! ({})".format(e.instance.container.name, e.message),
+            self.host.client.logs(e.instance.name, tail=10).decode('utf-8'),
+        )
+        return DockerRuntimeError(
+            message,
+            code="BOOT_FAIL",
+            instance=e.instance,
+        )
@@ -15,9 +15,13 @@ class Towline(object):
     # Number of seconds till we conclude the container doesn't have towline support
     NO_TOWLINE_TIMEOUT = 2
 
-    def __init__(self, host, container_name):
+    def __init__(self, host, container_name, container_id=None, started_at=None):
         self.host = host
         self.container_name = container_name
+        self.container_id = container_id
+        # When a stopped container is started again, files from its last
+        # boot are still there; anything older than this (in seconds) is ignored
+        self.started_at = started_at
         self._first_try = None
 
     def _read_file(self, path, default=None):
@@ -26,13 +30,25 @@ class Towline(object):
         """
         try:
             tar_stream = self.host.client.get_archive(self.container_name, path)[0]
-            tar = tarfile.open(fileobj=BytesIO(tar_stream.read()))
-            contents = tar.extractfile(tar.getmembers()[0]).read().strip()
-            return contents or default
+            return self.file_contents(tar_stream.read(), default, self.started_at)
         except NotFound:
             # Ignore missing containers or other errors
             return default
 
+    @staticmethod
+    def file_contents(tar_data, default=None, not_before=None):
+        """
+        Returns the contents of the single file in a tar archive, or default
+        if it was last modified before the not_before time.
+        """
+        tar = tarfile.open(fileobj=BytesIO(tar_data))
+        member = tar.getmembers()[0]
+        # Tar times may be truncated to the second
+        if not_before is not None and member.mtime < int(not_before):
+            return default
+        contents = tar.extractfile(member).read().strip()
+        return contents or default
+
     @property
     def status(self):
         """
@@ -40,12 +56,19 @@ class Towline(object):
         Finished is True for successful boot, False for unsuccessful boot, and
         None if boot is still occuring.
         """
-        # The container should exist by now
-        if not self.host.container_exists(self.container_name):
-            return (False, "Container does not exist")
-        # If it's dead, that's a failed boot
-        if not self.host.container_running(self.container_name):
-            return (False, "Container died during boot")
+        if self.host.watcher is not None and self.container_id is not None:
+            # The watcher hears about it dying without asking the host, but
+            # the die event from a previous run of the container can be late
+            if self.host.watcher.has_exited(self.container_id):
+                if not self.host.container_running(self.container_name, ignore_exists=True):
+                    return (False, "Container died during boot")
+        else:
+            # The container should exist by now
+            if not self.host.container_exists(self.container_name):
+                return (False, "Container does not exist")
+            # If it's dead, that's a failed boot
+            if not self.host.container_running(self.container_name):
+                return (False, "Container died during boot")
         # See if we can read a status from it
         if self._first_try is None:
             self._first_try = time.time()
@@ -53,8 +76,14 @@ class Towline(object):
         # If there's no status and the timeout has passed, they're not towline compatible
         if container_status is None and time.time() - self._first_try > self.NO_TOWLINE_TIMEOUT:
             return (True, "Non-towline boot complete")
-        # See if boot is complete
-        if self._read_file("/tugboat/boot_complete"):
+        return self.parse_status(container_status, self._read_file("/tugboat/boot_complete"))
+
+    def parse_status(self, container_status, boot_complete):
+        """
+        Works out the status tuple from the contents of the boot status and
+        boot complete files.
+        """
+        if boot_complete:
             return (True, "Towline boot complete")
         elif container_status:
             # Try to parse out a JSON thing
@@ -0,0 +1,48 @@
+import json
+import os
+import time
+
+import attr
+
+
+@attr.s
+class ApiVersionCache:
+    """
+    Remembers the API version negotiated with each Docker daemon (by URL)
+    on disk, so new clients do not have to ask for it every run.
+    """
+    path = attr.ib()
+    # Re-negotiate after this many seconds, in case the daemon was upgraded
+    ttl = attr.ib(default=86400)
+
+    def load(self):
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, url):
+        """
+        Returns the cached API version for the URL, or None if there is no
+        fresh one.
+        """
+        entry = self.load().get(url)
+        if not isinstance(entry, dict) or time.time() - entry.get("time", 0) > self.ttl:
+            return None
+        return entry.get("version")
+
+    def set(self, url, version):
+        data = self.load()
+        data[url] = {"version": version, "time": time.time()}
+        # Write then rename so other processes never see a partial file
+        temporary_path = "{}.{}".format(self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temporary_path, "w") as fh:
+                json.dump(data, fh)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            # It's only a cache
+            pass
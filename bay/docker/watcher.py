@@ -0,0 +1,246 @@
+import calendar
+import re
+import threading
+import time
+
+import attr
+
+from ..containers.formation import ContainerFormation, ContainerInstance
+from ..exceptions import DockerRuntimeError
+from ..utils.threading import ExceptionalThread
+from .introspect import FormationIntrospector
+
+
+CONTAINER_LABEL = "com.eventbrite.bay.container"
+TIMESTAMP_REGEX = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)$")
+
+
+def docker_timestamp(value):
+    """
+    Converts an RFC 3339 time from the Docker API (like info's SystemTime)
+    into the "seconds.nanoseconds" form its events endpoint takes for since.
+    """
+    match = TIMESTAMP_REGEX.match(value)
+    if not match:
+        raise ValueError("Cannot parse Docker timestamp {}".format(value))
+    base, fraction, zone = match.groups()
+    seconds = calendar.timegm(time.strptime(base, "%Y-%m-%dT%H:%M:%S"))
+    if zone != "Z":
+        offset = int(zone[1:3]) * 3600 + int(zone[4:6]) * 60
+        seconds -= offset if zone[0] == "+" else -offset
+    return "{}.{}".format(seconds, (fraction or "").ljust(9, "0")[:9])
+
+
+def event_timestamp(event):
+    """
+    Returns the since-style timestamp of an event.
+    """
+    if "timeNano" in event:
+        return "{}.{:09d}".format(*divmod(int(event["timeNano"]), 1000000000))
+    return "{}.000000000".format(event["time"])
+
+
+@attr.s
+class FormationWatcher:
+    """
+    Keeps a live model of what bay containers are running on a host - their
+    instances, ports, image IDs and health - by introspecting once and then
+    following the host's event stream, so reading it costs no API calls and
+    changes show up as soon as Docker reports them.
+
+    Anything that changes the host itself (the runner) should still tell
+    the watcher with container_started/container_stopped, so its own reads
+    straight afterwards do not race the event arriving.
+    """
+    host = attr.ib()
+    graph = attr.ib()
+    network = attr.ib(default=None)
+
+    def __attrs_post_init__(self):
+        if self.network is None:
+            self.network = self.graph.namespace
+        self.condition = threading.Condition()
+        self.instances = {}
+        self.health = {}
+        self.exited_ids = set()
+        self.since = None
+        self.thread = None
+        self.response = None
+        self.stopped = False
+
+    def start(self):
+        """
+        Loads the current state and starts following events.
+        """
+        introspector = FormationIntrospector(self.host, self.graph, self.network)
+        self.since = docker_timestamp(self.host.client.info()["SystemTime"])
+        # Subscribe before introspecting so nothing is missed in between;
+        # events queued meanwhile are replayed on top, which is harmless.
+        events = self.subscribe()
+        formation = introspector.introspect()
+        with self.condition:
+            self.instances = {instance.name: instance for instance in formation}
+        self.thread = ExceptionalThread(target=self.run, args=(events, ), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        if self.response is not None:
+            self.response.close()
+
+    def after_fork(self):
+        """
+        Called in a forked child. The state is inherited as of the fork, but
+        the thread following events is not, so this resumes from the last
+        event seen the first time the state is read.
+        """
+        self.condition = threading.Condition()
+        self.thread = None
+        self.response = None
+
+    def ensure_following(self):
+        with self.condition:
+            if self.thread is None and not self.stopped:
+                self.thread = ExceptionalThread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def subscribe(self):
+        self.response, events = self.host.client.event_stream(
+            since=self.since,
+            filters={"type": "container", "label": CONTAINER_LABEL},
+        )
+        return events
+
+    def run(self, events=None):
+        while not self.stopped:
+            try:
+                for event in (events or self.subscribe()):
+                    self.handle_event(event)
+            except Exception:
+                if self.stopped:
+                    return
+                # Reconnect, replaying anything since the last event seen
+                time.sleep(1)
+            events = None
+
+    def handle_event(self, event):
+        """
+        Applies a single container event to the state.
+        """
+        action = event.get("Action") or event.get("status") or ""
+        name = event.get("Actor", {}).get("Attributes", {}).get("name")
+        instance = None
+        if action == "start" and name:
+            # Inspect outside the lock so readers are not held up
+            try:
+                instance = FormationIntrospector(
+                    self.host,
+                    self.graph,
+                    self.network,
+                ).introspect_single_container(name)
+            except (DockerRuntimeError, KeyError):
+                # Not on our network, or already gone again
+                instance = None
+        with self.condition:
+            if action == "start":
+                # A stopped container can be started again with the same ID
+                self.exited_ids.discard(event.get("id"))
+            if instance is not None:
+                self.instances[name] = instance
+            elif action in ("die", "destroy"):
+                self.instances.pop(name, None)
+                self.health.pop(name, None)
+                self.exited_ids.add(event.get("id"))
+            elif action.startswith("health_status:"):
+                self.health[name] = action.split(":", 1)[1].strip()
+            self.since = event_timestamp(event)
+            self.condition.notify_all()
+
+    # Changes made by this process
+
+    def container_started(self, instance):
+        with self.condition:
+            self.instances[instance.name] = instance
+            self.condition.notify_all()
+
+    def container_stopped(self, instance):
+        with self.condition:
+            self.instances.pop(instance.name, None)
+            self.health.pop(instance.name, None)
+            self.condition.notify_all()
+
+    def container_reused(self, container_id):
+        """
+        Forgets that the container exited, as it is about to be started
+        again rather than replaced.
+        """
+        with self.condition:
+            self.exited_ids.discard(container_id)
+
+    # Reading state
+
+    def formation(self):
+        """
+        Returns a copy of the running formation that is safe to modify.
+        """
+        self.ensure_following()
+        formation = ContainerFormation(self.graph, self.network)
+        with self.condition:
+            for instance in self.instances.values():
+                copy = instance.clone()
+                copy.links = {
+                    alias: target.name if isinstance(target, ContainerInstance) else target
+                    for alias, target in instance.links.items()
+                }
+                copy.container_id = getattr(instance, "container_id", None)
+                copy.ip_address = getattr(instance, "ip_address", None)
+                copy.port_mapping = dict(getattr(instance, "port_mapping", {}))
+                formation.add_instance(copy)
+        for instance in formation:
+            instance.resolve_links()
+        return formation
+
+    def has_container(self, container):
+        """
+        Returns True if there is an instance of the Container running.
+        """
+        self.ensure_following()
+        with self.condition:
+            return any(instance.container == container for instance in self.instances.values())
+
+    def is_running(self, name):
+        """
+        Returns True if the container with the given runtime name is running.
+        """
+        self.ensure_following()
+        with self.condition:
+            return name in self.instances
+
+    def has_exited(self, container_id):
+        """
+        Returns True if the container with the given ID has died since the
+        watcher started (or since it was last started). The die event can
+        arrive late, so treat this as a hint and confirm it with the host.
+        """
+        self.ensure_following()
+        with self.condition:
+            return container_id in self.exited_ids
+
+    def health_of(self, name):
+        """
+        Returns the last health status Docker reported for the container,
+        or None if it has not reported one since the watcher started.
+        """
+        self.ensure_following()
+        with self.condition:
+            return self.health.get(name)
+
+    def wait_for(self, predicate, timeout):
+        """
+        Waits until predicate() is true or timeout seconds pass, waking as
+        soon as an event arrives rather than polling. Returns the last
+        result of predicate().
+        """
+        self.ensure_following()
+        with self.condition:
+            return self.condition.wait_for(predicate, timeout)
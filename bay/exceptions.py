@@ -99,3 +99,9 @@ class DockerNotAvailableError(Exception):
     """
     Raised when Docker is not available (the socket/machine is gone)
     """
+
+
+class PlacementError(Exception):
+    """
+    Raised when containers cannot be placed on the available hosts.
+    """
@@ -45,14 +45,22 @@ class BasePlugin(object, metaclass=PluginMetaclass):
     def load(self):
         pass
 
+    def needs_terminal(self):
+        """
+        Returns True if the plugin's hooks may need to talk to the user's
+        terminal, in which case commands that start containers are not run
+        by the daemon.
+        """
+        return False
+
     def add_command(self, func):
-        self.app.cli.add_command(func)
+        self.app.add_command(func)
 
     def add_alias(self, command_name, alias):
-        self.app.cli.add_alias(command_name, alias)
+        self.app.add_alias(command_name, alias)
 
-    def add_hook(self, hook_type, func):
-        self.app.add_hook(hook_type, func)
+    def add_hook(self, hook_type, func, after=None):
+        self.app.add_hook(hook_type, func, after=after)
 
     def add_catalog_type(self, name):
         self.app.add_catalog_type(name)
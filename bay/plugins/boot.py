@@ -5,8 +5,6 @@ from .base import BasePlugin
 from ..cli.colors import RED
 from ..cli.tasks import Task
 from ..constants import PluginHook
-from ..docker.introspect import FormationIntrospector
-from ..docker.runner import FormationRunner
 from ..exceptions import BadConfigError, ImageNotFoundException
 
 
@@ -34,13 +32,13 @@ class BootPlugin(BasePlugin):
         self.add_hook(PluginHook.PRE_BUILD, self.pre_build)
         self.add_hook(PluginHook.PRE_START, self.pre_start)
 
-    def pre_build(self, host, container, task):
+    def pre_build(self, host, container, task, context=None):
         boot_containers = self.calculate_boot_containers("build", container)
-        self.run_boot_containers(host, boot_containers, task)
+        self.run_boot_containers(host, boot_containers, task, context)
 
-    def pre_start(self, host, instance, task):
+    def pre_start(self, host, instance, task, context=None):
         boot_containers = self.calculate_boot_containers("run", instance.container)
-        self.run_boot_containers(host, boot_containers, task)
+        self.run_boot_containers(host, boot_containers, task, context)
 
     def calculate_boot_containers(self, phase, container):
         """
@@ -75,17 +73,20 @@ class BootPlugin(BasePlugin):
                 )
         return boot_containers
 
-    def run_boot_containers(self, host, containers, task):
+    def run_boot_containers(self, host, containers, task, context=None):
         """
         Takes a dict of {container: required} and makes sure they're all running
         (required ones must be or an error is raised; optional ones are if they
         are available locally).
         """
-        formation = FormationIntrospector(host, self.app.containers).introspect()
+        if not containers:
+            return
+        context = context or self.app.get_run_context(host)
+        formation = context.formation()
         to_boot = set()
         for container, required in containers.items():
             # See if container is already running
-            if any(instance.container == container for instance in formation):
+            if context.is_running(container):
                 continue
             # See if it can be started (use a runner just for missing images - maybe improve this)
             try:
@@ -99,9 +100,9 @@ class BootPlugin(BasePlugin):
         # Boot those containers
         if to_boot:
             boot_task = Task("Running boot containers", parent=task)
-            formation = FormationIntrospector(host, self.app.containers).introspect()
+            formation = context.formation()
             for container in to_boot:
                 formation.add_container(container, host)
-            runner = FormationRunner(self.app, host, formation, boot_task, stop=False)
+            runner = self.app.get_runner(host, formation, boot_task, stop=False)
             runner.run()
             boot_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
@@ -1,6 +1,7 @@
 import attr
 import click
 import datetime
+import os
 import sys
 from docker.errors import NotFound
 
@@ -11,10 +12,10 @@ from ..cli.tasks import Task
 from ..constants import PluginHook
 from ..docker.build import Builder
 from ..docker.introspect import FormationIntrospector
-from ..docker.runner import FormationRunner
 from ..exceptions import BuildFailureError, ImagePullFailure
 from .gc import GarbageCollector
 from ..utils.sorting import dependency_sort
+from ..utils.threading import parallel_map
 
 
 def _get_providers(app):
@@ -26,6 +27,18 @@ def _get_providers(app):
     return providers
 
 
+def _build_log_path(app, host):
+    """
+    Returns the build log path for the host. Hosts other than the default
+    one get their own log, so parallel builds don't interleave.
+    """
+    logfile_name = app.config.get_path('bay', 'build_log_path', app)
+    if host.alias != "default":
+        root, ext = os.path.splitext(logfile_name)
+        logfile_name = "{}-{}{}".format(root, host.alias, ext)
+    return logfile_name
+
+
 def _handle_build_failure(app, logfile_name):
     click.echo(RED("Build failed! Last 15 lines of log:"))
     # TODO: More efficient tailing
@@ -57,7 +70,7 @@ class BuildPlugin(BasePlugin):
         self.add_hook(PluginHook.PRE_START, self.pre_start)
         self.add_hook(PluginHook.POST_BUILD, self.post_build)
 
-    def pre_start(self, host, instance, task):
+    def pre_start(self, host, instance, task, context=None):
         """
         Safety net to stop you booting volume-providing containers normally,
         and to catch and build volume containers if they're needed
@@ -68,22 +81,17 @@ class BuildPlugin(BasePlugin):
         # If the container has named volumes, see if they're provided by anything else
         # and if so, if they're built.
         # First, collect what volumes are provided by what containers
-        providers = _get_providers(self.app)
+        context = context or self.app.get_run_context(host)
+        providers = context.providers
         # Now see if any of the volumes we're trying to add need it
         for _, volume in instance.container.named_volumes.items():
             name = volume.source
             if name in providers:
                 # Alright, this is one that could be provided. Does it already exist?
-                try:
-                    host.client.inspect_volume(name)
-                except NotFound:
+                if not context.volume_exists(name):
                     # Aha! Build it!
                     try:
-                        logfile_name = self.app.config.get_path(
-                            'bay',
-                            'build_log_path',
-                            self.app,
-                        )
+                        logfile_name = _build_log_path(self.app, host)
                         Builder(
                             host,
                             providers[name],
@@ -94,8 +102,9 @@ class BuildPlugin(BasePlugin):
                         ).build()
                     except BuildFailureError:
                         _handle_build_failure(self.app, logfile_name)
+                    context.volumes_changed()
 
-    def post_build(self, host, container, task):
+    def post_build(self, host, container, task, context=None):
         """
         Intercepts builds of volume-providing containers and unpacks them.
 
@@ -123,7 +132,7 @@ class BuildPlugin(BasePlugin):
             if instances_to_remove:
                 formation.remove_instances(instances_to_remove)
                 stop_task = Task("Stopping containers", parent=task)
-                FormationRunner(self.app, host, formation, stop_task).run()
+                self.app.get_runner(host, formation, stop_task).run()
                 stop_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
                 remove_task = Task("Removing containers", parent=task)
                 for instance in instances_to_remove:
@@ -142,6 +151,8 @@ class BuildPlugin(BasePlugin):
             except NotFound:
                 volume_task.update(status="Volume {} not found. Creating")
             host.client.create_volume(provides_volume, labels={"build_id": image_details["Id"]})
+            if context is not None:
+                context.volumes_changed()
 
             # Configure the container
             volume_mountpoints = ["/volume/"]
@@ -164,7 +175,7 @@ class BuildPlugin(BasePlugin):
 
 @click.command()
 @click.argument('containers', type=ContainerType(profile=True), nargs=-1)
-@click.option('--host', '-h', type=HostType(), default='default')
+@click.option('--host', '-h', type=HostType(all=True), default='default')
 @click.option('--cache/--no-cache', default=True)
 @click.option('--recursive/--one', '-r/-1', default=True)
 @click.option('--verbose/--quiet', '-v/-q', default=True)
@@ -179,11 +190,9 @@ def build(app, containers, host, cache, recursive, verbose):
     if not containers:
         containers = [ContainerType.Profile]
 
-    logfile_name = app.config.get_path('bay', 'build_log_path', app)
+    hosts = host if isinstance(host, list) else [host]
     containers_to_pull = []
     containers_to_build = []
-    pulled_containers = set()
-    failed_pulls = set()
 
     task = Task("Building", parent=app.root_task)
     start_time = datetime.datetime.now().replace(microsecond=0)
@@ -219,6 +228,46 @@ def build(app, containers, host, cache, recursive, verbose):
 
     containers_to_pull = dependency_sort(containers_to_pull, container_volume_dependencies)
 
+    # Each host pulls and builds what it is missing, all at once
+    def build_on_host(host):
+        host_task = task
+        if len(hosts) > 1:
+            host_task = Task("Building on {}".format(host.alias), parent=task)
+        _build_on_host(
+            app,
+            host,
+            list(containers_to_pull),
+            list(containers_to_build),
+            parent_task=host_task,
+            cache=cache,
+            recursive=recursive,
+            verbose=verbose,
+        )
+        if host_task is not task:
+            host_task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
+    parallel_map(build_on_host, hosts)
+
+    task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
+    # Show total build time metric after everything is complete
+    end_time = datetime.datetime.now().replace(microsecond=0)
+    time_delta_str = str(end_time - start_time)
+    if time_delta_str.startswith('0:'):
+        # no point in showing hours, unless it runs for more than one hour
+        time_delta_str = time_delta_str[2:]
+    click.echo("Total build time [{}]".format(GREEN(time_delta_str)))
+
+
+def _build_on_host(app, host, containers_to_pull, containers_to_build, parent_task, cache, recursive, verbose):
+    """
+    Pulls or builds the containers, and the ancestors they need, on one host.
+    """
+    task = parent_task
+    logfile_name = _build_log_path(app, host)
+    pulled_containers = set()
+    failed_pulls = set()
+
     # Try pulling each container to pull, and add it to containers_to_build if
     # it fails. If it works, remember we pulled it, so we don't have to pull it
     # again later.
@@ -309,13 +358,3 @@ def build(app, containers, host, cache, recursive, verbose):
             _handle_build_failure(app, logfile_name)
 
     app.run_hooks(PluginHook.POST_GROUP_BUILD, host=host, containers=ancestors_to_build, task=task)
-
-    task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
-
-    # Show total build time metric after everything is complete
-    end_time = datetime.datetime.now().replace(microsecond=0)
-    time_delta_str = str(end_time - start_time)
-    if time_delta_str.startswith('0:'):
-        # no point in showing hours, unless it runs for more than one hour
-        time_delta_str = time_delta_str[2:]
-    click.echo("Total build time [{}]".format(GREEN(time_delta_str)))
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+
+import attr
+import click
+
+from .base import BasePlugin
+from .. import daemon as bay_daemon
+from ..cli.colors import CYAN, GREEN, RED
+
+
+@attr.s
+class DaemonPlugin(BasePlugin):
+    """
+    Plugin for running a warm standby process that bay commands are handed
+    off to, skipping plugin, config and Docker client start-up costs.
+    """
+
+    def load(self):
+        self.add_command(daemon)
+
+
+@click.group()
+def daemon():
+    """
+    Manages the warm standby daemon for this project.
+    """
+    pass
+
+
+@daemon.command()
+@click.option("--foreground", is_flag=True, help="Run in this process rather than in the background.")
+@click.option(
+    "--idle-timeout",
+    type=int,
+    default=3600,
+    help="Exit after this many seconds without a command (0 to never exit).",
+)
+@click.pass_obj
+def start(app, foreground, idle_timeout):
+    """
+    Starts the daemon for this project.
+    """
+    path = bay_daemon.socket_path(app.config["bay"]["home"])
+    if bay_daemon.request(bay_daemon.FRAME_STATUS, path) is not None:
+        click.echo(RED("The bay daemon is already running."))
+        sys.exit(1)
+    server = bay_daemon.DaemonServer(app, path, idle_timeout=idle_timeout)
+    if foreground:
+        click.echo("Bay daemon listening on {}".format(CYAN(path)))
+        server.serve()
+        return
+    # Detach fully (double fork) so the daemon outlives this shell
+    sys.stdout.flush()
+    sys.stderr.flush()
+    if os.fork() == 0:
+        os.setsid()
+        if os.fork() == 0:
+            log_path = path[:-len(".sock")] + ".log"
+            log_fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(log_fd, 1)
+            os.dup2(log_fd, 2)
+            code = 0
+            try:
+                server.serve()
+            except BaseException:
+                code = 1
+                raise
+            finally:
+                os._exit(code)
+        os._exit(0)
+    # Wait for it to come up so the next command is already fast
+    for _ in range(100):
+        if bay_daemon.request(bay_daemon.FRAME_STATUS, path) is not None:
+            click.echo(GREEN("Bay daemon started."))
+            return
+        time.sleep(0.1)
+    click.echo(RED("The bay daemon did not start; see {}".format(path[:-len(".sock")] + ".log")))
+    sys.exit(1)
+
+
+@daemon.command()
+@click.pass_obj
+def stop(app):
+    """
+    Stops the daemon for this project.
+    """
+    path = bay_daemon.socket_path(app.config["bay"]["home"])
+    if bay_daemon.request(bay_daemon.FRAME_STOP, path) is None:
+        click.echo("The bay daemon is not running.")
+    else:
+        click.echo(GREEN("Bay daemon stopped."))
+
+
+@daemon.command()
+@click.pass_obj
+def status(app):
+    """
+    Shows if the daemon for this project is running.
+    """
+    path = bay_daemon.socket_path(app.config["bay"]["home"])
+    status = bay_daemon.request(bay_daemon.FRAME_STATUS, path)
+    if status is None:
+        click.echo("The bay daemon is not running.")
+        return
+    click.echo("Bay daemon {} running as pid {} for {:.0f}m, {} commands run.".format(
+        status["version"],
+        status["pid"],
+        status["uptime"] / 60,
+        status["commands_run"],
+    ))
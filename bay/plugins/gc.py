@@ -5,8 +5,10 @@ from docker.errors import NotFound
 from .base import BasePlugin
 from ..cli.argument_types import HostType
 from ..cli.tasks import Task
+from ..docker.introspect import ENVIRONMENT_LABEL
 from ..exceptions import DockerRuntimeError
 from ..utils.sorting import dependency_sort
+from ..utils.threading import parallel_map
 
 
 @attr.s
@@ -25,15 +27,42 @@ class GcPlugin(BasePlugin):
 class GarbageCollector:
     """
     Allows garbage collection on a host.
+
+    If given an environment, only that environment's containers (and its
+    network, once nothing is on it) are cleaned up. Images are shared by
+    all environments, so they are left alone. Without one, every dead
+    container is cleaned up except those from environments.
     """
 
     host = attr.ib()
-
-    def gc_all(self, parent_task):
-        task = Task("Running garbage collection", parent=parent_task)
+    environment = attr.ib(default=None)
+    network = attr.ib(default=None)
+
+    @classmethod
+    def for_app(cls, app, host):
+        """
+        Returns a collector for the host that only cleans up the current
+        environment, if one is set.
+        """
+        return cls(
+            host,
+            environment=app.containers.environment,
+            network=app.containers.namespace,
+        )
+
+    def gc_all(self, parent_task, show_host=False):
+        title = "Running garbage collection"
+        if self.environment is not None:
+            title += " for {}".format(self.environment)
+        if show_host:
+            title += " on {}".format(self.host.alias)
+        task = Task(title, parent=parent_task)
         self.gc_containers(task)
-        self.gc_remote_tags(task)
-        self.gc_images(task)
+        if self.environment is not None:
+            self.gc_network(task)
+        else:
+            self.gc_remote_tags(task)
+            self.gc_images(task)
         task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
 
     def gc_containers(self, parent_task):
@@ -54,10 +83,35 @@ class GarbageCollector:
         """
         Gets all container IDs that are not actually running
         """
-        live_containers = set(c['Id'] for c in self.host.client.containers(all=False, trunc=False, quiet=True))
-        all_containers = set(c['Id'] for c in self.host.client.containers(all=True, trunc=False, quiet=True))
+        filters = {}
+        if self.environment is not None:
+            filters["label"] = "{}={}".format(ENVIRONMENT_LABEL, self.environment)
+        live_containers = set(
+            c['Id'] for c in self.host.client.containers(all=False, trunc=False, quiet=True, filters=filters)
+        )
+        all_containers = set(
+            c['Id'] for c in self.host.client.containers(all=True, trunc=False, filters=filters)
+            # Docker cannot filter on a label being absent, so skip other environments' here
+            if self.environment is not None or ENVIRONMENT_LABEL not in (c.get('Labels') or {})
+        )
         return all_containers - live_containers
 
+    def gc_network(self, parent_task):
+        """
+        Removes the environment's network if no containers are left on it
+        """
+        task = Task("Removing unused network", parent=parent_task)
+        try:
+            details = self.host.client.inspect_network(self.network)
+        except NotFound:
+            task.finish(status="Not present", status_flavor=Task.FLAVOR_NEUTRAL)
+            return
+        if details.get("Containers"):
+            task.finish(status="In use", status_flavor=Task.FLAVOR_NEUTRAL)
+        else:
+            self.host.client.remove_network(self.network)
+            task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
     def gc_remote_tags(self, parent_task):
         """
         Cleans up images without local tags (only remote tags)
@@ -160,10 +214,14 @@ class GarbageCollector:
 
 
 @click.command()
-@click.option('--host', '-h', type=HostType(), default='default')
+@click.option('--host', '-h', type=HostType(all=True), default='all')
 @click.pass_obj
 def gc(app, host):
     """
     Runs the garbage collection manually.
     """
-    GarbageCollector(host).gc_all(app.root_task)
+    hosts = host if isinstance(host, list) else [host]
+    parallel_map(
+        lambda host: GarbageCollector.for_app(app, host).gc_all(app.root_task, show_host=len(hosts) > 1),
+        hosts,
+    )
@@ -18,23 +18,34 @@ class HostsPlugin(BasePlugin):
 
 
 @click.command()
+@click.option("--timeout", "-t", type=float, help="Seconds to wait for each host to answer")
 @click.pass_obj
-def hosts(app):
+def hosts(app, timeout):
     """
     Lists available hosts
     """
+    if timeout is not None:
+        app.hosts.prober.timeout = timeout
+    # Ping all the docker hosts at once to see if they're accessible
+    hosts = list(app.hosts)
+    results = app.hosts.prober.probe(hosts, refresh=True)
     # Start a table
     table = Table([
-        ("ALIAS", 30),
-        ("URL", 50),
-        ("VISIBLE", 10),
+        ("ALIAS", 20),
+        ("URL", 40),
+        ("VISIBLE", 8),
+        ("LATENCY", 8),
+        ("API", 5),
     ])
     table.print_header()
-    # Iterate through docker hosts and ping to see if they're accessible
-    for host in app.hosts:
-        visible = host.client.ping()
+    for host, result in zip(hosts, results):
         table.print_row([
             host.alias,
             host.url,
-            yesno(visible),
+            yesno(result.reachable),
+            "{:.0f}ms".format(result.latency * 1000) if result.reachable else "-",
+            result.api_version or "-",
         ])
+    for host, result in zip(hosts, results):
+        if not result.reachable:
+            click.echo("{}: {}".format(host.alias, result.error), err=True)
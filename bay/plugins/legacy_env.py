@@ -10,13 +10,14 @@ class LegacyEnvPlugin(BasePlugin):
     def load(self):
         self.add_hook(PluginHook.PRE_START, self.add_link_envs)
 
-    def add_link_envs(self, host, instance, task):
+    def add_link_envs(self, host, instance, task, context=None):
         """
         Takes the instance and modifies the environment to have legacy link variables.
         """
+        context = context or self.app.get_run_context(host)
         for alias, target in instance.links.items():
-            # Ask Docker for all open ports
-            ports = host.client.inspect_container(target.name)['NetworkSettings']['Ports']
+            # Ask Docker for all exposed ports; links may only be created, not running, yet
+            ports = context.inspect_container(target.name)['Config']['ExposedPorts']
             if ports:
                 for port, _ in ports.items():
                     number, protocol = port.split("/")
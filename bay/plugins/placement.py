@@ -0,0 +1,173 @@
+import attr
+import click
+import sys
+from docker.errors import NotFound
+
+from .base import BasePlugin
+from .run import run_formation
+from ..cli.colors import CYAN, RED
+from ..cli.table import Table
+from ..cli.tasks import Task
+from ..containers.placement import HostCapacity, PlacementPlanner
+from ..docker.introspect import FormationIntrospector
+from ..exceptions import ImageNotFoundException, PlacementError
+from ..utils import humanize
+from ..utils.sorting import dependency_sort
+from ..utils.threading import parallel_map
+
+
+@attr.s
+class PlacementPlugin(BasePlugin):
+    """
+    Plugin for spreading a profile's containers over several hosts.
+    """
+
+    def load(self):
+        self.add_command(plan)
+
+
+def running_formation(app, host):
+    """
+    Returns the formation running on the host, from its watcher if one is
+    following it.
+    """
+    if host.watcher is not None and host.watcher.graph is app.containers:
+        return host.watcher.formation()
+    return FormationIntrospector(host, app.containers).introspect()
+
+
+def measure_host(app, host):
+    """
+    Returns the host's HostCapacity and {container name: bytes} of memory
+    used by the bay containers running on it. Memory used by system
+    containers, which are left running, is reserved.
+    """
+    memory = humanize.parse_file_size(host.memory) if host.memory else host.client.info()["MemTotal"]
+    capacity = HostCapacity(host=host, memory=memory)
+    usage = {}
+    instances = [instance for instance in running_formation(app, host) if not instance.proxy_for]
+    # Docker takes a second or two to sample each container, so ask for them all at once
+    all_stats = parallel_map(
+        lambda instance: host.client.stats(instance.name, decode=True, stream=False),
+        instances,
+    )
+    for instance, stats in zip(instances, all_stats):
+        used = stats.get("memory_stats", {}).get("usage", 0)
+        if instance.container.system:
+            capacity.reserved += used
+        else:
+            usage[instance.container.name] = max(used, usage.get(instance.container.name, 0))
+    return capacity, usage
+
+
+def unexposed_containers(app, host, containers):
+    """
+    Returns the containers, among those the given ones link to, that neither
+    have fixed ports nor expose any in their image on the host, so a proxy
+    would have nothing to forward to them.
+    """
+    linked = set()
+    for container in dependency_sort(list(containers), app.containers.dependencies):
+        linked.update(app.containers.dependencies(container))
+    result = set()
+    for container in linked:
+        if container.ports:
+            continue
+        try:
+            details = host.client.inspect_image("{}:{}".format(container.image_name, container.image_tag))
+        except NotFound:
+            # Not built here; keep it safe
+            result.add(container)
+            continue
+        if not details["Config"].get("ExposedPorts"):
+            result.add(container)
+    return result
+
+
+def proxy_image_id(app, host):
+    """
+    Returns the ID of the port proxy image on the host, pulling it if needed.
+    """
+    image_name, _, image_tag = app.config["bay"]["port_proxy_container"].partition(":")
+    image_tag = image_tag or "latest"
+    try:
+        return host.images.image_version(image_name, image_tag)
+    except ImageNotFoundException:
+        host.client.pull(image_name, tag=image_tag)
+        return host.images.image_version(image_name, image_tag)
+
+
+@click.command()
+@click.option("--apply", is_flag=True, help="Start the containers where they were placed")
+@click.pass_obj
+def plan(app, apply):
+    """
+    Plans which host each of the profile's containers should run on.
+    """
+    containers = [
+        container
+        for container in app.containers
+        if app.containers.options(container).get('default_boot')
+    ]
+    hosts = app.hosts.reachable()
+    # Measure every host at once
+    measurements = parallel_map(lambda host: measure_host(app, host), hosts)
+    usage = {}
+    for _, host_usage in measurements:
+        for name, used in host_usage.items():
+            usage[name] = max(used, usage.get(name, 0))
+    try:
+        placement = PlacementPlanner(
+            app.containers,
+            [capacity for capacity, _ in measurements],
+            usage=usage,
+            unexposed=unexposed_containers(app, hosts[0], containers),
+        ).plan(containers)
+    except PlacementError as e:
+        click.echo(RED(str(e)))
+        sys.exit(1)
+
+    # Show the plan
+    table = Table([
+        ("CONTAINER", 30),
+        ("HOST", 20),
+        ("MEMORY", 10),
+    ])
+    table.print_header()
+    for container, alias in sorted(placement.assignments.items(), key=lambda item: (item[1], item[0].name)):
+        table.print_row([
+            container.name,
+            alias,
+            humanize.file_size(placement.demands[container]),
+        ])
+    click.echo()
+    for capacity, _ in measurements:
+        alias = capacity.host.alias
+        planned = sum(placement.demands[container] for container in placement.containers_on(alias))
+        click.echo("{}: {} of {} available".format(
+            CYAN(alias),
+            humanize.file_size(planned),
+            humanize.file_size(capacity.available),
+        ))
+        for container, remote_alias in sorted(placement.proxies(alias).items(), key=lambda item: item[0].name):
+            click.echo("  proxy for {} on {}".format(container.name, remote_alias))
+
+    if not apply:
+        return
+
+    # Start everything where it was placed. Proxies wait for the container
+    # they stand in for to start on its host, so all hosts go at once.
+    task = Task("Applying placement", parent=app.root_task)
+
+    def apply_to_host(host):
+        formation = running_formation(app, host)
+        for instance in list(formation):
+            if (instance.proxy_for or not instance.container.system) and instance.formation:
+                formation.remove_instance(instance)
+        image_id = proxy_image_id(app, host) if placement.proxies(host.alias) else None
+        placement.add_to_formation(formation, host, image_id)
+        host_task = Task("Starting containers on {}".format(host.alias), parent=task)
+        run_formation(app, host, formation, host_task)
+
+    parallel_map(apply_to_host, hosts)
+    task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
@@ -6,6 +6,7 @@ from ..cli.argument_types import HostType
 from ..cli.table import Table
 from ..docker.introspect import FormationIntrospector
 from ..utils import humanize
+from ..utils.threading import parallel_map
 
 
 @attr.s
@@ -19,42 +20,56 @@ class PsPlugin(BasePlugin):
 
 
 @click.command()
-@click.option("--host", "-h", type=HostType(), default="default")
+@click.option("--host", "-h", type=HostType(all=True), default="all")
 @click.option("--stats/--no-stats", "-s")
 @click.pass_obj
 def ps(app, host, stats):
     """
     Shows details about all containers currently running
     """
-    # Run the introspector to get the details
-    formation = FormationIntrospector(host, app.containers).introspect()
+    hosts = host if isinstance(host, list) else [host]
+
+    def host_rows(host):
+        # Use the live state if something (like the daemon) is following the
+        # host's events, otherwise run the introspector to get the details
+        if host.watcher is not None and host.watcher.graph is app.containers:
+            formation = host.watcher.formation()
+        else:
+            formation = FormationIntrospector(host, app.containers).introspect()
+        rows = []
+        for instance in sorted(formation, key=lambda i: i.name):
+            row = [
+                instance.container.name,
+                instance.name,
+            ]
+            if stats:
+                # Get the memory usage from the docker host
+                container_stats = host.client.stats(instance.name, decode=True, stream=False)
+                row.append(humanize.file_size(container_stats['memory_stats']['usage']))
+            # Add in port info
+            row.append(", ".join(
+                "{}->{}".format(private, public)
+                for private, public in instance.port_mapping.items()
+            ))
+            rows.append(row)
+        return rows
+
+    # Ask every host at once
+    results = parallel_map(host_rows, hosts)
     # Print formation details
+    columns = [
+        ("NAME", 30),
+        ("DOCKER NAME", 40),
+    ]
     if stats:
-        table = Table([
-            ("NAME", 30),
-            ("DOCKER NAME", 40),
-            ("MEMORY", 10),
-            ("PORTS (CONTAINER->HOST)", 30),
-        ])
-    else:
-        table = Table([
-            ("NAME", 30),
-            ("DOCKER NAME", 40),
-            ("PORTS (CONTAINER->HOST)", 30),
-        ])
+        columns.append(("MEMORY", 10))
+    columns.append(("PORTS (CONTAINER->HOST)", 30))
+    if len(hosts) > 1:
+        columns.insert(0, ("HOST", 15))
+    table = Table(columns)
     table.print_header()
-    for instance in sorted(formation, key=lambda i: i.name):
-        row = [
-            instance.container.name,
-            instance.name,
-        ]
-        if stats:
-            # Get the memory usage from the docker host
-            stats = host.client.stats(instance.name, decode=True, stream=False)
-            row.append(humanize.file_size(stats['memory_stats']['usage']))
-        # Add in port info
-        row.append(", ".join(
-            "{}->{}".format(private, public)
-            for private, public in instance.port_mapping.items()
-        ))
-        table.print_row(row)
+    for host, rows in zip(hosts, results):
+        for row in rows:
+            if len(hosts) > 1:
+                row.insert(0, host.alias)
+            table.print_row(row)
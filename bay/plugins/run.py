@@ -7,7 +7,6 @@ from ..cli.argument_types import ContainerType, HostType
 from ..cli.colors import RED
 from ..cli.tasks import Task
 from ..docker.introspect import FormationIntrospector
-from ..docker.runner import FormationRunner
 from ..exceptions import DockerRuntimeError, ImageNotFoundException
 
 
@@ -27,6 +26,9 @@ class RunPlugin(BasePlugin):
         self.add_command(restart)
         self.add_alias(restart, "hup")
         self.add_alias(restart, "reload")
+        self.add_command(scale)
+        self.add_command(suspend)
+        self.add_command(resume)
 
 
 @click.command()
@@ -137,12 +139,97 @@ def restart(app, containers, host):
         app.invoke("up", host=host)
 
 
+@click.command()
+@click.argument("counts", nargs=-1, required=True)
+@click.option("--host", "-h", type=HostType(), default="default")
+@click.pass_obj
+def scale(app, counts, host):
+    """
+    Sets how many replicas of containers to run, like "web=4"
+    """
+    # Parse and check the counts before changing anything
+    replicas = {}
+    for count in counts:
+        name, _, number = count.partition("=")
+        try:
+            container = app.containers[name]
+            number = int(number)
+        except (KeyError, ValueError):
+            click.echo(RED("Invalid scale {} - use container=number".format(count)))
+            sys.exit(1)
+        if number < 1:
+            click.echo(RED("{} needs at least one replica; use `bay stop {}` instead".format(name, name)))
+            sys.exit(1)
+        replicas[container] = number
+    # Remember them in the user profile, so `bay up` keeps them
+    for container, number in replicas.items():
+        app.containers.set_option(container, "replicas", number)
+        if app.user_profile.file_path is not None:
+            details = app.user_profile.containers.setdefault(container.name, {})
+            if number == 1:
+                details.pop("replicas", None)
+            else:
+                details["replicas"] = number
+    if app.user_profile.file_path is not None:
+        app.user_profile.save()
+    # Add or remove replicas, leaving the ones that stay alone
+    formation = FormationIntrospector(host, app.containers).introspect()
+    for container, number in replicas.items():
+        try:
+            formation.scale(container, number, host)
+        except ImageNotFoundException as e:
+            click.echo(RED(str(e)))
+            sys.exit(1)
+    task = Task("Scaling containers", parent=app.root_task)
+    run_formation(app, host, formation, task)
+
+
+@click.command()
+@click.option("--host", "-h", type=HostType(), default="default")
+@click.pass_obj
+def suspend(app, host):
+    """
+    Pauses all running containers, to be resumed quickly later
+    """
+    formation = FormationIntrospector(host, app.containers).introspect()
+    task = Task("Suspending containers", parent=app.root_task)
+    runner = app.get_runner(host, formation, task)
+    try:
+        runner.suspend_containers([instance for instance in formation if not instance.container.system])
+    except DockerRuntimeError as e:
+        click.echo(RED(str(e)))
+    else:
+        task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
+
+@click.command()
+@click.option("--host", "-h", type=HostType(), default="default")
+@click.pass_obj
+def resume(app, host):
+    """
+    Unpauses containers paused by suspend
+    """
+    formation = FormationIntrospector(host, app.containers).introspect()
+    task = Task("Resuming containers", parent=app.root_task)
+    runner = app.get_runner(host, formation, task)
+    paused = runner.paused_instances(formation)
+    if not paused:
+        task.finish(status="Nothing is suspended", status_flavor=Task.FLAVOR_NEUTRAL)
+        return
+    try:
+        runner.resume_containers(paused)
+    except DockerRuntimeError as e:
+        click.echo(RED(str(e)))
+    else:
+        task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+
+
 def run_formation(app, host, formation, task):
     """
     Common function to run a formation change.
     """
     try:
-        FormationRunner(app, host, formation, task).run()
+        app.get_runner(host, formation, task).run()
     # General docker/runner error
     except DockerRuntimeError as e:
         click.echo(RED(str(e)))
@@ -5,7 +5,6 @@ import click
 import subprocess
 
 from .base import BasePlugin
-from ..docker.introspect import FormationIntrospector
 from ..exceptions import DockerRuntimeError
 from ..constants import PluginHook
 
@@ -26,7 +25,7 @@ class SSHAgentPlugin(BasePlugin):
         self.add_hook(PluginHook.PRE_BUILD, self.pre_build)
         self.add_hook(PluginHook.PRE_START, self.pre_start)
 
-    def pre_build(self, host, container, task):
+    def pre_build(self, host, container, task, context=None):
         """
         Injects the SSH_AUTH_HOST variable into builds if it's needed.
         """
@@ -36,7 +35,7 @@ class SSHAgentPlugin(BasePlugin):
         if not uses_ssh:
             return
         # See if the SSH auth container is running
-        if self.ssh_container_running(host):
+        if self.ssh_container_running(host, context):
             if 'SSH_AUTH_HOST' in container.possible_buildargs:
                 container.buildargs['SSH_AUTH_HOST'] = host.build_host_ip
             # TODO Deprecate TUGBOAT_SSH_AUTH_HOST by deleting the below lines.
@@ -47,7 +46,7 @@ class SSHAgentPlugin(BasePlugin):
                 "The container {} needs an SSH Agent to build but one is not started".format(container.name),
             )
 
-    def pre_start(self, host, instance, task):
+    def pre_start(self, host, instance, task, context=None):
         """
         Catches the ssh-agent container being started and gives it the right
         environment variables, as well as passing the auth details into containers.
@@ -64,7 +63,7 @@ class SSHAgentPlugin(BasePlugin):
             if not uses_ssh:
                 return
             # See if the SSH auth container is running
-            if self.ssh_container_running(host):
+            if self.ssh_container_running(host, context):
                 instance.environment['SSH_AUTH_HOST'] = host.build_host_ip
                 # TODO Deprecate TUGBOAT_SSH_AUTH_HOST by deleting the below line.
                 instance.environment['TUGBOAT_SSH_AUTH_HOST'] = host.build_host_ip
@@ -89,15 +88,16 @@ class SSHAgentPlugin(BasePlugin):
                     uses_ssh = True
         return uses_ssh, required
 
-    def ssh_container_running(self, host):
+    def ssh_container_running(self, host, context=None):
         """
         Returns True if the agent container is running on the host, False otherwise.
         """
-        formation = FormationIntrospector(host, self.app.containers).introspect()
-        for instance in formation:
-            if instance.container.name == self.CONTAINER_NAME:
-                return True
-        return False
+        try:
+            container = self.app.containers[self.CONTAINER_NAME]
+        except KeyError:
+            return False
+        context = context or self.app.get_run_context(host)
+        return context.is_running(container)
 
     def key_paths(self):
         """
@@ -114,6 +114,16 @@ class SSHAgentPlugin(BasePlugin):
             if os.path.isfile(path):
                 yield path
 
+    def needs_terminal(self):
+        """
+        Encrypted keys need their passphrase typed in when the agent starts.
+        """
+        for path in self.key_paths():
+            with open(path, "rb") as fh:
+                if b"ENCRYPTED" in fh.read():
+                    return True
+        return False
+
     def read_key(self, path):
         """
         Returns a key, optionally prompting for passphrase.
@@ -4,6 +4,7 @@ import click
 from .base import BasePlugin
 from ..cli.argument_types import HostType, ContainerType
 from ..cli.colors import RED
+from ..docker.introspect import ENVIRONMENT_LABEL
 
 
 class TailPlugin(BasePlugin):
@@ -30,7 +31,11 @@ def tail(app, host, container, lines, follow=False):
     # We don't use formation here as it doesn't include stopped containers;
     # instead, we manually go through the list.
     for docker_container in host.client.containers(all=True):
-        if docker_container['Labels'].get('com.eventbrite.bay.container', None) == container.name:
+        labels = docker_container['Labels']
+        if (
+            labels.get('com.eventbrite.bay.container', None) == container.name and
+            labels.get(ENVIRONMENT_LABEL, None) == app.containers.environment
+        ):
             # We found it!
             container_name = docker_container['Names'][0]
             break
@@ -45,11 +45,12 @@ def list(app, host):
         ("CONTAINERS", 50)
     ])
     table.print_header()
-    # Collect volume information from containers
+    # Collect volume information from containers, by their names in this environment
+    context = app.get_run_context(host)
     users = {}
     for container in app.containers:
         for _, source in container.named_volumes.items():
-            users.setdefault(source.source, set()).add(container.name)
+            users.setdefault(context.volume_name(source.source), set()).add(container.name)
     # Print volumes
     for details in sorted((host.client.volumes()['Volumes'] or []), key=lambda x: x['Name']):
         table.print_row([
@@ -67,9 +68,10 @@ def destroy(app, host, name):
     Destroys a single volume
     """
     task = Task("Destroying volume {}".format(name))
-    # Run GC first to clean up stopped containers
+    # Run GC first to clean up stopped containers (only this environment's,
+    # as the volume is too)
     from .gc import GarbageCollector
-    GarbageCollector(host).gc_all(task)
+    GarbageCollector.for_app(app, host).gc_all(task)
     # Remove the volume
     formation = FormationIntrospector(host, app.containers).introspect()
     instance_conflicts = [instance.container.name for instance in formation.get_instances_using_volume(name)]
@@ -78,7 +80,7 @@ def destroy(app, host, name):
             name, ",".join(instance_conflicts)), status_flavor=Task.FLAVOR_BAD)
     else:
         try:
-            host.client.remove_volume(name)
+            host.client.remove_volume(app.get_run_context(host).volume_name(name))
         except NotFound:
             task.add_extra_info("There is no volume called {}".format(name))
             task.finish(status="Not found", status_flavor=Task.FLAVOR_BAD)
@@ -1,3 +1,4 @@
+import asyncio
 import attr
 import http.client
 import ssl
@@ -27,8 +28,9 @@ class WaitsPlugin(BasePlugin):
         self.add_catalog_item("wait", "tcp", TcpWait)
         self.add_catalog_item("wait", "time", TimeWait)
         self.add_catalog_item("wait", "file", FileWait)
+        self.add_catalog_item("wait", "health", HealthWait)
 
-    def post_start(self, host, instance, task):
+    def post_start(self, host, instance, task, context=None):
         # Loop through all waits and build instances
         wait_instances = []
         for wait in instance.container.waits:
@@ -48,26 +50,90 @@ class WaitsPlugin(BasePlugin):
             wait_instance.task.update(status="Waiting")
             wait_instances.append(wait_instance)
 
+        if context is not None and context.loop is not None:
+            # An async runner is running; probe on its event loop. This holds
+            # the hook's thread, which the runner gives each container one of.
+            asyncio.run_coroutine_threadsafe(
+                self.wait_async(host, instance, task, wait_instances),
+                context.loop,
+            ).result()
+            return
+
         # Check on them all until they finish
+        container_id = getattr(instance, "container_id", None)
         while wait_instances:
             # See if the container actually died
-            if not host.container_running(instance.name):
-                task.update(status="Dead", status_flavor=Task.FLAVOR_BAD)
-
-                raise ContainerBootFailure(
-                    "Failed during waits",
-                    instance=instance,
-                )
+            self.check_running(not self.has_died(host, instance), instance, task)
             # Check the waits
             for wait_instance in list(wait_instances):
                 try:
-                    if wait_instance.ready():
-                        wait_instance.task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
-                        wait_instances.remove(wait_instance)
+                    result = wait_instance.ready()
                 except Exception as e:
-                    task.update(status="Failed", status_flavor=Task.FLAVOR_BAD)
-                    raise DockerRuntimeError("Failed while waiting for {}:\n{}".format(instance.container.name, e))
-            time.sleep(1)
+                    result = e
+                self.check_result(result, wait_instance, wait_instances, instance, task)
+            if host.watcher is not None and container_id is not None:
+                # Check again early if it dies
+                host.watcher.wait_for(lambda: host.watcher.has_exited(container_id), 1)
+            else:
+                time.sleep(1)
+
+    async def wait_async(self, host, instance, task, wait_instances):
+        """
+        Like the waiting loop in post_start, but running every wait's check
+        at once on the event loop. Waits with a ready_async coroutine use
+        it; others run ready() in the loop's thread pool.
+        """
+        loop = asyncio.get_event_loop()
+        while wait_instances:
+            died = await loop.run_in_executor(None, self.has_died, host, instance)
+            self.check_running(not died, instance, task)
+            results = await asyncio.gather(
+                *[
+                    wait_instance.ready_async() if getattr(wait_instance, "ready_async", None)
+                    else loop.run_in_executor(None, wait_instance.ready)
+                    for wait_instance in wait_instances
+                ],
+                return_exceptions=True
+            )
+            for wait_instance, result in zip(list(wait_instances), results):
+                self.check_result(result, wait_instance, wait_instances, instance, task)
+            if wait_instances:
+                await asyncio.sleep(1)
+
+    def has_died(self, host, instance):
+        """
+        Says if the started container has died. The watcher hears of that
+        by the container's ID, so it cannot be confused with another
+        container of the same name; as its die events can be late, a death
+        it reports is confirmed with the host.
+        """
+        container_id = getattr(instance, "container_id", None)
+        if host.watcher is not None and container_id is not None:
+            if not host.watcher.has_exited(container_id):
+                return False
+            return not host.container_running(instance.name, ignore_exists=True)
+        return not host.container_running(instance.name)
+
+    def check_running(self, running, instance, task):
+        if not running:
+            task.update(status="Dead", status_flavor=Task.FLAVOR_BAD)
+
+            raise ContainerBootFailure(
+                "Failed during waits",
+                instance=instance,
+            )
+
+    def check_result(self, result, wait_instance, wait_instances, instance, task):
+        """
+        Handles the result of a wait's check, which is True if it is
+        finished or an exception if it failed.
+        """
+        if isinstance(result, Exception):
+            task.update(status="Failed", status_flavor=Task.FLAVOR_BAD)
+            raise DockerRuntimeError("Failed while waiting for {}:\n{}".format(instance.container.name, result))
+        if result:
+            wait_instance.task.finish(status="Done", status_flavor=Task.FLAVOR_GOOD)
+            wait_instances.remove(wait_instance)
 
 
 @attr.s
@@ -94,6 +160,14 @@ class TcpWait:
         except socket.error:
             return False
 
+    async def ready_async(self):
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(*self.target()), self.timeout or None)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
     def target(self):
         """
         Returns (host, port) target information.
@@ -118,6 +192,8 @@ class HttpWait(TcpWait):
     expected_codes = attr.ib(default=attr.Factory(lambda: range(200, 400)))
 
     connection_class = http.client.HTTPConnection
+    # Checks need a full request, which the TCP version does not make
+    ready_async = None
 
     def _get_connection(self, **kwargs):
         addr, port = self.target()
@@ -231,3 +307,29 @@ class FileWait:
 
     def description(self):
         return self.waiting_name or "file {}".format(self.path)
+
+
+@attr.s
+class HealthWait:
+    """
+    Waits until the container's Docker healthcheck reports it as healthy
+    """
+
+    instance = attr.ib()
+    host = attr.ib()
+
+    def ready(self):
+        status = None
+        if self.host.watcher is not None:
+            status = self.host.watcher.health_of(self.instance.name)
+        if status is None:
+            health = self.host.client.inspect_container(self.instance.name)["State"].get("Health") or {}
+            status = health.get("Status")
+            if status is None:
+                raise ValueError("{} has no healthcheck".format(self.instance.name))
+        if status == "unhealthy":
+            raise ValueError("{} is unhealthy".format(self.instance.name))
+        return status == "healthy"
+
+    def description(self):
+        return "healthcheck"
@@ -13,3 +13,19 @@ def file_size(value, fmt="{value:.1f} {suffix}", si=False):
         unit = base ** (i + 1)
         if value < unit or i == max_suffix_index:
             return fmt.format(value=(base * value / unit), suffix=suffix)
+
+
+def parse_file_size(value):
+    """
+    Takes a size as Docker accepts it for mem_limit - a number of bytes, or a
+    string like "512m" or "2g" - and returns the number of bytes.
+    """
+    if isinstance(value, int):
+        return value
+    value = str(value).strip().lower()
+    multipliers = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+    if value.endswith("b") and len(value) > 1 and value[-2] in multipliers:
+        value = value[:-1]
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value or 0)
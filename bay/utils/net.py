@@ -1,6 +1,10 @@
+import re
 import socket
 
 
+HOST_PORT_REGEX = re.compile(r"^(.*:)?(\d+)(?:-(\d+))?$")
+
+
 def tcp_is_open(host, port, timeout=None):
     """
     Returns True if a TCP port is open and listening, False otherwise.
@@ -14,3 +18,30 @@ def tcp_is_open(host, port, timeout=None):
         return True
     except socket.error:
         return False
+
+
+def offset_host_port(binding, offset):
+    """
+    Moves the host port of a port binding up by offset. Bindings can be a
+    port, a string like "8000", "127.0.0.1:8000" or "8000-8010", an
+    (address, port) tuple, or a list of those; anything else is returned
+    unchanged.
+    """
+    if isinstance(binding, int):
+        return binding + offset
+    if isinstance(binding, str):
+        match = HOST_PORT_REGEX.match(binding)
+        if not match:
+            return binding
+        address, start, end = match.groups()
+        if address is None and end is None:
+            return int(start) + offset
+        result = "{}{}".format(address or "", int(start) + offset)
+        if end is not None:
+            result += "-{}".format(int(end) + offset)
+        return result
+    if isinstance(binding, tuple) and len(binding) == 2:
+        return (binding[0], offset_host_port(binding[1], offset))
+    if isinstance(binding, list):
+        return [offset_host_port(item, offset) for item in binding]
+    return binding
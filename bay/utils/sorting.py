@@ -8,22 +8,26 @@ def dependency_sort(initial, dependencies):
     and returns a list of the node and its dependencies from most depended
     (depends on nothing) to the node passed in (depends on everything else)
     """
-    deps = list(initial)
     pending = deque(initial)
+    # Mirror of pending for fast membership tests
+    seen = set(initial)
     mapping = {}
     while pending:
         current = pending.popleft()
         mapping[current] = [x for x in dependencies(current) if x is not None]
         for dep in mapping[current]:
-            if dep not in pending and dep not in mapping:
+            if dep not in seen:
+                seen.add(dep)
                 pending.append(dep)
     # Now roll through building a sorted list
     result = []
+    placed = set()
     while mapping:
         len_before = len(mapping)
-        for node, deps in sorted(mapping.items()):
-            if not deps or all((dep in result) for dep in deps):
+        for node, deps in sorted(mapping.items(), key=lambda item: item[0]):
+            if not deps or all((dep in placed) for dep in deps):
                 result.append(node)
+                placed.add(node)
                 del mapping[node]
         if len(mapping) == len_before:
             raise ValueError("Circular dependency detected between: %s" % mapping.keys())
@@ -67,3 +67,30 @@ class ThreadSet(set):
             time.sleep(interval)
         yield
         self.remove(value)
+
+
+def parallel_map(function, items):
+    """
+    Calls function on each item in its own thread and returns the results
+    in the same order, re-raising the first exception (by item order) once
+    they have all finished.
+    """
+    items = list(items)
+    if len(items) == 1:
+        return [function(items[0])]
+    results = [None] * len(items)
+
+    def run(index, item):
+        results[index] = function(item)
+
+    threads = [
+        ExceptionalThread(target=run, args=(index, item), daemon=True)
+        for index, item in enumerate(items)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for thread in threads:
+        thread.maybe_raise()
+    return results
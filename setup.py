@@ -33,13 +33,14 @@ setup(
     extras_require={
         'spell': ['pylev'],
     },
+    python_requires='>=3.5',
     test_suite="tests",
     setup_requires=['pytest-runner'],
     tests_require=['pytest'],
     entry_points='''
         [console_scripts]
-        bay = bay.cli:cli
-        tug = bay.cli:cli
+        bay = bay.daemon:main
+        tug = bay.daemon:main
 
         [bay.plugins]
         attach = bay.plugins.attach:AttachPlugin
@@ -47,6 +48,7 @@ setup(
         build = bay.plugins.build:BuildPlugin
         build_scripts = bay.plugins.build_scripts:BuildScriptsPlugin
         container = bay.plugins.container:ContainerPlugin
+        daemon = bay.plugins.daemon:DaemonPlugin
         doctor = bay.plugins.doctor:DoctorPlugin
         gc = bay.plugins.gc:GcPlugin
         help = bay.plugins.help:HelpPlugin
@@ -54,6 +56,7 @@ setup(
         images = bay.plugins.images:ImagesPlugin
         legacy_env = bay.plugins.legacy_env:LegacyEnvPlugin
         mounts = bay.plugins.mounts:DevModesPlugin
+        placement = bay.plugins.placement:PlacementPlugin
         profile = bay.plugins.profile:ProfilesPlugin
         ps = bay.plugins.ps:PsPlugin
         registry = bay.plugins.registry:RegistryPlugin
@@ -73,7 +76,6 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
         'Topic :: Software Development',
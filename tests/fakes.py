@@ -0,0 +1,65 @@
+"""
+Stand-ins for containers, graphs and hosts that need no directory on disk
+or Docker daemon, shared by the formation and placement tests.
+"""
+import attr
+
+
+@attr.s
+class FakeVolume:
+    source = attr.ib()
+
+
+@attr.s(hash=True)
+class FakeContainer:
+    """
+    Minimal stand-in for a Container that does not need a directory on disk.
+    """
+    name = attr.ib()
+    mem_limit = attr.ib(default=0, hash=False, cmp=False)
+    named_volumes = attr.ib(default=attr.Factory(dict), hash=False, cmp=False)
+    bound_volumes = attr.ib(default=attr.Factory(dict), hash=False, cmp=False)
+    ports = attr.ib(default=attr.Factory(dict), hash=False, cmp=False)
+    environment = attr.ib(default=attr.Factory(dict), hash=False, cmp=False)
+    image_tag = attr.ib(default="local", hash=False, cmp=False)
+    foreground = attr.ib(default=False, hash=False, cmp=False)
+
+    @property
+    def image_name(self):
+        return "test/{}".format(self.name)
+
+
+@attr.s
+class FakeGraph:
+    """
+    Minimal stand-in for a ContainerGraph with explicit dependencies and options.
+    """
+    prefix = attr.ib(default="test")
+    namespace = attr.ib(default="test")
+    _dependencies = attr.ib(default=attr.Factory(dict))
+    _options = attr.ib(default=attr.Factory(dict))
+
+    def dependencies(self, container):
+        return self._dependencies.get(container, set())
+
+    def dependents(self, container):
+        return {
+            candidate
+            for candidate, dependencies in self._dependencies.items()
+            if container in dependencies
+        }
+
+    def options(self, container):
+        return self._options.get(container, {})
+
+
+class FakeImages:
+
+    def image_version(self, image_name, image_tag):
+        return "sha256:{}".format(image_name)
+
+
+@attr.s
+class FakeHost:
+    alias = attr.ib(default="default")
+    images = attr.ib(default=attr.Factory(FakeImages))
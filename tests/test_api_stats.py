@@ -0,0 +1,51 @@
+import unittest
+
+from bay.docker.api_stats import ApiStats, normalize_endpoint
+
+
+class NormalizeEndpointTests(unittest.TestCase):
+    """
+    Tests Docker API URLs are grouped into endpoints correctly.
+    """
+
+    def test_version_and_host_removed(self):
+        self.assertEqual(
+            normalize_endpoint("get", "http+docker://localhost/v1.35/containers/json"),
+            "GET /containers/json",
+        )
+
+    def test_object_ids(self):
+        self.assertEqual(
+            normalize_endpoint("GET", "http+docker://localhost/v1.35/containers/eventbrite.core.1/json"),
+            "GET /containers/{id}/json",
+        )
+        self.assertEqual(
+            normalize_endpoint("DELETE", "http+docker://localhost/v1.35/volumes/data"),
+            "DELETE /volumes/{id}",
+        )
+
+    def test_image_names_with_slashes(self):
+        self.assertEqual(
+            normalize_endpoint("GET", "http+docker://localhost/v1.35/images/tugboat/ssh-agent:latest/json"),
+            "GET /images/{id}/json",
+        )
+        self.assertEqual(
+            normalize_endpoint("DELETE", "http+docker://localhost/v1.35/images/tugboat/ssh-agent"),
+            "DELETE /images/{id}",
+        )
+
+
+class ApiStatsTests(unittest.TestCase):
+
+    def test_record_and_top(self):
+        stats = ApiStats()
+        stats.record("GET /containers/{id}/json", 0.01, bytes_received=100)
+        stats.record("GET /containers/{id}/json", 0.03, bytes_received=100, error=True)
+        stats.record("GET /version", 0.001)
+        top = stats.top(1)
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0].calls, 2)
+        self.assertEqual(top[0].errors, 1)
+        self.assertEqual(top[0].bytes_received, 200)
+        self.assertAlmostEqual(top[0].max_time, 0.03)
+        self.assertEqual(stats.total_calls, 3)
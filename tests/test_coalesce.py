@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+
+from bay.docker.coalesce import SingleFlight, TtlCache
+
+
+class SingleFlightTests(unittest.TestCase):
+    """
+    Tests concurrent identical calls are shared.
+    """
+
+    def test_shared(self):
+        single_flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+        results = []
+
+        def slow_call():
+            calls.append(1)
+            release.wait()
+            return {"Id": "abc"}
+
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight.do("key", slow_call)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"Id": "abc"}] * 5)
+        # Callers get their own copies
+        self.assertEqual(len({id(result) for result in results}), 5)
+        # Once finished, the next call is made again
+        single_flight.do("key", slow_call)
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_shared(self):
+        single_flight = SingleFlight()
+
+        def failing_call():
+            raise ValueError("nope")
+
+        with self.assertRaises(ValueError):
+            single_flight.do("key", failing_call)
+        self.assertEqual(single_flight.flights, {})
+
+
+class TtlCacheTests(unittest.TestCase):
+
+    def test_expiry(self):
+        cache = TtlCache(ttl=60)
+        cache.set("sha256:abc", {"Id": "sha256:abc"})
+        self.assertEqual(cache.get("sha256:abc"), {"Id": "sha256:abc"})
+        self.assertIsNone(cache.get("sha256:def"))
+        cache.ttl = -1
+        cache.set("sha256:abc", {"Id": "sha256:abc"})
+        self.assertIsNone(cache.get("sha256:abc"))
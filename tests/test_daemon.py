@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from bay.daemon import GLOBAL_VALUE_OPTIONS, command_name, should_forward, socket_path
+
+
+class CommandLineTests(unittest.TestCase):
+    """
+    Tests the daemon client finds the subcommand past global options and their values.
+    """
+
+    def test_command_name(self):
+        self.assertEqual(command_name(["up"]), "up")
+        self.assertEqual(command_name(["--environment", "dev", "up"]), "up")
+        self.assertEqual(command_name(["--environment=dev", "up"]), "up")
+        self.assertEqual(command_name(["--hook-stats", "--trace", "t.json", "start", "web"]), "start")
+        self.assertIsNone(command_name(["--output-format", "json"]))
+        self.assertIsNone(command_name([]))
+
+    def test_local_commands(self):
+        self.assertFalse(should_forward(["--output-format", "json", "shell", "web"], {}))
+        self.assertFalse(should_forward(["--trace", "t.json", "attach", "x"], {}))
+        self.assertFalse(should_forward(["--trace=t.json", "daemon", "stop"], {}))
+        self.assertFalse(should_forward(["--environment", "dev", "--profile", "up"], {}))
+        self.assertFalse(should_forward(["up"], {"BAY_NO_DAEMON": "1"}))
+
+    def test_forwarded_commands(self):
+        self.assertTrue(should_forward(["--environment", "dev", "up"], {}))
+        self.assertTrue(should_forward(["--output-format", "json", "ps"], {}))
+        # The value of an option is never the subcommand, even if it looks like one
+        self.assertTrue(should_forward(["--environment", "shell", "ps"], {}))
+
+    def test_value_options_match_cli(self):
+        try:
+            from bay.cli import cli
+        except ImportError as e:
+            self.skipTest("bay.cli cannot be imported: {}".format(e))
+        value_options = {
+            option
+            for param in cli.params
+            if not getattr(param, "is_flag", False)
+            for option in param.opts
+            if option.startswith("--")
+        }
+        self.assertEqual(value_options, GLOBAL_VALUE_OPTIONS)
+
+
+class SocketPathTests(unittest.TestCase):
+    """
+    Tests the client looks for the daemon of the configured home, as `daemon start` does.
+    """
+
+    def test_home_from_config(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.yaml")
+            with open(config_path, "w") as fh:
+                fh.write("bay:\n  home: {}\n".format(directory))
+            with mock.patch.dict(os.environ, {"BAY_CONFIG": config_path}):
+                self.assertEqual(socket_path(), socket_path(directory))
+            self.assertNotEqual(socket_path(directory), socket_path(os.path.join(directory, "other")))
@@ -0,0 +1,200 @@
+import time
+import unittest
+
+from bay.containers.formation import ContainerFormation
+from fakes import FakeContainer, FakeGraph, FakeHost, FakeVolume
+
+
+def build_layered_graph(size, width=10, fan_in=3):
+    """
+    Makes a graph of `size` containers in layers of `width`, where each
+    container depends on up to `fan_in` containers in the layer below it.
+    """
+    containers = [
+        FakeContainer(
+            "c{:04d}".format(i),
+            named_volumes={"/data": FakeVolume("volume-{}".format(i % 7))},
+        )
+        for i in range(size)
+    ]
+    dependencies = {}
+    for i, container in enumerate(containers):
+        layer_start = (i // width - 1) * width
+        if layer_start >= 0:
+            dependencies[container] = {
+                containers[layer_start + ((i + j) % width)]
+                for j in range(fan_in)
+            }
+    return FakeGraph(dependencies=dependencies), containers
+
+
+class FormationIndexTests(unittest.TestCase):
+    """
+    Tests the formation's container, name and volume lookups.
+    """
+
+    def setUp(self):
+        self.graph, self.containers = build_layered_graph(30)
+        self.formation = ContainerFormation(self.graph)
+        self.top = self.containers[-1]
+        self.formation.add_container(self.top, FakeHost())
+
+    def test_dependencies_added_once(self):
+        names = [instance.name for instance in self.formation]
+        self.assertEqual(len(names), len(set(names)))
+        for instance in self.formation:
+            for link in instance.links.values():
+                self.assertIs(link.formation, self.formation)
+
+    def test_lookups(self):
+        self.assertTrue(self.formation.has_container(self.top))
+        instance = self.formation.get_container_instance(self.top.name)
+        self.assertEqual(instance.name, "test.{}.1".format(self.top.name))
+        self.assertIn(instance, self.formation.get_instances_using_volume("volume-{}".format(29 % 7)))
+        with self.assertRaises(ValueError):
+            self.formation.get_container_instance("missing")
+
+    def test_remove_updates_indexes(self):
+        bottom = next(
+            instance for instance in self.formation
+            if not self.graph.dependencies(instance.container)
+        )
+        self.formation.remove_instance(bottom)
+        # Everything depending on the bottom instance goes too, including the top
+        self.assertFalse(self.formation.has_container(bottom.container))
+        self.assertFalse(self.formation.has_container(self.top))
+        remaining = set(self.formation)
+        for volume_users in self.formation._by_volume.values():
+            self.assertTrue(set(volume_users.values()) <= remaining)
+        self.assertEqual(
+            set(instance for replicas in self.formation._by_container.values() for instance in replicas),
+            remaining,
+        )
+
+
+class FormationReplicaTests(unittest.TestCase):
+    """
+    Tests containers can be scaled to several replicas.
+    """
+
+    def setUp(self):
+        self.db = FakeContainer("db")
+        self.web = FakeContainer("web", ports={80: 8000})
+        self.graph = FakeGraph(dependencies={self.web: {self.db}})
+        self.host = FakeHost()
+        self.formation = ContainerFormation(self.graph)
+        self.formation.add_container(self.web, self.host)
+
+    def test_scale_up_and_down(self):
+        self.formation.scale(self.web, 3, self.host)
+        replicas = self.formation.instances_of(self.web)
+        self.assertEqual([i.name for i in replicas], ["test.web.1", "test.web.2", "test.web.3"])
+        # Only the first can have fixed ports
+        self.assertEqual(replicas[0].ports, {80: 8000})
+        self.assertEqual(replicas[2].ports, {})
+        self.assertIs(replicas[2].links["db"], self.formation["test.db.1"])
+        self.formation.scale(self.web, 1, self.host)
+        self.assertEqual([i.name for i in self.formation], ["test.db.1", "test.web.1"])
+        with self.assertRaises(ValueError):
+            self.formation.scale(self.web, 0, self.host)
+
+    def test_removing_dependency_removes_replicas(self):
+        self.formation.scale(self.web, 2, self.host)
+        self.formation.remove_instance(self.formation["test.db.1"])
+        self.assertEqual(list(self.formation), [])
+
+    def test_environment_namespace(self):
+        graph = FakeGraph(namespace="test-feature", dependencies={self.web: {self.db}})
+        formation = ContainerFormation(graph)
+        formation.add_container(self.web, self.host)
+        self.assertEqual(formation.network, "test-feature")
+        self.assertEqual([i.name for i in formation], ["test-feature.db.1", "test-feature.web.1"])
+
+
+class ConfigHashTests(unittest.TestCase):
+    """
+    Tests running instances are compared to desired ones by config hash.
+    """
+
+    def setUp(self):
+        self.db = FakeContainer("db")
+        self.web = FakeContainer("web", environment={"MODE": "dev"})
+        self.formation = ContainerFormation(FakeGraph(dependencies={self.web: {self.db}}))
+        self.formation.add_container(self.web, FakeHost())
+        self.instance = self.formation["test.web.1"]
+        # What introspection returns: no environment, but the label
+        self.running = self.instance.clone()
+        self.running.environment = {}
+        self.running.applied_config_hash = self.instance.config_hash()
+
+    def test_unchanged(self):
+        self.assertFalse(self.instance.different_from(self.running))
+
+    def test_changes_introspection_cannot_see(self):
+        self.instance.environment["MODE"] = "prod"
+        self.assertTrue(self.instance.different_from(self.running))
+        self.instance.environment["MODE"] = "dev"
+        self.instance.command = ["/bin/bash"]
+        self.assertTrue(self.instance.different_from(self.running))
+
+    def test_instances_own_environment(self):
+        self.instance.environment["ADDED"] = "1"
+        self.assertEqual(self.web.environment, {"MODE": "dev"})
+
+    def test_link_target_scaled(self):
+        # Scaling the database turns web's Docker link into a network alias,
+        # which needs web's container recreated
+        self.formation.scale(self.db, 2, FakeHost())
+        self.assertEqual(self.instance.docker_links(), {})
+        self.assertTrue(self.instance.different_from(self.running))
+
+
+class CountingDict(dict):
+    """
+    Dict that counts how many times it is iterated over.
+    """
+    scans = 0
+
+    def __iter__(self):
+        self.scans += 1
+        return super(CountingDict, self).__iter__()
+
+    def keys(self):
+        self.scans += 1
+        return super(CountingDict, self).keys()
+
+    def values(self):
+        self.scans += 1
+        return super(CountingDict, self).values()
+
+    def items(self):
+        self.scans += 1
+        return super(CountingDict, self).items()
+
+
+class FormationScalingTests(unittest.TestCase):
+    """
+    Builds a large formation to catch regressions back to lookups that scan
+    every instance.
+    """
+
+    def test_thousand_containers(self):
+        graph, containers = build_layered_graph(1000)
+        host = FakeHost()
+        formation = ContainerFormation(graph)
+        formation.container_instances = CountingDict()
+        start = time.perf_counter()
+        for container in containers:
+            if not formation.has_container(container):
+                formation.add_container(container, host)
+        for container in containers:
+            self.assertEqual(formation.get_container_instance(container.name).container, container)
+        for volume in range(7):
+            self.assertTrue(formation.get_instances_using_volume("volume-{}".format(volume)))
+        duration = time.perf_counter() - start
+        self.assertEqual(formation.container_instances.scans, 0)
+        # This takes tens of milliseconds; the bound is loose so slow CI machines
+        # pass, but still catches anything quadratic in the number of instances
+        self.assertLess(duration, 2)
+        self.assertEqual(len(list(formation)), 1000)
+
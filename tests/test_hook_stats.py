@@ -0,0 +1,34 @@
+import unittest
+
+from bay.cli.profiling import HookStats, slow_hook_threshold
+
+
+class HookStatsTests(unittest.TestCase):
+    """
+    Tests hook run times are grouped and slow hooks flagged.
+    """
+
+    def test_record_and_sorted(self):
+        stats = HookStats(slow_threshold=0.1)
+        stats.record("pre-start", "build", "pre_start", 0.05)
+        stats.record("pre-start", "build", "pre_start", 0.25)
+        stats.record("pre-start", "boot", "pre_start", 0.01)
+        stats.record("post-start", "waits", "post_start", 0.5)
+        timings = stats.sorted()
+        self.assertEqual(
+            [(timing.hook_type, timing.plugin) for timing in timings],
+            [("post-start", "waits"), ("pre-start", "build"), ("pre-start", "boot")],
+        )
+        build = timings[1]
+        self.assertEqual(build.calls, 2)
+        self.assertAlmostEqual(build.total_time, 0.3)
+        self.assertAlmostEqual(build.mean_time, 0.15)
+        self.assertAlmostEqual(build.max_time, 0.25)
+        self.assertTrue(build.slow)
+        self.assertFalse(timings[2].slow)
+
+    def test_threshold_from_environment(self):
+        self.assertEqual(slow_hook_threshold({}), 0.1)
+        self.assertEqual(slow_hook_threshold({"BAY_SLOW_HOOK_MS": "250"}), 0.25)
+        # A bad value falls back to the default rather than stopping bay
+        self.assertEqual(slow_hook_threshold({"BAY_SLOW_HOOK_MS": "fast"}), 0.1)
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from bay.config import Config
+from bay.docker.hosts import Host, HostManager
+from bay.docker.probe import HostProber, ProbeCache, ProbeResult
+from bay.exceptions import BadConfigError
+
+
+class HostManagerConfigTests(unittest.TestCase):
+    """
+    Tests hosts are built from the "hosts" config section.
+    """
+
+    def make_config(self, hosts):
+        config = Config([])
+        config.add_config({"hosts": hosts}, "<test>")
+        return config
+
+    def test_env_host_by_default(self):
+        with mock.patch.dict(os.environ, {"DOCKER_HOST": "unix:///tmp/docker.sock"}):
+            manager = HostManager.from_config(Config([]))
+        self.assertEqual([host.alias for host in manager], ["default"])
+        self.assertEqual(manager["default"].url, "unix:///tmp/docker.sock")
+
+    def test_configured_hosts(self):
+        manager = HostManager.from_config(self.make_config({
+            "remote": {
+                "url": "tcp://10.0.0.5:2376",
+                "tls_cert_path": "/certs",
+                "aliases": ["r"],
+                "heavy_concurrency": 2,
+            },
+        }))
+        self.assertEqual(len(manager), 2)
+        remote = manager["r"]
+        self.assertIs(remote, manager["remote"])
+        self.assertEqual(remote.tls_ca, "/certs/ca.pem")
+        self.assertEqual(remote.tls_key, "/certs/key.pem")
+        self.assertEqual(remote.heavy_concurrency, 2)
+        # Unset limits come from the bay section
+        self.assertEqual(remote.pool_size, 20)
+        self.assertEqual(sorted(manager.names), ["default", "r", "remote"])
+
+    def test_configured_default_replaces_env(self):
+        manager = HostManager.from_config(self.make_config({
+            "default": {"url": "unix:///tmp/other.sock"},
+        }))
+        self.assertEqual([host.url for host in manager], ["unix:///tmp/other.sock"])
+
+    def test_bad_host(self):
+        with self.assertRaises(BadConfigError):
+            HostManager.from_config(self.make_config({"remote": {"url": "http://example.com"}}))
+        with self.assertRaises(BadConfigError):
+            HostManager.from_config(self.make_config({"remote": {"url": "tcp://a:1", "colour": "red"}}))
+        with self.assertRaises(ValueError):
+            HostManager.from_config(self.make_config({"remote": {"url": "tcp://a:1", "aliases": ["default"]}}))
+
+
+class HostProberTests(unittest.TestCase):
+    """
+    Tests probe results are cached and unreachable hosts are skipped.
+    """
+
+    def test_cached_results_skip_probing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ProbeCache(os.path.join(directory, "probes.json"))
+            prober = HostProber(cache=cache)
+            up = Host.from_config("up", {"url": "tcp://10.0.0.1:2376"})
+            down = Host.from_config("down", {"url": "tcp://10.0.0.2:2376"})
+            probed = []
+
+            def probe_host(host):
+                probed.append(host.alias)
+                return ProbeResult(url=host.url, reachable=host is up, latency=0.01)
+
+            prober.probe_host = probe_host
+            manager = HostManager([up, down], prober)
+            self.assertEqual(manager.reachable(), [up])
+            self.assertEqual(sorted(probed), ["down", "up"])
+            # The second time round comes from the cache
+            self.assertEqual(manager.reachable(), [up])
+            self.assertEqual(len(probed), 2)
+            manager.reachable(refresh=True)
+            self.assertEqual(len(probed), 4)
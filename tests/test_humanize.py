@@ -1,6 +1,6 @@
 import unittest
 
-from bay.utils.humanize import file_size
+from bay.utils.humanize import file_size, parse_file_size
 
 
 class FilesizeTests(unittest.TestCase):
@@ -51,3 +51,16 @@ class FilesizeTests(unittest.TestCase):
             file_size(7300613312, si=True),
             "7.3 GB",
         )
+
+
+class ParseFileSizeTests(unittest.TestCase):
+    """
+    Tests sizes given as Docker takes them for mem_limit are parsed
+    """
+
+    def test_values(self):
+        self.assertEqual(parse_file_size(1000), 1000)
+        self.assertEqual(parse_file_size("1000"), 1000)
+        self.assertEqual(parse_file_size("512m"), 512 * 1024 ** 2)
+        self.assertEqual(parse_file_size("1.5G"), 1536 * 1024 ** 2)
+        self.assertEqual(parse_file_size("2kb"), 2048)
@@ -0,0 +1,48 @@
+import unittest
+
+from bay.docker.limiter import AdaptiveLimiter, RequestLimiter, retry_delay
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+    """
+    Tests the limit backs off when the daemon is slow and recovers after.
+    """
+
+    def test_backs_off_and_recovers(self):
+        limiter = AdaptiveLimiter(8, target_latency=1)
+        limiter.record(0.1, overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+        # Within the same round trip, no further decrease
+        limiter.record(0.1, overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(100):
+            limiter.record(0.1)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_minimum(self):
+        limiter = AdaptiveLimiter(2, target_latency=1)
+        for _ in range(5):
+            limiter.last_decrease = 0
+            limiter.record(5)
+        self.assertEqual(limiter.limit, 1)
+        with limiter.slot():
+            self.assertEqual(limiter.in_flight, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class RequestLimiterTests(unittest.TestCase):
+
+    def test_budgets(self):
+        limiter = RequestLimiter()
+        self.assertIs(limiter.for_request("GET /containers/{id}/json"), limiter.cheap)
+        self.assertIs(limiter.for_request("POST /containers/{id}/start"), limiter.heavy)
+        self.assertIs(limiter.for_request("POST /images/create", stream=True), limiter.heavy)
+        self.assertIsNone(limiter.for_request("GET /containers/{id}/logs", stream=True))
+        self.assertIsNone(limiter.for_request("POST /containers/{id}/wait"))
+        self.assertIsNone(limiter.for_request("POST /exec/{id}/start"))
+        self.assertIsNone(limiter.for_request("POST /build"))
+        self.assertIs(limiter.for_request("POST /build", stream=True), limiter.heavy)
+
+    def test_retry_delay(self):
+        for attempt in range(10):
+            self.assertTrue(0 <= retry_delay(attempt) <= 5)
@@ -0,0 +1,24 @@
+import unittest
+
+from bay.utils.net import offset_host_port
+
+
+class OffsetHostPortTests(unittest.TestCase):
+    """
+    Tests environments' port offsets only move the host port of a binding.
+    """
+
+    def test_plain_ports(self):
+        self.assertEqual(offset_host_port(8000, 1000), 9000)
+        self.assertEqual(offset_host_port("8000", 1000), 9000)
+
+    def test_address_and_range(self):
+        self.assertEqual(offset_host_port("127.0.0.1:8000", 1000), "127.0.0.1:9000")
+        self.assertEqual(offset_host_port("8000-8010", 1000), "9000-9010")
+        self.assertEqual(offset_host_port("127.0.0.1:8000-8010", 10), "127.0.0.1:8010-8020")
+        self.assertEqual(offset_host_port(("127.0.0.1", 8000), 1000), ("127.0.0.1", 9000))
+        self.assertEqual(offset_host_port([8000, "127.0.0.1:8001"], 1), [8001, "127.0.0.1:8002"])
+
+    def test_unknown_unchanged(self):
+        self.assertEqual(offset_host_port("127.0.0.1:", 1000), "127.0.0.1:")
+        self.assertIsNone(offset_host_port(None, 1000))
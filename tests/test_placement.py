@@ -0,0 +1,94 @@
+import unittest
+
+from bay.containers.placement import HostCapacity, Placement, PlacementPlanner
+from bay.exceptions import PlacementError
+from fakes import FakeContainer, FakeGraph, FakeHost, FakeVolume
+
+GIB = 1024 ** 3
+
+
+class PlacementPlannerTests(unittest.TestCase):
+    """
+    Tests containers are spread over hosts by memory, keeping links local
+    where they fit.
+    """
+
+    def setUp(self):
+        self.db = FakeContainer("db", mem_limit="3g")
+        self.web = FakeContainer("web", mem_limit="1g")
+        self.worker = FakeContainer("worker", mem_limit="1g")
+        self.graph = FakeGraph(dependencies={
+            self.web: {self.db},
+            self.worker: {self.db},
+        })
+        self.local = FakeHost("default")
+        self.remote = FakeHost("remote")
+
+    def test_keeps_links_together_when_they_fit(self):
+        placement = PlacementPlanner(self.graph, [
+            HostCapacity(self.local, 8 * GIB),
+            HostCapacity(self.remote, 8 * GIB),
+        ]).plan([self.web, self.worker])
+        self.assertEqual(set(placement.assignments.values()), {"default"})
+        self.assertEqual(placement.proxies("default"), {})
+
+    def test_spreads_and_proxies(self):
+        placement = PlacementPlanner(self.graph, [
+            HostCapacity(self.local, 4 * GIB),
+            HostCapacity(self.remote, 4 * GIB, reserved=GIB),
+        ]).plan([self.web, self.worker])
+        # web fills the rest of the database's host, so worker goes elsewhere
+        self.assertEqual(placement.assignments[self.db], "default")
+        self.assertEqual(placement.assignments[self.web], "default")
+        self.assertEqual(placement.assignments[self.worker], "remote")
+        self.assertEqual(placement.proxies("remote"), {self.db: "default"})
+        formation = placement.formation_for(self.remote, "sha256:proxy")
+        proxy = formation["test.db.proxy"]
+        self.assertEqual(proxy.proxy_for, "default")
+        self.assertEqual(proxy.ports, {})
+        self.assertIs(formation["test.worker.1"].links["db"], proxy)
+        self.assertNotIn(self.web, [instance.container for instance in formation])
+
+    def test_measured_usage_and_volumes(self):
+        self.web.named_volumes = {"/data": FakeVolume("shared")}
+        self.worker.named_volumes = {"/data": FakeVolume("shared")}
+        placement = PlacementPlanner(
+            self.graph,
+            [HostCapacity(self.local, 4 * GIB), HostCapacity(self.remote, 4 * GIB)],
+            usage={"web": 2 * GIB},
+        ).plan([self.web, self.worker])
+        # Sharing a volume, they have to go together
+        self.assertEqual(placement.assignments[self.web], placement.assignments[self.worker])
+        self.assertEqual(placement.demands[self.web], 2 * GIB)
+
+    def test_does_not_fit(self):
+        with self.assertRaises(PlacementError):
+            PlacementPlanner(self.graph, [HostCapacity(self.local, 2 * GIB)]).plan([self.web])
+
+    def test_replicas_demand(self):
+        self.graph._options[self.web] = {"replicas": 3}
+        planner = PlacementPlanner(self.graph, [HostCapacity(self.local, 8 * GIB)])
+        self.assertEqual(planner.demand(self.web), 3 * GIB)
+        with self.assertRaises(PlacementError):
+            PlacementPlanner(self.graph, [HostCapacity(self.local, 5 * GIB)]).plan([self.web])
+
+    def test_unexposed_kept_with_dependents(self):
+        planner = PlacementPlanner(
+            self.graph,
+            [HostCapacity(self.local, 4 * GIB), HostCapacity(self.remote, 4 * GIB, reserved=GIB)],
+            unexposed={self.db},
+        )
+        # The database cannot be proxied, so everything linking to it goes with it
+        self.assertEqual(planner.groups([self.db, self.web, self.worker]), [[self.db, self.web, self.worker]])
+        # ...which no longer fits, where before worker could go to the other host
+        with self.assertRaises(PlacementError):
+            planner.plan([self.web, self.worker])
+
+    def test_proxied_dependencies_not_added(self):
+        api = FakeContainer("api", mem_limit="1g")
+        graph = FakeGraph(dependencies={self.web: {api}, api: {self.db}})
+        placement = Placement(graph, assignments={self.web: "default", api: "remote", self.db: "remote"})
+        formation = placement.formation_for(self.local, "sha256:proxy")
+        # The database is the remote api's to start, not this host's
+        self.assertEqual(sorted(instance.name for instance in formation), ["test.api.proxy", "test.web.1"])
+        self.assertEqual(placement.proxies("remote"), {})
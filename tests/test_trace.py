@@ -0,0 +1,40 @@
+import unittest
+
+import attr
+
+from bay.cli.trace import critical_path, describe_critical_path
+
+
+@attr.s(hash=False)
+class FakeTask:
+    name = attr.ib()
+    created_at = attr.ib(default=0)
+    finished_at = attr.ib(default=None)
+    waited_for = attr.ib(default=None)
+    subtasks = attr.ib(default=attr.Factory(list))
+
+
+class CriticalPathTests(unittest.TestCase):
+    """
+    Tests the chain of container starts that held up a run is found.
+    """
+
+    def test_longest_chain(self):
+        db = FakeTask("Starting db", created_at=0, finished_at=3, waited_for=[])
+        cache = FakeTask("Starting cache", created_at=0, finished_at=1, waited_for=[])
+        api = FakeTask("Starting api", created_at=0, finished_at=5, waited_for=[db, cache])
+        web = FakeTask("Starting web", created_at=0, finished_at=6, waited_for=[api, cache])
+        # Faster than web, and not part of the chain
+        worker = FakeTask("Starting worker", created_at=0, finished_at=4, waited_for=[db])
+        build = FakeTask("Building web", created_at=0, finished_at=10)
+        root = FakeTask("__root__", subtasks=[build, FakeTask("Starting", subtasks=[db, cache, api, web, worker])])
+        path = critical_path(root)
+        self.assertEqual(path, [db, api, web])
+        self.assertEqual(
+            describe_critical_path(path),
+            "Critical path: Starting db (3.0s) -> Starting api (2.0s) -> Starting web (1.0s)",
+        )
+
+    def test_no_starts(self):
+        root = FakeTask("__root__", subtasks=[FakeTask("Building web", finished_at=1)])
+        self.assertEqual(critical_path(root), [])
@@ -0,0 +1,74 @@
+import unittest
+
+from bay.docker.watcher import FormationWatcher, docker_timestamp, event_timestamp
+
+
+class DummyGraph:
+    prefix = "bay"
+    namespace = "bay"
+
+
+class FakeClient:
+
+    def containers(self, filters=None):
+        return []
+
+
+class FakeHost:
+    client = FakeClient()
+
+
+class TimestampTests(unittest.TestCase):
+    """
+    Tests Docker times are converted into events' since format.
+    """
+
+    def test_utc(self):
+        self.assertEqual(docker_timestamp("2017-09-01T12:00:00.123456789Z"), "1504267200.123456789")
+        self.assertEqual(docker_timestamp("2017-09-01T12:00:00Z"), "1504267200.000000000")
+
+    def test_offset(self):
+        self.assertEqual(docker_timestamp("2017-09-01T13:30:00.5+01:30"), "1504267200.500000000")
+
+    def test_event(self):
+        self.assertEqual(
+            event_timestamp({"time": 1504267200, "timeNano": 1504267200000000042}),
+            "1504267200.000000042",
+        )
+        self.assertEqual(event_timestamp({"time": 1504267200}), "1504267200.000000000")
+
+
+class WatcherEventTests(unittest.TestCase):
+    """
+    Tests events that need no lookups are applied to the watcher's state.
+    """
+
+    def event(self, action, name="bay.web.1", id="abc"):
+        return {"Action": action, "id": id, "timeNano": 1, "Actor": {"Attributes": {"name": name}}}
+
+    def test_die_and_health(self):
+        watcher = FormationWatcher(host=None, graph=DummyGraph())
+        watcher.thread = "following"
+        watcher.instances["bay.web.1"] = object()
+        watcher.handle_event(self.event("health_status: healthy"))
+        self.assertEqual(watcher.health_of("bay.web.1"), "healthy")
+        self.assertTrue(watcher.is_running("bay.web.1"))
+        watcher.handle_event(self.event("die"))
+        self.assertFalse(watcher.is_running("bay.web.1"))
+        self.assertTrue(watcher.has_exited("abc"))
+        self.assertIsNone(watcher.health_of("bay.web.1"))
+        self.assertEqual(watcher.since, "0.000000001")
+
+    def test_stopped_container_started_again(self):
+        watcher = FormationWatcher(host=FakeHost(), graph=DummyGraph())
+        watcher.thread = "following"
+        watcher.instances["bay.web.1"] = object()
+        # Stopped, then reused by the runner with the same ID
+        watcher.handle_event(self.event("die"))
+        self.assertTrue(watcher.has_exited("abc"))
+        watcher.container_reused("abc")
+        self.assertFalse(watcher.has_exited("abc"))
+        # A late die event is cleared by the start that follows it
+        watcher.handle_event(self.event("die"))
+        watcher.handle_event(self.event("start"))
+        self.assertFalse(watcher.has_exited("abc"))